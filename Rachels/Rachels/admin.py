@@ -1,9 +1,423 @@
 # payroll/admin.py
-from django.contrib import admin
-from .models import AdvanceSalary
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, transaction
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.functional import cached_property
+from django.utils.html import format_html, format_html_join
+
+from . import audit, deletion, inventory, live, orders, sharding
+from .forms import location_choices
+from .models import (
+    AdvanceSalary, DailyDigest, Location, Record, RecordEvent, RequestProfile, StandingOrder, Vendor, VendorItem,
+    VendorItemPrice,
+)
+
+# Below this many rows an exact COUNT(*) is cheap enough.
+ESTIMATE_THRESHOLD = 50000
+# Records re-inserted per batch when a reassignment moves them to another shard.
+MOVE_BATCH = 1000
+
 
 @admin.register(AdvanceSalary)
 class AdvanceSalaryAdmin(admin.ModelAdmin):
     list_display = ("employee_name", "amount", "paid_on")
     search_fields = ("employee_name",)
     list_filter = ("paid_on",)
+
+
+# ------------------------
+# Large changelists
+# ------------------------
+def estimated_count(model, using):
+    """
+    Row count of ``model``'s table from planner statistics (PostgreSQL
+    reltuples, SQLite sqlite_stat1 after ANALYZE, else the rowid span).
+    None when the backend offers no estimate.
+    """
+    table = model._meta.db_table
+    connection = connections[using]
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+                row = cursor.fetchone()
+                return int(row[0]) if row and row[0] >= 0 else None
+            if connection.vendor == "sqlite":
+                cursor.execute("SELECT name FROM sqlite_master WHERE name = 'sqlite_stat1'")
+                if cursor.fetchone():
+                    cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s AND stat != '' LIMIT 1", [table])
+                    row = cursor.fetchone()
+                    if row:
+                        return int(row[0].split()[0])
+                # Two rowid B-tree seeks; overestimates by the number of deleted ids.
+                cursor.execute(f'SELECT MAX(rowid) - MIN(rowid) + 1 FROM "{table}"')
+                return cursor.fetchone()[0] or 0
+    except DatabaseError:
+        return None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Changelist paginator that takes an unfiltered list's size from table
+    statistics instead of COUNT(*) once the table is large. Filtered lists
+    are counted exactly (the filters are served by indexes). "Unfiltered"
+    means no filter beyond the default manager's own, e.g. Record.objects'
+    live-rows one; the estimate then includes the (few) tombstones.
+    """
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if qs.query.where == qs.model._default_manager.all().query.where:
+            estimate = estimated_count(qs.model, qs.db)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class LocationFilter(admin.SimpleListFilter):
+    """ Location filter that also reads from the location's shard. """
+    title = "location"
+    parameter_name = "location"
+
+    def lookups(self, request, model_admin):
+        return [(loc.pk, loc.name) for loc in Location.objects.cached()]
+
+    def queryset(self, request, queryset):
+        location = Location.objects.resolve(self.value()) if self.value() else None
+        if location is None:
+            return queryset
+        return queryset.filter(location_id=location.pk).using(sharding.alias_for_location(location.pk))
+
+
+class DeletedFilter(admin.SimpleListFilter):
+    """ Shows soft-deleted records instead of live ones (RecordAdmin.get_queryset). """
+    title = "deleted"
+    parameter_name = "deleted"
+
+    def lookups(self, request, model_admin):
+        return [("yes", "Deleted")]
+
+    def queryset(self, request, queryset):
+        return queryset
+
+
+# ------------------------
+# Catalog
+# ------------------------
+@admin.register(Vendor)
+class VendorAdmin(admin.ModelAdmin):
+    list_display = ("name",)
+    search_fields = ("name",)
+    ordering = ("name",)
+
+
+@admin.register(VendorItem)
+class VendorItemAdmin(admin.ModelAdmin):
+    list_display = ("item_name", "vendor")
+    list_select_related = ("vendor",)
+    search_fields = ("item_name", "vendor__name")
+    autocomplete_fields = ("vendor",)
+    ordering = ("vendor__name", "item_name")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(VendorItemPrice)
+class VendorItemPriceAdmin(admin.ModelAdmin):
+    list_display = ("item", "unit_price", "effective_from", "created_at")
+    list_select_related = ("item__vendor",)
+    search_fields = ("item__item_name", "item__vendor__name")
+    autocomplete_fields = ("item",)
+    date_hierarchy = "effective_from"
+    ordering = ("item__vendor__name", "item__item_name", "-effective_from")
+
+
+# ------------------------
+# Records
+# ------------------------
+class RecordActionForm(ActionForm):
+    location = forms.TypedChoiceField(
+        choices=lambda: [("", "New location (for reassign)…"), *location_choices()],
+        coerce=int, required=False, empty_value=None,
+    )
+
+
+def _merge_in_place(qs, location, actor):
+    """
+    Moves the pending lines of ``qs`` to ``location`` on their own
+    database. Ids stay; only a line whose (date, vendor, item) is already
+    pending at ``location`` is folded into that line and deleted.
+    """
+    last, moved = 0, 0
+    while True:
+        with transaction.atomic(using=qs.db):
+            rows = list(qs.filter(status=Record.PENDING, pk__gt=last).select_for_update().order_by("pk")[:MOVE_BATCH])
+            if not rows:
+                return moved
+            last = rows[-1].pk
+            lines = orders.pending_lines(qs.db, {(location.pk, r.date, r.vendor_id, r.item_id) for r in rows})
+            kept, merged, increments = [], [], {}
+            for r in rows:
+                key = (location.pk, r.date, r.vendor_id, r.item_id)
+                target = lines.setdefault(key, r)
+                if target is r or target.pk == r.pk:
+                    kept.append(r)
+                else:
+                    merged.append(r)
+                    increments[target.pk] = increments.get(target.pk, 0) + r.quantity
+            pending = Record.objects.using(qs.db)
+            audit.write(qs.db, [
+                *audit.events(RecordEvent.DELETED, merged, actor),
+                *audit.events(RecordEvent.MERGED, [t for t in lines.values() if t.pk in increments], actor,
+                              quantities=increments),
+            ])
+            # Free the colliding keys before moving the rest onto them.
+            pending.filter(pk__in=[r.pk for r in merged]).delete()
+            orders.add_quantities(pending, increments)
+            pending.filter(pk__in=[r.pk for r in kept]).update(location=location, updated_at=timezone.now())
+        moved += len(rows)
+
+
+def reassign_location(queryset, location, actor=None):
+    """
+    Moves the records of ``queryset`` to ``location`` with set-based
+    writes. On the same database that is an UPDATE keeping the ids; a
+    pending line colliding with one already pending at ``location`` merges
+    into it. Records that change database (sharding) are re-inserted in
+    the target shard under new ids, pending lines merging as above, and
+    are logged as deleted and created (audit.py).
+    """
+    target = sharding.alias_for_location(location.pk)
+    moved = 0
+    for qs in sharding.split(queryset):
+        if qs.db == target:
+            moved += qs.exclude(status=Record.PENDING).update(location=location, updated_at=timezone.now())
+            moved += _merge_in_place(qs, location, actor)
+            continue
+        while True:
+            rows = list(qs.order_by("pk")[:MOVE_BATCH])
+            if not rows:
+                break
+            ids = [r.pk for r in rows]
+            deleted = audit.events(RecordEvent.DELETED, rows, actor)
+            for r in rows:
+                r.pk = None
+                r.location = location
+            pending = [r for r in rows if r.status == Record.PENDING]
+            others = [r for r in rows if r.status != Record.PENDING]
+            # Two transactions, not one: the target commits first, then the
+            # source. A failure in between leaves the batch in both shards
+            # (never in neither); running the action again would copy it a
+            # second time, so such a batch is cleaned up by hand from the
+            # audit log rather than retried.
+            with transaction.atomic(using=qs.db), transaction.atomic(using=target):
+                audit.write(qs.db, deleted)
+                Record.objects.using(qs.db).filter(pk__in=ids).delete()
+                Record.objects.using(target).bulk_create(others)
+                audit.write(target, audit.events(RecordEvent.CREATED, others, actor))
+                orders.add_pending(target, pending, actor)
+            moved += len(rows)
+    return moved
+
+
+@admin.register(Record)
+class RecordAdmin(admin.ModelAdmin):
+    list_display = ("id", "date", "location", "vendor", "item_name", "quantity", "unit_price", "status", "updated_at")
+    # item__vendor: the row checkbox label is str(record), which names the item's vendor.
+    list_select_related = ("location", "vendor", "item__vendor")
+    list_filter = ("status", LocationFilter, DeletedFilter)
+    # record_date_idx serves both the drill-down and the per-level date query.
+    date_hierarchy = "date"
+    search_fields = ("vendor__name", "item__item_name")
+    autocomplete_fields = ("vendor", "item")
+    readonly_fields = ("created_at", "updated_at")
+    ordering = ("-date", "-id")
+    list_per_page = 100
+    paginator = EstimatedCountPaginator
+    # The "N total" link would need a second COUNT(*) over the whole table.
+    show_full_result_count = False
+    action_form = RecordActionForm
+    actions = ("complete_selected", "reassign_selected", "restore_selected")
+
+    @admin.display(description="item", ordering="item__item_name")
+    def item_name(self, obj):
+        return obj.item.item_name if obj.item else "-"
+
+    def get_queryset(self, request):
+        # Live rows by default; the Deleted filter switches to tombstones.
+        if request.GET.get(DeletedFilter.parameter_name) == "yes":
+            return Record.all_objects.filter(deleted_at__isnull=False).order_by("-deleted_at", "-id")
+        return super().get_queryset(request)
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, Record.objects.filter(pk=obj.pk).using(obj._state.db))
+
+    def delete_queryset(self, request, queryset):
+        """ Soft delete (deletion.py); purge_deleted removes the rows later. """
+        deleted = deletion.soft_delete(queryset, actor=request.user)
+        live.publish_records(live.DELETED, deleted)
+
+    def get_object(self, request, object_id, from_field=None):
+        if from_field is None and str(object_id).isdigit():
+            queryset = self.get_queryset(request).using(sharding.alias_for_record(int(object_id)))
+            try:
+                return queryset.get(pk=object_id)
+            except Record.DoesNotExist:
+                return None
+        return super().get_object(request, object_id, from_field)
+
+    @admin.action(description="Mark selected records completed")
+    def complete_selected(self, request, queryset):
+        completed = inventory.complete_records(queryset, actor=request.user)
+        live.publish_records(live.COMPLETED, completed)
+        self.message_user(request, f"{len(completed)} record(s) marked completed.", messages.SUCCESS)
+
+    @admin.action(description="Reassign selected records to the chosen location")
+    def reassign_selected(self, request, queryset):
+        location = Location.objects.resolve(request.POST.get("location"))
+        if location is None:
+            self.message_user(request, "Choose the new location next to the action.", messages.ERROR)
+            return
+        moved = reassign_location(queryset, location, actor=request.user)
+        self.message_user(request, f"{moved} record(s) reassigned to {location}.", messages.SUCCESS)
+
+    @admin.action(description="Restore selected deleted records")
+    def restore_selected(self, request, queryset):
+        restored, updated = deletion.restore(queryset, actor=request.user)
+        live.publish_records(live.CREATED, restored)
+        live.publish_records(live.UPDATED, updated)
+        message = f"{len(restored)} record(s) restored."
+        if updated:
+            message += f" Others merged into {len(updated)} pending line(s) ordered again since."
+        self.message_user(request, message, messages.SUCCESS)
+
+
+@admin.register(RecordEvent)
+class RecordEventAdmin(admin.ModelAdmin):
+    """ Read-only view of the append-only order history (audit.py). """
+    list_display = ("at", "record_id", "location", "kind", "old_status", "new_status", "quantity", "actor_name")
+    list_select_related = ("location",)
+    # LocationFilter reads from the location's shard; (location, at) serves it.
+    list_filter = ("kind", LocationFilter)
+    search_fields = ("=record_id", "actor_name")
+    ordering = ("-at", "-id")
+    list_per_page = 100
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+# ------------------------
+# Daily digests
+# ------------------------
+@admin.register(DailyDigest)
+class DailyDigestAdmin(admin.ModelAdmin):
+    """ Built by the build_digests command; read-only here. """
+    list_display = ("date", "location", "created_at")
+    list_select_related = ("location",)
+    list_filter = ("location",)
+    date_hierarchy = "date"
+    ordering = ("-date", "location__name")
+    exclude = ("html",)
+    readonly_fields = ("date", "location", "summary", "created_at")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+# ------------------------
+# Standing orders
+# ------------------------
+@admin.register(StandingOrder)
+class StandingOrderAdmin(admin.ModelAdmin):
+    list_display = ("location", "vendor", "item", "quantity", "weekdays", "active")
+    list_select_related = ("location", "vendor", "item__vendor")
+    list_filter = ("active", "location")
+    list_editable = ("quantity", "weekdays", "active")
+    search_fields = ("vendor__name", "item__item_name")
+    autocomplete_fields = ("vendor", "item")
+
+
+# ------------------------
+# Request profiles
+# ------------------------
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    """ Profiles stored by profiling.ProfilingMiddleware; read-only, downloadable. """
+    list_display = ("created_at", "method", "path", "view", "status_code", "duration_ms", "query_count",
+                    "sql_ms", "trigger", "username")
+    list_filter = ("trigger", "profiler", "view")
+    search_fields = ("path", "view", "username")
+    ordering = ("-created_at",)
+    date_hierarchy = "created_at"
+    exclude = ("stats", "sql")
+    readonly_fields = ("method", "path", "view", "status_code", "username", "trigger", "profiler", "duration_ms",
+                       "query_count", "sql_ms", "created_at", "download", "profile_summary", "sql_timeline")
+
+    @admin.display(description="duration (ms)", ordering="duration")
+    def duration_ms(self, obj):
+        return f"{obj.duration * 1000:.1f}"
+
+    @admin.display(description="SQL (ms)", ordering="sql_duration")
+    def sql_ms(self, obj):
+        return f"{obj.sql_duration * 1000:.1f}"
+
+    @admin.display(description="profile")
+    def download(self, obj):
+        return format_html('<a href="{}">Download {}</a>', reverse("admin:request_profile_download", args=[obj.pk]),
+                           "pstats (.prof)" if obj.profiler == RequestProfile.CPROFILE else "collapsed stacks (.folded)")
+
+    @admin.display(description="hottest functions")
+    def profile_summary(self, obj):
+        return format_html('<pre style="white-space:pre; overflow:auto;">{}</pre>', obj.summary)
+
+    @admin.display(description="SQL timeline")
+    def sql_timeline(self, obj):
+        rows = format_html_join(
+            "\n", "<tr><td>{}</td><td>{}</td><td>{}</td><td><code>{}</code></td></tr>",
+            ((f"{e['start'] * 1000:.1f}", f"{e['duration'] * 1000:.1f}", e["alias"], e["sql"]) for e in obj.sql),
+        )
+        return format_html(
+            "<table><thead><tr><th>start (ms)</th><th>ms</th><th>database</th><th>SQL</th></tr></thead>"
+            "<tbody>{}</tbody></table>", rows)
+
+    def get_urls(self):
+        return [
+            path("<int:pk>/download/", self.admin_site.admin_view(self.download_view),
+                 name="request_profile_download"),
+            *super().get_urls(),
+        ]
+
+    def download_view(self, request, pk):
+        if not self.has_view_permission(request):
+            return HttpResponse(status=403)
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        extension = "prof" if profile.profiler == RequestProfile.CPROFILE else "folded"
+        response = HttpResponse(bytes(profile.stats), content_type="application/octet-stream")
+        response["Content-Disposition"] = f'attachment; filename="profile-{profile.pk}.{extension}"'
+        return response
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class RachelsConfig(AppConfig):
+    name = 'Rachels'
+
+    def ready(self):
+        # Registers the connection_created receivers that attach the SQL
+        # wrappers, before any connection is opened.
+        from . import metrics, profiling  # noqa: F401
@@ -3,6 +3,9 @@ ASGI config for Rachels project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serving through this module enables the async read views (ASYNC_VIEWS);
+see gunicorn_asgi.py for the recommended deployment profile.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -12,5 +15,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Rachels.settings')
+os.environ.setdefault('RACHELS_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
@@ -0,0 +1,138 @@
+"""
+Static asset pipeline.
+
+``collectstatic`` writes every file under a content-hashed name (manifest
+storage) plus ``.gz`` / ``.br`` siblings for text assets. Templates link
+the hashed names through ``{% static %}``, so a changed file gets a new
+URL and the old one can be cached forever.
+
+StaticAssetMiddleware serves the collected files when Django itself is
+the front end (DEBUG off, no nginx in front): it picks the precompressed
+variant the client accepts and sends far-future cache headers for hashed
+names.
+"""
+import gzip
+import mimetypes
+import os
+import posixpath
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:  # optional: gzip variants are always written
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".svg", ".json", ".map", ".txt", ".html")
+# Smaller files are not worth the extra request header / file.
+MIN_COMPRESS_SIZE = 256
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Unhashed names may change in place; let clients revalidate them.
+DEFAULT_CACHE_CONTROL = "public, max-age=300"
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ Manifest storage that also writes gzip / brotli variants. """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS) and self.exists(name):
+                self._write_compressed(name)
+
+    def _write_compressed(self, name):
+        path = Path(self.path(name))
+        data = path.read_bytes()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append((".br", brotli.compress(data, quality=11)))
+        for suffix, compressed in variants:
+            if len(compressed) < len(data):
+                Path(f"{path}{suffix}").write_bytes(compressed)
+
+
+# (Accept-Encoding token, file suffix), in order of preference.
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+
+class StaticAssetMiddleware:
+    """
+    Serves STATIC_ROOT under STATIC_URL with precompressed variants and
+    long-lived cache headers. Only active with DEBUG off; in development
+    runserver's static handler serves the source files.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = not settings.DEBUG and bool(getattr(settings, "STATIC_ROOT", None))
+        self.prefix = "/" + settings.STATIC_URL.lstrip("/")
+        self.root = Path(settings.STATIC_ROOT).resolve() if self.enabled else None
+        self._immutable = None
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.static_response(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        # serve() only stats and opens a local file, cheap enough to do on
+        # the event loop; FileResponse streams the body asynchronously.
+        return self.static_response(request) or await self.get_response(request)
+
+    def static_response(self, request):
+        if self.enabled and request.path.startswith(self.prefix) and request.method in ("GET", "HEAD"):
+            return self.serve(request, request.path[len(self.prefix):])
+        return None
+
+    def is_hashed(self, name):
+        if self._immutable is None:
+            manifest = getattr(staticfiles_storage, "hashed_files", None) or {}
+            self._immutable = set(manifest.values())
+        return name in self._immutable
+
+    def serve(self, request, name):
+        name = posixpath.normpath(name).lstrip("/")
+        if name.startswith("..") or name.endswith((".gz", ".br")):
+            return None
+        path = (self.root / name).resolve()
+        if not path.is_relative_to(self.root) or not path.is_file():
+            return None
+
+        stat = path.stat()
+        if not was_modified_since(request.META.get("HTTP_IF_MODIFIED_SINCE"), stat.st_mtime):
+            response = HttpResponseNotModified()
+        else:
+            content_type, _ = mimetypes.guess_type(name)
+            accepted = request.META.get("HTTP_ACCEPT_ENCODING", "")
+            served, encoding = path, None
+            for token, suffix in ENCODINGS:
+                candidate = Path(f"{path}{suffix}")
+                if token in accepted and candidate.is_file():
+                    served, encoding = candidate, token
+                    break
+            response = FileResponse(open(served, "rb"), content_type=content_type or "application/octet-stream")
+            response["Content-Length"] = os.path.getsize(served)
+            if encoding:
+                response["Content-Encoding"] = encoding
+
+        response["Last-Modified"] = http_date(stat.st_mtime)
+        response["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if self.is_hashed(name) else DEFAULT_CACHE_CONTROL
+        patch_vary_headers(response, ("Accept-Encoding",))
+        return response
@@ -0,0 +1,233 @@
+"""
+Async versions of the read-heavy views, used when the app is served over
+ASGI with ``ASYNC_VIEWS`` enabled (see asgi.py / urls.py).
+
+They use the async ORM so a slow dashboard or list render never parks a
+worker thread, and the independent queries of a page are awaited together.
+Context handed to the templates is fully materialised (select_related /
+lists), so rendering itself never touches the database.
+"""
+import asyncio
+
+from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.db.models import Count, Max
+from django.http import HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, render
+
+from . import live, sharding
+from .models import Location, Record, Vendor, VendorItem, acatalog_version
+from .views import (
+    RECORDS_PER_PAGE,
+    _combine_probes,
+    _etag,
+    _filter_records,
+    _normalize_location_for_group,
+    _not_modified,
+    _pending_by_location,
+    _records_list_response,
+    _with_validators,
+)
+
+
+# ------------------------
+# Helper utilities
+# ------------------------
+async def _resolve_user(request):
+    """
+    Loads the user with the async auth API and pins it on the request, so
+    templates / context processors see a concrete user instead of a lazy
+    object that would query the database synchronously.
+    """
+    request.user = await request.auser()
+    return request.user
+
+
+async def _aviewable_locations(user, locations):
+    """
+    Async counterpart of views.user_can_view_location for a list of
+    locations, resolved with a single group query.
+    """
+    if not user.is_authenticated:
+        return []
+    if user.is_superuser:
+        return list(locations)
+    wanted = {f"manager_{_normalize_location_for_group(loc.name)}": loc for loc in locations}
+    names = {name async for name in user.groups.filter(name__in=wanted).values_list('name', flat=True)}
+    return [loc for group, loc in wanted.items() if group in names]
+
+
+async def _alist(qs):
+    return [obj async for obj in qs]
+
+
+async def _aprobe(qs):
+    """ Async views._probe. """
+    return await qs.order_by().aaggregate(latest=Max('updated_at'), total=Count('id'))
+
+
+async def _adashboard_summary(records):
+    """ Async views._dashboard_summary. """
+    pending = records.filter(status=Record.PENDING)
+    total_pending, by_location, top5, latest = await asyncio.gather(
+        pending.acount(),
+        _alist(pending.values('location').annotate(count=Count('id')).order_by()),
+        _alist(pending.select_related('vendor', 'item', 'location').order_by('-date', '-id')[:5]),
+        _alist(records.select_related('location').order_by('-date', '-id')[:5]),
+    )
+    return {'total_pending': total_pending, 'by_location': by_location, 'top5': top5, 'latest': latest}
+
+
+# ------------------------
+# Dashboard / Home
+# ------------------------
+@login_required
+async def home(request):
+    """ Async dashboard; same context as views.home. """
+    user = await _resolve_user(request)
+    all_locations = await Location.objects.acached()
+    locations = await _aviewable_locations(user, all_locations)
+    databases = sharding.split(Record.objects.all())
+    probe = _combine_probes(await asyncio.gather(*(_aprobe(qs) for qs in databases)))
+    etag = _etag(request, 'home', [loc.pk for loc in locations], await acatalog_version(), *probe.values())
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+
+    card_queries = []
+    for loc in locations:
+        with_related = Record.objects.using(sharding.alias_for_location(loc.pk)).select_related(
+            'vendor', 'item', 'location')
+        card_queries.append(_alist(
+            with_related.filter(location=loc, status=Record.PENDING).order_by('-date', '-id')))
+        card_queries.append(_alist(
+            with_related.filter(location=loc).exclude(status=Record.PENDING).order_by('-date', '-id')))
+
+    results = await asyncio.gather(
+        *(_adashboard_summary(qs) for qs in databases),
+        *card_queries,
+    )
+    summaries, cards = results[:len(databases)], results[len(databases):]
+
+    location_cards = []
+    for i, loc in enumerate(locations):
+        pending_list, successful_list = cards[2 * i], cards[2 * i + 1]
+        location_cards.append({
+            'location': loc,
+            'pending': pending_list,
+            'successful': successful_list,
+            'pending_count': len(pending_list),
+            'successful_count': len(successful_list),
+        })
+
+    context = {
+        'total_pending': sum(summary['total_pending'] for summary in summaries),
+        'pending_by_location': _pending_by_location(
+            [row for summary in summaries for row in summary['by_location']], all_locations),
+        'latest_records': sharding.merge(
+            [summary['latest'] for summary in summaries], sharding.record_order, reverse=True, limit=5),
+        'top5_orders': sharding.merge(
+            [summary['top5'] for summary in summaries], sharding.record_order, reverse=True, limit=5),
+        'location_cards': location_cards,
+    }
+    return _with_validators(request, render(request, "home.html", context), etag)
+
+
+# ------------------------
+# All records listing (with filters + pagination)
+# ------------------------
+@login_required
+async def show_all_records(request):
+    await _resolve_user(request)
+    locations = await Location.objects.acached()
+    qs = _filter_records(request.GET, locations)
+    databases = sharding.split(qs)
+
+    probe = _combine_probes(await asyncio.gather(*(_aprobe(part) for part in databases)))
+    etag = _etag(request, request.get_full_path(), await acatalog_version(), *probe.values())
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+
+    merged = len(databases) > 1
+    paginator = Paginator(sharding.MergedRecords(databases) if merged else qs, RECORDS_PER_PAGE)
+    # Prime the cached count from the probe; Paginator would otherwise
+    # call qs.count() synchronously.
+    paginator.count = probe['total']
+    page_obj = paginator.get_page(request.GET.get('page', 1))
+    page_obj.object_list = await (page_obj.object_list.alist() if merged else _alist(page_obj.object_list))
+    return _with_validators(request, _records_list_response(request, paginator, page_obj, locations), etag)
+
+
+# ------------------------
+# Record detail
+# ------------------------
+@login_required
+async def record_detail(request, pk):
+    user = await _resolve_user(request)
+    records = Record.objects.using(await sharding.aalias_for_record(pk))
+    record = await aget_object_or_404(records.select_related('vendor', 'item', 'location'), pk=pk)
+    if not await _aviewable_locations(user, [record.location]):
+        return HttpResponseForbidden("You don't have permission to view this record.")
+    etag = _etag(request, 'record', record.pk, record.updated_at.isoformat(), await acatalog_version())
+    not_modified = _not_modified(request, etag, record.updated_at)
+    if not_modified:
+        return not_modified
+    return _with_validators(request, render(request, "record_detail.html", {"record": record}), etag, record.updated_at)
+
+
+# ------------------------
+# JSON / catalog APIs
+# ------------------------
+@login_required
+async def vendor_catalog(request):
+    """ Async views.vendor_catalog: vendors and items fetched concurrently. """
+    vendors, items = await asyncio.gather(
+        _alist(Vendor.objects.order_by('name').values_list('pk', 'name')),
+        _alist(VendorItem.objects.order_by('pk').values_list('pk', 'vendor_id', 'item_name')),
+    )
+    by_vendor = {}
+    for pk, vendor_id, name in items:
+        by_vendor.setdefault(vendor_id, []).append({'id': pk, 'name': name})
+    return JsonResponse({
+        'vendors': [
+            {'id': pk, 'name': name, 'items': by_vendor.get(pk, [])}
+            for pk, name in vendors
+        ],
+    })
+
+
+# ------------------------
+# Live dashboard updates (Server-Sent Events)
+# ------------------------
+SSE_HEARTBEAT_SECONDS = 20
+
+
+@login_required
+async def live_events(request):
+    """
+    One long-lived text/event-stream per open dashboard. Pushes record
+    events for the locations the viewer may see; comments are sent as
+    heartbeats so proxies keep the connection open.
+    """
+    user = await _resolve_user(request)
+    locations = await _aviewable_locations(user, await Location.objects.acached())
+
+    async def stream():
+        subscription = live.hub.subscribe([loc.pk for loc in locations])
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield live.format_sse(event)
+        finally:
+            live.hub.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
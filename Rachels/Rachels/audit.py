@@ -0,0 +1,65 @@
+"""
+Order line history.
+
+Every path that creates, merges into, completes or deletes order lines
+builds RecordEvent rows with ``events`` and saves them with ``write``
+inside its own transaction, with one bulk insert per change however many
+lines it touched. The table lives with the records (sharded) and is
+append-only.
+
+``actor`` is the user who made the change, or None for the system
+(standing orders, imports).
+"""
+from django.utils import timezone
+
+from . import sharding
+from .models import RecordEvent
+
+HISTORY_LIMIT = 100
+
+
+def events(kind, records, actor=None, quantities=None, **fields):
+    """
+    Unsaved events of ``kind`` for ``records``, all stamped with the same
+    time. ``quantities`` maps record ids to the quantity to log (default:
+    the record's quantity); ``fields`` (old_status, new_status) apply to
+    all. Deletes and creates log each record's own status unless given.
+    """
+    now = timezone.now()
+    actor_id = actor.pk if actor is not None and actor.is_authenticated else None
+    actor_name = actor.get_username() if actor_id is not None else ""
+    return [
+        RecordEvent(
+            record_id=r.pk,
+            location_id=r.location_id,
+            kind=kind,
+            quantity=r.quantity if quantities is None else quantities[r.pk],
+            actor_id=actor_id,
+            actor_name=actor_name,
+            at=now,
+            **{**_own_status(kind, r), **fields},
+        )
+        for r in records
+    ]
+
+
+def _own_status(kind, record):
+    if kind == RecordEvent.DELETED:
+        return {"old_status": record.status}
+    if kind == RecordEvent.CREATED:
+        return {"new_status": record.status}
+    return {}
+
+
+def write(alias, rows):
+    """ Saves ``rows`` on ``alias``; call inside the transaction making the change. """
+    if rows:
+        RecordEvent.objects.using(alias).bulk_create(rows)
+
+
+def history(record_id, limit=HISTORY_LIMIT):
+    """ A record's events, oldest first (record_event_record_at_idx). """
+    return list(
+        RecordEvent.objects.using(sharding.alias_for_record(record_id))
+        .filter(record_id=record_id).order_by("at", "pk")[:limit]
+    )
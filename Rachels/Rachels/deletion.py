@@ -0,0 +1,107 @@
+"""
+Soft delete for order lines.
+
+Deleting a record only sets ``deleted_at`` (one indexed UPDATE, no
+cascade), so it is cheap under load and can be undone. ``Record.objects``
+leaves deleted rows out and the hot indexes are partial on live rows, so
+tombstones cost the normal pages nothing; ``Record.all_objects`` still sees
+them. ``manage.py purge_deleted`` hard-deletes old tombstones in small
+batches, off-hours.
+
+Restoring a pending line whose (location, date, vendor, item) has been
+ordered again since merges it into the live line, as orders.add_pending
+would, and hard-deletes the tombstone in the same transaction so its
+quantity cannot be added twice.
+"""
+import time
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import audit, orders, sharding
+from .models import Record, RecordEvent
+
+# Record ids per UPDATE / DELETE.
+ID_CHUNK = 500
+
+
+def _update_ids(manager, ids, **values):
+    for i in range(0, len(ids), ID_CHUNK):
+        manager.filter(pk__in=ids[i:i + ID_CHUNK]).update(**values)
+
+
+def soft_delete(queryset, actor=None):
+    """
+    Marks the live records of ``queryset`` deleted and logs it for
+    ``actor``, one transaction per database. Returns the records deleted.
+    """
+    deleted = []
+    for qs in sharding.split(queryset):
+        with transaction.atomic(using=qs.db):
+            records = list(qs.select_for_update().order_by("pk"))
+            if not records:
+                continue
+            _update_ids(Record.objects.using(qs.db), [r.pk for r in records], deleted_at=timezone.now())
+            audit.write(qs.db, audit.events(RecordEvent.DELETED, records, actor))
+        deleted.extend(records)
+    return deleted
+
+
+def restore(queryset, actor=None):
+    """
+    Brings back the soft-deleted records of ``queryset`` (an
+    ``all_objects`` queryset), merging pending lines into a live one with
+    the same line key. Returns ``(restored, updated)``: the records live
+    again, and the other live lines that merged ones were added to.
+    """
+    restored, updated = [], []
+    for qs in sharding.split(queryset.filter(deleted_at__isnull=False)):
+        with transaction.atomic(using=qs.db):
+            records = list(qs.select_for_update().order_by("pk"))
+            if not records:
+                continue
+            live = orders.pending_lines(qs.db, {orders.line_key(r) for r in records if r.status == Record.PENDING})
+            revived, merged, increments = [], [], {}
+            for r in records:
+                target = live.get(orders.line_key(r)) if r.status == Record.PENDING else None
+                if target is None:
+                    revived.append(r)
+                    if r.status == Record.PENDING:
+                        live[orders.line_key(r)] = r
+                else:
+                    merged.append(r)
+                    increments[target.pk] = increments.get(target.pk, 0) + r.quantity
+            _update_ids(Record.all_objects.using(qs.db), [r.pk for r in revived], deleted_at=None)
+            orders.add_quantities(Record.objects.using(qs.db), increments)
+            # Consumed: restoring one again would add its quantity twice.
+            for i in range(0, len(merged), ID_CHUNK):
+                Record.all_objects.using(qs.db).filter(pk__in=[r.pk for r in merged[i:i + ID_CHUNK]]).delete()
+            targets = {r.pk: r for r in live.values() if r.pk in increments}
+            audit.write(qs.db, [
+                *audit.events(RecordEvent.RESTORED, revived, actor),
+                *audit.events(RecordEvent.MERGED, targets.values(), actor, quantities=increments),
+            ])
+        restored.extend(revived)
+        revived_ids = {r.pk for r in revived}
+        updated.extend(r for pk, r in targets.items() if pk not in revived_ids)
+    return restored, updated
+
+
+def purge(alias, before, batch_size=ID_CHUNK, pause=0.0):
+    """
+    Hard-deletes the records on ``alias`` soft-deleted before ``before``,
+    oldest first, ``batch_size`` per short transaction with ``pause``
+    seconds between batches so other writers get the lock. Returns the
+    number of records purged.
+    """
+    tombstones = Record.all_objects.using(alias).filter(deleted_at__isnull=False, deleted_at__lt=before)
+    purged = 0
+    while True:
+        ids = list(tombstones.order_by("deleted_at").values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return purged
+        with transaction.atomic(using=alias):
+            Record.all_objects.using(alias).filter(pk__in=ids).delete()
+        purged += len(ids)
+        if pause:
+            time.sleep(pause)
@@ -0,0 +1,136 @@
+"""
+Precomputed daily digests.
+
+``build(day)`` (run nightly by ``manage.py build_digests``) aggregates one
+day for every location and for all of them together: order lines placed
+and completed, their spend, top items, the pending lines still outstanding
+and the advances paid. Each digest is stored as a DailyDigest row holding
+the JSON summary and the rendered HTML, so the digest page only fetches
+one row.
+
+A line counts as completed on the day its status last changed to
+Completed (``updated_at``). Advances are not tied to a location and only
+appear in the combined digest.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from . import sharding
+from .models import AdvanceSalary, DailyDigest, Location, Record, VendorItem
+from .pricing import LINE_TOTAL
+
+TOP_ITEMS = 5
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _location_rows(qs, day):
+    """ One database's per-location aggregates for ``day``. """
+    start, end = _day_bounds(day)
+    placed = qs.filter(date=day)
+    return {
+        # Not quantity=: LINE_TOTAL's F("quantity") would then be that Sum.
+        "placed": list(placed.values("location_id").annotate(
+            lines=Count("pk"), units=Sum("quantity"), spend=Sum(LINE_TOTAL)).order_by()),
+        "items": list(placed.values("location_id", "item_id").annotate(quantity=Sum("quantity")).order_by()),
+        "completed": list(
+            qs.filter(status=Record.COMPLETED, updated_at__gte=start, updated_at__lt=end)
+            .values("location_id").annotate(lines=Count("pk")).order_by()),
+        "pending": list(
+            qs.filter(status=Record.PENDING, date__lte=day)
+            .values("location_id").annotate(lines=Count("pk")).order_by()),
+    }
+
+
+def _empty():
+    return {"placed": 0, "quantity": 0, "spend": Decimal("0"), "completed": 0, "pending": 0, "items": {}}
+
+
+def _collect(day, locations):
+    stats = {loc.pk: _empty() for loc in locations}
+    for rows in sharding.fan_out(lambda qs: _location_rows(qs, day), sharding.split(Record.objects.all())):
+        for row in rows["placed"]:
+            s = stats.setdefault(row["location_id"], _empty())
+            s["placed"] += row["lines"]
+            s["quantity"] += row["units"] or 0
+            s["spend"] += row["spend"] or 0
+        for row in rows["items"]:
+            items = stats.setdefault(row["location_id"], _empty())["items"]
+            items[row["item_id"]] = items.get(row["item_id"], 0) + (row["quantity"] or 0)
+        for key in ("completed", "pending"):
+            for row in rows[key]:
+                stats.setdefault(row["location_id"], _empty())[key] += row["lines"]
+    return stats
+
+
+def _combine(stats):
+    total = _empty()
+    for s in stats:
+        for key in ("placed", "quantity", "spend", "completed", "pending"):
+            total[key] += s[key]
+        for item_id, quantity in s["items"].items():
+            total["items"][item_id] = total["items"].get(item_id, 0) + quantity
+    return total
+
+
+def _summary(s, item_names):
+    top = sorted(s["items"].items(), key=lambda pair: (-pair[1], item_names.get(pair[0], "")))[:TOP_ITEMS]
+    return {
+        "placed": s["placed"],
+        "quantity": s["quantity"],
+        "spend": str(s["spend"]),
+        "completed": s["completed"],
+        "pending": s["pending"],
+        "top_items": [
+            {"item": item_id, "name": item_names.get(item_id, "(removed item)"), "quantity": quantity}
+            for item_id, quantity in top
+        ],
+    }
+
+
+def _digest(day, location, summary):
+    html = render_to_string("partials/daily_digest.html", {"day": day, "location": location, "summary": summary})
+    return DailyDigest(date=day, location=location, summary=summary, html=html)
+
+
+def build(day):
+    """ Builds (or rebuilds) every digest for ``day``. Returns the digests stored. """
+    locations = Location.objects.cached()
+    stats = _collect(day, locations)
+    item_ids = {item_id for s in stats.values() for item_id in s["items"] if item_id is not None}
+    item_names = {
+        item.pk: str(item) for item in VendorItem.objects.filter(pk__in=item_ids).select_related("vendor")
+    }
+
+    digests = [_digest(day, loc, _summary(stats[loc.pk], item_names)) for loc in locations]
+
+    combined = _summary(_combine(stats.values()), item_names)
+    advances = list(AdvanceSalary.objects.filter(paid_on=day).order_by("employee_name"))
+    combined["advances"] = {
+        "count": len(advances),
+        "amount": str(sum((a.amount for a in advances), Decimal("0"))),
+        "paid": [{"name": a.employee_name, "amount": str(a.amount)} for a in advances],
+    }
+    combined["locations"] = [
+        {"location": loc.pk, "name": loc.name, **{k: d.summary[k] for k in ("placed", "completed", "pending", "spend")}}
+        for loc, d in zip(locations, digests)
+    ]
+    digests.append(_digest(day, None, combined))
+
+    with transaction.atomic():
+        DailyDigest.objects.filter(date=day).delete()
+        DailyDigest.objects.bulk_create(digests)
+    return digests
+
+
+def get(day, location=None):
+    """ The stored digest for ``day`` and ``location`` (None: combined), or None. """
+    return DailyDigest.objects.filter(date=day, location=location).first()
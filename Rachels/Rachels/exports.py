@@ -0,0 +1,99 @@
+"""
+CSV export of order lines.
+
+Small exports stream straight from the export view. An export of more than
+``settings.EXPORT_INLINE_ROWS`` lines is queued instead (the
+``export_records`` task in tasks.py): the worker writes the file under
+``settings.EXPORT_ROOT/<user id>/`` and the export page lists it for
+download, so a year of orders never holds a web worker.
+"""
+import csv
+import io
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+
+from . import sharding
+from .models import Record
+
+HEADER = ['ID', 'Date', 'Location', 'Status', 'Vendor', 'Item', 'Quantity', 'Unit price']
+# Ready exports listed per user.
+LIST_LIMIT = 20
+
+
+def storage():
+    return FileSystemStorage(location=settings.EXPORT_ROOT)
+
+
+def queryset(from_date=None, to_date=None, location_id=None, status=""):
+    """ The records to export, oldest first; ``status`` is the stored spelling. """
+    qs = Record.objects.select_related('vendor', 'item', 'location').order_by('date', 'id')
+    if from_date:
+        qs = qs.filter(date__gte=from_date)
+    if to_date:
+        qs = qs.filter(date__lte=to_date)
+    if location_id is not None:
+        qs = qs.filter(location_id=location_id).using(sharding.alias_for_location(location_id))
+    if status:
+        qs = qs.filter(status=status)
+    return qs
+
+
+def count(qs):
+    """ Number of records in ``qs`` over every record database. """
+    return sum(sharding.fan_out(lambda db_qs: db_qs.count(), sharding.split(qs)))
+
+
+def records(qs):
+    """ Iterates ``qs`` in (date, id) order; sharded exports run in parallel and are merged. """
+    databases = sharding.split(qs)
+    if len(databases) > 1:
+        return sharding.merge(sharding.fan_out(list, databases), sharding.record_order)
+    return qs
+
+
+def filename(from_date, to_date):
+    today = timezone.localdate().isoformat()
+    fd = from_date.isoformat() if from_date else today
+    td = to_date.isoformat() if to_date else today
+    return f"orders-{fd}-{td}.csv"
+
+
+def write_csv(out, rows):
+    writer = csv.writer(out)
+    writer.writerow(HEADER)
+    for r in rows:
+        writer.writerow([
+            r.pk,
+            r.date.isoformat() if r.date else '',
+            r.location.name,
+            r.status,
+            r.vendor.name if r.vendor else '',
+            r.item.item_name if r.item else '',
+            r.quantity,
+            r.unit_price if r.unit_price is not None else '',
+        ])
+
+
+def save(user_id, name, qs):
+    """ Writes the export of ``qs`` for ``user_id``; returns the stored name. """
+    out = io.StringIO()
+    write_csv(out, records(qs))
+    return storage().save(f"{user_id}/{name}", ContentFile(out.getvalue().encode()))
+
+
+def ready(user_id):
+    """ ``[(name, size, modified)]`` of the user's finished exports, newest first. """
+    store = storage()
+    try:
+        _dirs, names = store.listdir(str(user_id))
+    except FileNotFoundError:
+        return []
+    files = [
+        (name, store.size(f"{user_id}/{name}"), store.get_modified_time(f"{user_id}/{name}"))
+        for name in names
+    ]
+    files.sort(key=lambda f: f[2], reverse=True)
+    return files[:LIST_LIMIT]
@@ -1,16 +1,13 @@
 from django import forms
-from .models import Record, VendorItem, Vendor, AdvanceSalary
+from .models import AdvanceSalary, InventoryEntry, Location, Record, Vendor, VendorItem
 
-class RecordForm(forms.ModelForm):
-    LOCATION_CHOICES = [
-        ('Dulari', 'Dulari'),
-        ('Pours and Plates', 'Pours and Plates'),
-        ('Rachels', 'Rachels'),
-        ('Rachels1', 'Rachels1'),
-        ('Rachels2', 'Rachels2')
-    ]
 
-    location = forms.ChoiceField(choices=LOCATION_CHOICES)
+def location_choices():
+    return [(loc.pk, loc.name) for loc in Location.objects.cached()]
+
+
+class RecordForm(forms.ModelForm):
+    location = forms.TypedChoiceField(choices=location_choices, coerce=int)
 
     class Meta:
         model = Record
@@ -53,4 +50,19 @@ class AdvanceSalaryForm(forms.ModelForm):
         a = self.cleaned_data.get("amount")
         if a is None or a <= 0:
             raise forms.ValidationError("Amount must be greater than 0.")
-        return a
\ No newline at end of file
+        return a
+
+
+class InventoryForm(forms.Form):
+    """ A stock count (new on-hand quantity) or usage (quantity used) for one item. """
+    kind = forms.ChoiceField(choices=[(InventoryEntry.COUNT, "Count"), (InventoryEntry.USAGE, "Usage")])
+    item = forms.ModelChoiceField(
+        queryset=VendorItem.objects.select_related("vendor").order_by("vendor__name", "item_name"))
+    quantity = forms.IntegerField(min_value=0, widget=forms.NumberInput(attrs={"min": 0}))
+    note = forms.CharField(max_length=200, required=False)
+
+    def clean(self):
+        cleaned = super().clean()
+        if cleaned.get("kind") == InventoryEntry.USAGE and cleaned.get("quantity") == 0:
+            self.add_error("quantity", "Usage must be at least 1.")
+        return cleaned
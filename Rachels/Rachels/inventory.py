@@ -0,0 +1,173 @@
+"""
+Inventory ledger.
+
+Every stock movement is an InventoryEntry row. StockBalance keeps the running
+on-hand total per (location, item) and is moved in the same transaction as
+the entries, so "what is on hand" is one indexed lookup instead of a sum
+over history.
+
+* Completing orders (``complete_records``) posts a receipt per order line.
+* Stock counts (``post_count``) post the difference to the stored balance.
+* Usage (``post_usage``) posts a negative entry.
+
+Entries and balances live in the location's record database, next to the
+orders they come from (see sharding.py).
+"""
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from . import audit, sharding
+from .models import InventoryEntry, Record, RecordEvent, StockBalance
+
+# (location, item) pairs per balance UPDATE; keeps the CASE expression and
+# its parameters well inside SQLite's limits.
+BALANCE_CHUNK = 200
+# Record ids per status UPDATE.
+ID_CHUNK = 500
+
+
+def _apply(alias, entries):
+    """
+    Saves ``entries`` and moves the stored balances by their quantities.
+    Must run inside a transaction on ``alias``.
+    """
+    if not entries:
+        return
+    InventoryEntry.objects.using(alias).bulk_create(entries)
+
+    deltas = {}
+    for entry in entries:
+        key = (entry.location_id, entry.item_id)
+        deltas[key] = deltas.get(key, 0) + entry.quantity
+
+    balances = StockBalance.objects.using(alias)
+    # Missing rows are created first; on SQLite this insert also takes the
+    # write lock before any balance is read or changed.
+    balances.bulk_create(
+        [StockBalance(location_id=location_id, item_id=item_id) for location_id, item_id in deltas],
+        ignore_conflicts=True,
+    )
+    pairs = list(deltas.items())
+    for i in range(0, len(pairs), BALANCE_CHUNK):
+        chunk = pairs[i:i + BALANCE_CHUNK]
+        matches = [Q(location_id=location_id, item_id=item_id) for (location_id, item_id), _ in chunk]
+        balances.filter(reduce(or_, matches)).update(
+            on_hand=F("on_hand") + Case(
+                *[When(match, then=Value(delta)) for match, (_, delta) in zip(matches, chunk)],
+                default=Value(0),
+            ),
+            updated_at=timezone.now(),
+        )
+
+
+def post(entries):
+    """ Posts unsaved InventoryEntry rows; one transaction per database. """
+    for alias, rows in sharding.group_by_database(entries).items():
+        with transaction.atomic(using=alias):
+            _apply(alias, rows)
+
+
+def receipts_for(records):
+    """ Receipt entries for completed order lines (lines without an item are skipped). """
+    return [
+        InventoryEntry(
+            location_id=r.location_id,
+            item_id=r.item_id,
+            kind=InventoryEntry.RECEIPT,
+            quantity=r.quantity,
+            record_id=r.pk,
+        )
+        for r in records if r.item_id is not None
+    ]
+
+
+def _locked_pending(qs):
+    return list(qs.select_for_update().order_by("pk"))
+
+
+def _complete(qs, actor):
+    with transaction.atomic(using=qs.db):
+        records = _locked_pending(qs)
+        if not records:
+            return []
+        ids = [r.pk for r in records]
+        for i in range(0, len(ids), ID_CHUNK):
+            Record.objects.using(qs.db).filter(pk__in=ids[i:i + ID_CHUNK]).update(status=Record.COMPLETED)
+        for r in records:
+            r.status = Record.COMPLETED
+        _apply(qs.db, receipts_for(records))
+        audit.write(qs.db, audit.events(RecordEvent.STATUS, records, actor,
+                                        old_status=Record.PENDING, new_status=Record.COMPLETED))
+    return records
+
+
+def complete_records(queryset, actor=None):
+    """
+    Marks the live pending records of ``queryset`` completed (soft-deleted
+    ones are skipped, whatever manager ``queryset`` came from), posts their
+    receipts and logs the status change for ``actor``, one transaction per
+    database. Returns the records completed.
+
+    SQLite has no row locks, so two requests completing the same line can
+    both read it as pending; the loser then hits the one-receipt-per-record
+    constraint. Its transaction is rolled back and the lines are read again,
+    so whatever the other request completed is skipped, not re-received.
+    """
+    completed = []
+    for qs in sharding.split(queryset.filter(status=Record.PENDING, deleted_at__isnull=True)):
+        try:
+            records = _complete(qs, actor)
+        except IntegrityError:
+            records = _complete(qs, actor)
+        completed.extend(records)
+    return completed
+
+
+def post_usage(location_id, item_id, quantity, note=""):
+    entry = InventoryEntry(location_id=location_id, item_id=item_id, kind=InventoryEntry.USAGE,
+                           quantity=-quantity, note=note)
+    post([entry])
+    return entry
+
+
+def post_count(location_id, item_id, counted, note=""):
+    """ Records a physical count: the entry is the difference to the stored balance. """
+    alias = sharding.alias_for_location(location_id)
+    with transaction.atomic(using=alias):
+        balances = StockBalance.objects.using(alias)
+        balances.bulk_create([StockBalance(location_id=location_id, item_id=item_id)], ignore_conflicts=True)
+        current = balances.get(location_id=location_id, item_id=item_id).on_hand
+        entry = InventoryEntry(location_id=location_id, item_id=item_id, kind=InventoryEntry.COUNT,
+                               quantity=counted - current, note=note)
+        _apply(alias, [entry])
+    return entry
+
+
+def on_hand(location_id, item_id):
+    """ Stored on-hand quantity (0 for an item never stocked). """
+    balances = StockBalance.objects.using(sharding.alias_for_location(location_id))
+    value = balances.filter(location_id=location_id, item_id=item_id).values_list("on_hand", flat=True).first()
+    return value or 0
+
+
+def balances_for(location_id):
+    """ The location's stock, with vendor and item names, in catalog order. """
+    return (
+        StockBalance.objects.using(sharding.alias_for_location(location_id))
+        .filter(location_id=location_id)
+        .select_related("item__vendor")
+        .order_by("item__vendor__name", "item__item_name")
+    )
+
+
+def recent_entries(location_id, limit=20):
+    return list(
+        InventoryEntry.objects.using(sharding.alias_for_location(location_id))
+        .filter(location_id=location_id)
+        .select_related("item__vendor")
+        .order_by("-created_at", "-pk")[:limit]
+    )
@@ -0,0 +1,144 @@
+"""
+Live dashboard updates pushed over Server-Sent Events.
+
+Views that change records call ``publish_records`` after the change; the
+event is delivered (after the transaction commits) to every open SSE
+stream whose viewer may see that record's location. Each event carries the
+per-location counter deltas plus enough of the record for home.html to
+patch itself in place.
+
+The hub lives in process memory: run the ASGI app as a single process
+(gunicorn_asgi.py does by default) so writers and SSE streams share it.
+"""
+import asyncio
+import json
+import threading
+
+from django.db import transaction
+from django.urls import reverse
+
+from .models import Record
+
+CREATED = "created"
+COMPLETED = "completed"
+DELETED = "deleted"
+# A live line's quantity changed (a new or restored line merged into it).
+UPDATED = "updated"
+
+# Events buffered per connection before it is told to resync (reload).
+SUBSCRIBER_QUEUE_SIZE = 200
+
+
+class Subscription:
+    def __init__(self, locations, loop):
+        # Location ids this stream may see.
+        self.locations = set(locations)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def deliver(self, event):
+        """ Runs on the subscriber's event loop. """
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # The client fell too far behind: drop the backlog and ask it to reload.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class EventHub:
+    """ Fan-out of record events to the connected SSE streams. """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+
+    def subscribe(self, locations):
+        subscription = Subscription(locations, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def has_subscribers(self):
+        return bool(self._subscriptions)
+
+    def publish(self, events):
+        """ Thread-safe: may be called from sync views running in worker threads. """
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for event in events:
+            for sub in subscriptions:
+                if event["location"] in sub.locations:
+                    try:
+                        sub.loop.call_soon_threadsafe(sub.deliver, event)
+                    except RuntimeError:
+                        # Loop already closed; the stream's finally block removes it.
+                        pass
+
+
+hub = EventHub()
+
+
+def _deltas(kind, status):
+    if kind == UPDATED:
+        return {}
+    if kind == CREATED:
+        return {"pending": 1} if status == Record.PENDING else {"completed": 1}
+    if kind == COMPLETED:
+        return {"pending": -1, "completed": 1}
+    return {"pending": -1} if status == Record.PENDING else {"completed": -1}
+
+
+def _serialize(kind, record):
+    return {
+        "type": kind,
+        "location": record.location_id,
+        "deltas": _deltas(kind, record.status),
+        "record": {
+            "id": record.pk,
+            "date": record.date.isoformat() if hasattr(record.date, "isoformat") else str(record.date),
+            "vendor": record.vendor.name if record.vendor else "",
+            "item": record.item.item_name if record.item else "",
+            "quantity": record.quantity,
+            "status": record.status,
+            "url": reverse("record_detail", args=[record.pk]) if kind != DELETED else "",
+        },
+    }
+
+
+def publish_records(kind, records):
+    """
+    Queue ``kind`` events for ``records`` (model instances). Deleted records
+    must be passed before they are deleted (their pk is read here).
+    Delivery happens on transaction commit; nothing is done when this
+    process has no open streams.
+    """
+    if not hub.has_subscribers() or not records:
+        return
+    if kind == DELETED:
+        events = [_serialize(kind, r) for r in records]
+        transaction.on_commit(lambda: hub.publish(events))
+        return
+
+    ids_by_db = {}
+    for r in records:
+        ids_by_db.setdefault(r._state.db, []).append(r.pk)
+
+    def send():
+        for db, ids in ids_by_db.items():
+            fresh = Record.objects.using(db).select_related("vendor", "item").filter(pk__in=ids).order_by("pk")
+            hub.publish([_serialize(kind, r) for r in fresh])
+
+    transaction.on_commit(send)
+
+
+def format_sse(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
@@ -0,0 +1,140 @@
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from ...metrics import QueryRecorder, install_wrappers
+from ...models import Record, VendorItem
+from ...perf import compare_to_baseline, load_baseline, save_baseline
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the main views through the test client and record SQL queries, "
+        "latency and peak memory. Optionally save or compare a JSON baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per view.")
+        parser.add_argument("--user", default=None, help="Superuser to run as (default: first superuser).")
+        parser.add_argument("--save", metavar="PATH", help="Write the results as a baseline JSON file.")
+        parser.add_argument("--baseline", metavar="PATH", help="Compare against this baseline JSON file.")
+        parser.add_argument(
+            "--tolerance", type=float, default=0.25,
+            help="Allowed latency / memory growth vs the baseline (fraction, default 0.25).",
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options["user"])
+        client = Client(HTTP_HOST="localhost")
+        client.force_login(user)
+
+        results = {}
+        for name, request in self.scenarios():
+            results[name] = self.measure(client, request, options["repeat"])
+
+        self.print_table(results)
+
+        if options["save"]:
+            save_baseline(options["save"], {"records": Record.objects.count(), "views": results})
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['save']}"))
+
+        if options["baseline"]:
+            baseline = load_baseline(options["baseline"])
+            if baseline is None:
+                raise CommandError(f"Baseline {options['baseline']} not found.")
+            base_views = baseline.get("views", {})
+            regressions = compare_to_baseline(
+                results, base_views, options["tolerance"], ("median_ms", "peak_kb"),
+            ) + compare_to_baseline(results, base_views, 0, ("queries",))
+            if regressions:
+                for line in regressions:
+                    self.stdout.write(self.style.ERROR(f"REGRESSION {line}"))
+                raise CommandError(f"{len(regressions)} regression(s) against the baseline.")
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
+
+    def get_user(self, username):
+        qs = User.objects.filter(is_superuser=True)
+        if username:
+            qs = qs.filter(username=username)
+        user = qs.order_by("pk").first()
+        if user is None:
+            raise CommandError("No superuser found; create one first (see create_initial_users).")
+        return user
+
+    def scenarios(self):
+        """ (name, callable(client) -> response) pairs for every benchmarked view. """
+        today = timezone.localdate().isoformat()
+        items = list(VendorItem.objects.values_list("pk", "vendor_id")[:5])
+        order = {
+            "date": today,
+            "location": "Rachels",
+            "vendor[]": [v for _i, v in items],
+            "item[]": [i for i, _v in items],
+            "quantity[]": ["1"] * len(items),
+        }
+        return [
+            ("home", lambda c: c.get(reverse("Home"))),
+            ("show_all_records", lambda c: c.get(reverse("show_all_records"))),
+            ("show_all_records_filtered", lambda c: c.get(
+                reverse("show_all_records"), {"location": "Rachels", "status": "Pending"})),
+            ("show_all_records_page_50", lambda c: c.get(reverse("show_all_records"), {"page": 50})),
+            ("export_csv", lambda c: c.get(reverse("export_csv"))),
+            ("add_record", lambda c: c.post(reverse("add_record"), order)),
+        ]
+
+    def measure(self, client, request, repeat):
+        # Warm-up run, also used to count queries.
+        recorder = QueryRecorder()
+        install_wrappers()
+        with recorder.active():
+            response = self.run_once(client, request)
+        if response.status_code >= 400:
+            raise CommandError(f"Request failed with status {response.status_code}")
+        queries = recorder.count
+
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = self.run_once(client, request)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        # Memory is measured separately; tracemalloc slows everything down.
+        tracemalloc.start()
+        try:
+            response = self.run_once(client, request)
+            _current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            "queries": queries,
+            "median_ms": round(statistics.median(timings), 2),
+            "max_ms": round(max(timings), 2),
+            "peak_kb": round(peak / 1024, 1),
+            "bytes": len(response.content) if not response.streaming else 0,
+        }
+
+    @staticmethod
+    def run_once(client, request):
+        """ Run a request inside a rolled-back transaction so writes do not accumulate. """
+        with transaction.atomic():
+            response = request(client)
+            transaction.set_rollback(True)
+        return response
+
+    def print_table(self, results):
+        header = f"{'view':<28}{'queries':>9}{'median ms':>12}{'max ms':>10}{'peak KB':>11}{'bytes':>11}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<28}{r['queries']:>9}{r['median_ms']:>12.2f}{r['max_ms']:>10.2f}"
+                f"{r['peak_kb']:>11.1f}{r['bytes']:>11}"
+            )
@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from ... import digests
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute the per-location and combined daily digests for a date "
+        "(default: today). Re-running replaces that date's digests. Schedule "
+        "it nightly, e.g. from cron after closing time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="Last date to build (YYYY-MM-DD, default today).")
+        parser.add_argument("--days", type=int, default=1, help="Number of dates ending at --date, to backfill.")
+
+    def handle(self, *args, **options):
+        end = timezone.localdate()
+        if options["date"]:
+            end = parse_date(options["date"])
+            if end is None:
+                raise CommandError("--date must be YYYY-MM-DD.")
+        if options["days"] < 1:
+            raise CommandError("--days must be at least 1.")
+
+        for offset in reversed(range(options["days"])):
+            day = end - timedelta(days=offset)
+            built = digests.build(day)
+            self.stdout.write(f"{day}: {len(built)} digests.")
+        self.stdout.write(self.style.SUCCESS(f"Built digests for {options['days']} day(s)."))
@@ -0,0 +1,65 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.template.loaders.cached import Loader as CachedLoader
+
+
+class Command(BaseCommand):
+    help = "Confirm the production settings profile (RACHELS_PROFILE=production) is active."
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Settings profile: {settings.PROFILE}")
+        results = [
+            ("DEBUG is off", not settings.DEBUG),
+            ("Secret key set from RACHELS_SECRET_KEY", not settings.SECRET_KEY.startswith("django-insecure-")),
+            ("Cached template loader", self.uses_cached_loader()),
+            ("GZip middleware", "django.middleware.gzip.GZipMiddleware" in settings.MIDDLEWARE),
+            ("Explicit cache backend", self.cache_works()),
+            ("Cache shared by all worker processes", self.cache_shared()),
+            ("Sessions avoid a database query per request", settings.SESSION_ENGINE in (
+                "django.contrib.sessions.backends.signed_cookies",
+                "django.contrib.sessions.backends.cache",
+                "django.contrib.sessions.backends.cached_db",
+            )),
+            ("Hashed static files collected", self.static_manifest_exists()),
+        ]
+
+        failed = 0
+        for label, ok in results:
+            if ok:
+                self.stdout.write(self.style.SUCCESS(f"  ok    {label}"))
+            else:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"  FAIL  {label}"))
+
+        if failed:
+            raise CommandError(f"{failed} check(s) failed; production profile is not fully active.")
+        self.stdout.write(self.style.SUCCESS("Production profile active."))
+
+    def uses_cached_loader(self):
+        engine = engines["django"].engine
+        return any(isinstance(loader, CachedLoader) for loader in engine.template_loaders) and not settings.DEBUG
+
+    def cache_works(self):
+        backend = settings.CACHES["default"]["BACKEND"]
+        if backend.endswith("DummyCache"):
+            return False
+        try:
+            cache.set("check_profile", "ok", 10)
+            return cache.get("check_profile") == "ok"
+        except Exception:
+            return False
+
+    def cache_shared(self):
+        # Invalidations (catalog version, location list) must reach every worker.
+        backend = settings.CACHES["default"]["BACKEND"]
+        return not backend.endswith("LocMemCache") or getattr(settings, "WORKERS", 1) == 1
+
+    def static_manifest_exists(self):
+        storage = settings.STORAGES["staticfiles"]["BACKEND"]
+        if not storage.endswith("ManifestStaticFilesStorage"):
+            return False
+        return (Path(settings.STATIC_ROOT) / "staticfiles.json").is_file()
@@ -1,7 +1,7 @@
 # yourapp/management/commands/create_initial_users.py
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
-from ...models import ManagerProfile
+from ...models import Location, ManagerProfile
 
 class Command(BaseCommand):
     help = "Create initial admin and five manager users (for development)."
@@ -34,7 +34,7 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.SUCCESS(f"Created user '{uname}' / password '{default_password}'"))
             # ensure ManagerProfile exists and is set
             profile, created = ManagerProfile.objects.get_or_create(user=user)
-            profile.location = loc
+            profile.location, _ = Location.objects.get_or_create(name=loc)
             profile.save()
             self.stdout.write(self.style.SUCCESS(f"Assigned location '{loc}' to '{uname}'"))
 
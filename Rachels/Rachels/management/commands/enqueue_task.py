@@ -0,0 +1,33 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import tasks
+
+
+class Command(BaseCommand):
+    help = (
+        "Queue a registered background task for the run_worker pool, e.g. from "
+        "cron: enqueue_task build_digests date=2024-05-01. Values are parsed as "
+        "JSON when they can be (days=30 is a number), otherwise kept as text."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", help="Task name (see Rachels/tasks.py).")
+        parser.add_argument("options", nargs="*", metavar="key=value", help="Task keyword arguments.")
+
+    def handle(self, *args, **options):
+        payload = {}
+        for option in options["options"]:
+            key, sep, value = option.partition("=")
+            if not sep or not key:
+                raise CommandError(f"Expected key=value, got {option!r}.")
+            try:
+                payload[key] = json.loads(value)
+            except ValueError:
+                payload[key] = value
+        try:
+            task_row = tasks.enqueue(options["name"], **payload)
+        except KeyError as exc:
+            raise CommandError(exc.args[0]) from None
+        self.stdout.write(self.style.SUCCESS(f"Queued {task_row}."))
@@ -0,0 +1,146 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from ... import orders, sharding
+from ...models import AdvanceSalary, Location, Record, Vendor, VendorItem
+
+VENDOR_WORDS = [
+    "Haldiram", "Metro", "Fresh Farms", "Daily Dairy", "Spice Route", "Ocean Catch",
+    "Green Valley", "Baker Street", "Golden Grain", "Royal Meats", "Sunrise Poultry",
+    "Coastal Traders", "Hilltop Produce", "Urban Pantry", "Classic Beverages",
+]
+
+ITEM_WORDS = [
+    "Noodles", "Pasta", "Chicken", "Paneer", "Milk", "Butter", "Cream", "Cheese",
+    "Rice", "Flour", "Sugar", "Salt", "Oil", "Onions", "Tomatoes", "Potatoes",
+    "Garlic", "Ginger", "Coriander", "Chillies", "Lemons", "Eggs", "Bread", "Prawns",
+    "Fish", "Mutton", "Lentils", "Chickpeas", "Yoghurt", "Soda", "Tonic", "Coffee",
+    "Tea", "Napkins", "Foil", "Detergent",
+]
+
+EMPLOYEE_NAMES = [
+    "Aarav", "Vivaan", "Aditya", "Ishaan", "Rohan", "Kabir", "Ananya", "Diya",
+    "Meera", "Priya", "Sana", "Tara", "Arjun", "Neha", "Rahul", "Pooja",
+]
+
+# Busier restaurants order more; keeps per-location counts realistically uneven.
+LOCATION_WEIGHTS = [5, 3, 4, 2, 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic vendors, items, records and advances at a "
+        "configurable scale (for benchmarking)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--records", type=int, default=10000, help="Number of records to create.")
+        parser.add_argument("--vendors", type=int, default=15, help="Number of vendors.")
+        parser.add_argument("--items-per-vendor", type=int, default=12, help="Catalog size per vendor.")
+        parser.add_argument("--advances", type=int, default=500, help="Number of advance salary rows.")
+        parser.add_argument("--days", type=int, default=365, help="Spread record dates over this many days.")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per bulk insert.")
+        parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible data.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        start = time.perf_counter()
+
+        items = self.create_catalog(rng, options["vendors"], options["items_per_vendor"])
+        if not items:
+            self.stdout.write(self.style.ERROR("No vendor items available; nothing generated."))
+            return
+
+        self.create_records(rng, items, options["records"], options["days"], options["batch_size"])
+        self.create_advances(rng, options["advances"], options["days"], options["batch_size"])
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f"Done in {elapsed:.1f}s."))
+
+    def create_catalog(self, rng, vendor_count, items_per_vendor):
+        names = []
+        for i in range(vendor_count):
+            base = VENDOR_WORDS[i % len(VENDOR_WORDS)]
+            names.append(base if i < len(VENDOR_WORDS) else f"{base} {i // len(VENDOR_WORDS) + 1}")
+
+        Vendor.objects.bulk_create([Vendor(name=n) for n in names], ignore_conflicts=True)
+        vendors = list(Vendor.objects.filter(name__in=names))
+
+        existing = set(VendorItem.objects.filter(vendor__in=vendors).values_list("vendor_id", "item_name"))
+        new_items = []
+        for vendor in vendors:
+            for item_name in rng.sample(ITEM_WORDS, min(items_per_vendor, len(ITEM_WORDS))):
+                if (vendor.pk, item_name) not in existing:
+                    new_items.append(VendorItem(vendor=vendor, item_name=item_name))
+        VendorItem.objects.bulk_create(new_items)
+
+        # bulk_create sends no signals: copy the catalog to the shards explicitly.
+        for alias in sharding.shard_aliases():
+            sharding.sync_catalog(alias)
+
+        items = list(VendorItem.objects.filter(vendor__in=vendors).values_list("pk", "vendor_id"))
+        self.stdout.write(f"Catalog: {len(vendors)} vendors, {len(items)} items ({len(new_items)} new).")
+        return items
+
+    def create_records(self, rng, items, total, days, batch_size):
+        locations = Location.objects.cached()
+        if not locations:
+            raise CommandError("No locations found; run migrate first.")
+        weights = LOCATION_WEIGHTS[:len(locations)] + [1] * (len(locations) - len(LOCATION_WEIGHTS))
+        today = timezone.localdate()
+
+        created = 0
+        while created < total:
+            batch = []
+            for _ in range(min(batch_size, total - created)):
+                # Dates skew towards the recent past (exponential age).
+                age = min(int(rng.expovariate(4.0 / max(days, 1))), days - 1) if days > 0 else 0
+                item_id, vendor_id = rng.choice(items)
+                batch.append(Record(
+                    date=today - timedelta(days=age),
+                    location=rng.choices(locations, weights)[0],
+                    vendor_id=vendor_id,
+                    item_id=item_id,
+                    quantity=min(50, int(rng.paretovariate(1.5))),
+                    status=self.pick_status(rng, age),
+                ))
+            for alias, rows in sharding.group_by_database(batch).items():
+                with transaction.atomic(using=alias):
+                    Record.objects.using(alias).bulk_create(
+                        [r for r in rows if r.status != Record.PENDING], batch_size=batch_size)
+                    orders.add_pending(alias, [r for r in rows if r.status == Record.PENDING])
+            created += len(batch)
+            self.stdout.write(f"\rRecords: {created}/{total}", ending="")
+            self.stdout.flush()
+        self.stdout.write("")
+
+    @staticmethod
+    def pick_status(rng, age):
+        """ Recent orders are mostly still pending, old ones almost all completed. """
+        if age < 2:
+            pending = 0.7
+        elif age < 7:
+            pending = 0.25
+        else:
+            pending = 0.02
+        return "Pending" if rng.random() < pending else "Completed"
+
+    def create_advances(self, rng, total, days, batch_size):
+        today = timezone.localdate()
+        rows = [
+            AdvanceSalary(
+                employee_name=rng.choice(EMPLOYEE_NAMES),
+                paid_on=today - timedelta(days=rng.randrange(max(days, 1))),
+                amount=Decimal(rng.randrange(500, 20000, 250)),
+            )
+            for _ in range(total)
+        ]
+        with transaction.atomic():
+            AdvanceSalary.objects.bulk_create(rows, batch_size=batch_size)
+        self.stdout.write(f"Advances: {total}.")
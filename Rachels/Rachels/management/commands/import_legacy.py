@@ -0,0 +1,238 @@
+import csv
+import re
+import sqlite3
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from ... import orders, pricing, sharding
+from ...models import Location, Record, Vendor, VendorItem
+
+LEGACY_DB = settings.BASE_DIR.parent / "22" / "db.sqlite3"
+LEGACY_QUERY = (
+    "SELECT id, date, location, details, status FROM Rachels_record "
+    "WHERE id > ? ORDER BY id LIMIT ?"
+)
+
+# One order line per line of ``details`` (";" also separates lines).
+LINE_SPLIT = re.compile(r"[\r\n;]+")
+# "3 x Metro - Rice" / "Metro - Rice x 3" / "Metro: Rice 3 pcs"
+UNIT = r"(?:x|×|\*|pcs|pc|nos|units?)"
+QUANTITY_FIRST = re.compile(rf"^(?P<qty>\d+)\s*{UNIT}?\s+(?P<rest>\D.*)$", re.I)
+QUANTITY_LAST = re.compile(rf"^(?P<rest>.*?\D)\s*(?:{UNIT}|[:=-]|qty)?\s*(?P<qty>\d+)\s*{UNIT}?\.?$", re.I)
+# "Metro - Rice", "Metro: Rice", "Metro / Rice", "Rice (Metro)", "Rice from Metro"
+VENDOR_ITEM = [
+    re.compile(r"^(?P<vendor>.+?)\s*(?:\s[-–]\s|:|/|\|)\s*(?P<item>.+)$"),
+    re.compile(r"^(?P<item>.+?)\s*\((?P<vendor>[^)]+)\)$"),
+    re.compile(r"^(?P<item>.+?)\s+from\s+(?P<vendor>.+)$", re.I),
+]
+
+
+def _key(name):
+    return " ".join(name.split()).casefold()
+
+
+class NameResolver:
+    """
+    Vendor / item / location lookup by case- and whitespace-insensitive name.
+    The catalog is loaded once and every answer (including misses) is kept,
+    so repeated legacy text costs no queries. With ``create`` set, unknown
+    names are added to the catalog instead of failing.
+    """
+
+    def __init__(self, create=False):
+        self.create = create
+        self.locations = {_key(loc.name): loc.pk for loc in Location.objects.all()}
+        self.vendors = {_key(name): pk for pk, name in Vendor.objects.values_list("pk", "name")}
+        self.items = {}
+        self.vendors_by_item = defaultdict(set)
+        for pk, vendor_id, name in VendorItem.objects.values_list("pk", "vendor_id", "item_name"):
+            self.items.setdefault((vendor_id, _key(name)), pk)
+            self.vendors_by_item[_key(name)].add(vendor_id)
+        self._lines = {}
+        self.created = defaultdict(int)
+
+    def location(self, name):
+        key = _key(name)
+        if key not in self.locations:
+            if not self.create or not key:
+                return None
+            self.locations[key] = Location.objects.get_or_create(name=" ".join(name.split()))[0].pk
+            self.created["locations"] += 1
+        return self.locations[key]
+
+    def vendor(self, name):
+        key = _key(name)
+        if key not in self.vendors:
+            if not self.create:
+                return None
+            self.vendors[key] = Vendor.objects.get_or_create(name=" ".join(name.split()))[0].pk
+            self.created["vendors"] += 1
+        return self.vendors[key]
+
+    def item(self, vendor_id, name):
+        key = (vendor_id, _key(name))
+        if key not in self.items:
+            if not self.create:
+                return None
+            self.items[key] = VendorItem.objects.create(vendor_id=vendor_id, item_name=" ".join(name.split())).pk
+            self.vendors_by_item[key[1]].add(vendor_id)
+            self.created["items"] += 1
+        return self.items[key]
+
+    def line(self, text):
+        """ ``(vendor_id, item_id, quantity)`` for one order line, or an error string. """
+        key = _key(text)
+        if key not in self._lines:
+            self._lines[key] = self._parse(" ".join(text.split()))
+        return self._lines[key]
+
+    def _parse(self, text):
+        match = QUANTITY_FIRST.match(text) or QUANTITY_LAST.match(text)
+        if not match:
+            return "no quantity"
+        quantity = int(match["qty"])
+        if quantity < 1:
+            return "quantity must be at least 1"
+        rest = match["rest"].strip(" -:=*")
+
+        for pattern in VENDOR_ITEM:
+            parts = pattern.match(rest)
+            if parts:
+                vendor_id = self.vendor(parts["vendor"].strip())
+                if vendor_id is None:
+                    return f"unknown vendor {parts['vendor'].strip()!r}"
+                item_id = self.item(vendor_id, parts["item"].strip())
+                if item_id is None:
+                    return f"unknown item {parts['item'].strip()!r} for vendor {parts['vendor'].strip()!r}"
+                return vendor_id, item_id, quantity
+
+        # No separator: "<vendor> <item>", or an item only one vendor sells.
+        key = _key(rest)
+        for vendor_key, vendor_id in self.vendors.items():
+            if key.startswith(vendor_key + " "):
+                item_id = self.items.get((vendor_id, key[len(vendor_key) + 1:]))
+                if item_id is not None:
+                    return vendor_id, item_id, quantity
+        vendor_ids = self.vendors_by_item.get(key, ())
+        if len(vendor_ids) == 1:
+            vendor_id = next(iter(vendor_ids))
+            return vendor_id, self.items[(vendor_id, key)], quantity
+        if vendor_ids:
+            return f"item {rest!r} is sold by several vendors; name the vendor"
+        return f"cannot tell vendor and item apart in {rest!r}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Import orders from the legacy app database (22/db.sqlite3), parsing "
+        "the free-text details into vendor, item and quantity."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--source", default=str(LEGACY_DB), help="Legacy SQLite database.")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Legacy rows read (and inserted) per batch.")
+        parser.add_argument("--after", type=int, default=0, help="Resume after this legacy record id.")
+        parser.add_argument("--create-missing", action="store_true",
+                            help="Add unknown locations, vendors and items to the catalog.")
+        parser.add_argument("--report", help="Write lines that could not be imported to this CSV file.")
+        parser.add_argument("--dry-run", action="store_true", help="Parse and report without writing anything.")
+
+    def handle(self, *args, **options):
+        try:
+            source = sqlite3.connect(f"file:{options['source']}?mode=ro", uri=True)
+            total = source.execute("SELECT COUNT(*) FROM Rachels_record WHERE id > ?", [options["after"]]).fetchone()[0]
+        except sqlite3.Error as exc:
+            raise CommandError(f"Cannot read legacy records from {options['source']}: {exc}")
+
+        resolver = NameResolver(create=options["create_missing"] and not options["dry_run"])
+        statuses = {s.lower(): s for s in (Record.PENDING, Record.COMPLETED)}
+        problems = []
+        read = imported = last_id = 0
+        start = time.perf_counter()
+
+        try:
+            for chunk in self.chunks(source, options["after"], options["chunk_size"]):
+                batch = []
+                for legacy_id, date, location_name, details, status in chunk:
+                    last_id = legacy_id
+                    parsed_date = parse_date(str(date))
+                    location_id = resolver.location(location_name or "")
+                    if parsed_date is None or location_id is None:
+                        reason = "bad date" if parsed_date is None else f"unknown location {location_name!r}"
+                        problems.append((legacy_id, date, location_name, details, reason))
+                        continue
+                    lines = [line.strip() for line in LINE_SPLIT.split(details or "") if line.strip()]
+                    if not lines:
+                        problems.append((legacy_id, date, location_name, details, "empty details"))
+                    for line in lines:
+                        parsed = resolver.line(line)
+                        if isinstance(parsed, str):
+                            problems.append((legacy_id, date, location_name, line, parsed))
+                            continue
+                        vendor_id, item_id, quantity = parsed
+                        batch.append(Record(
+                            date=parsed_date,
+                            location_id=location_id,
+                            vendor_id=vendor_id,
+                            item_id=item_id,
+                            quantity=quantity,
+                            status=statuses.get((status or "").strip().lower(), Record.PENDING),
+                        ))
+
+                if not options["dry_run"]:
+                    pricing.snapshot_prices(batch)
+                    for alias, rows in sharding.group_by_database(batch).items():
+                        with transaction.atomic(using=alias):
+                            Record.objects.using(alias).bulk_create(
+                                [r for r in rows if r.status != Record.PENDING])
+                            # Open orders go through merge-on-write like new ones.
+                            orders.add_pending(alias, [r for r in rows if r.status == Record.PENDING])
+                read += len(chunk)
+                imported += len(batch)
+                self.stdout.write(f"\rLegacy records: {read}/{total}, order lines: {imported}", ending="")
+                self.stdout.flush()
+        finally:
+            source.close()
+            self.stdout.write("")
+
+        self.write_report(problems, options["report"])
+        for kind, count in resolver.created.items():
+            self.stdout.write(f"Created {count} {kind}.")
+        elapsed = time.perf_counter() - start
+        verb = "Would import" if options["dry_run"] else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {imported} order lines from {read} legacy records in {elapsed:.1f}s "
+            f"(last legacy id {last_id}; {len(problems)} not imported)."
+        ))
+
+    @staticmethod
+    def chunks(source, after, size):
+        """ Legacy rows in id order, ``size`` at a time (keyset pagination). """
+        while True:
+            rows = source.execute(LEGACY_QUERY, [after, size]).fetchall()
+            if not rows:
+                return
+            yield rows
+            after = rows[-1][0]
+
+    def write_report(self, problems, path):
+        if not problems:
+            return
+        header = ["legacy_id", "date", "location", "text", "reason"]
+        if path:
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(problems)
+            self.stdout.write(self.style.WARNING(f"{len(problems)} lines not imported; see {path}."))
+            return
+        self.stdout.write(self.style.WARNING(f"{len(problems)} lines not imported:"))
+        for legacy_id, date, location, text, reason in problems[:20]:
+            self.stdout.write(f"  #{legacy_id} {date} {location}: {text!r} ({reason})")
+        if len(problems) > 20:
+            self.stdout.write(f"  ... {len(problems) - 20} more; pass --report FILE for the full list.")
@@ -0,0 +1,93 @@
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from ... import sharding
+from ...models import Record, RecordChange
+
+
+class Command(BaseCommand):
+    help = (
+        "Create / migrate the per-location shard databases listed in "
+        "RACHELS_SHARD_LOCATIONS, copy the catalog into them and optionally "
+        "move each location's existing records out of the default database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--move-records", action="store_true",
+            help="Move the records (and their ledger, history and change feed) of sharded locations into their shard.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per batch when moving rows.")
+
+    def handle(self, *args, **options):
+        if not sharding.enabled():
+            raise CommandError("No shards configured; set RACHELS_SHARD_LOCATIONS (e.g. \"1,3\").")
+
+        for location_id in settings.SHARD_LOCATIONS:
+            alias = sharding.shard_alias(location_id)
+            Path(settings.DATABASES[alias]["NAME"]).parent.mkdir(parents=True, exist_ok=True)
+            call_command("migrate", database=alias, verbosity=0, interactive=False)
+            sharding.reserve_id_range(alias, location_id)
+            sharding.sync_catalog(alias)
+            self.stdout.write(f"{alias}: migrated, catalog synced.")
+            if options["move_records"]:
+                moved = self.move_records(location_id, alias, options["batch_size"])
+                self.stdout.write(f"{alias}: moved {moved} records.")
+
+        self.stdout.write(self.style.SUCCESS(f"{len(settings.SHARD_LOCATIONS)} shard(s) ready."))
+
+    def move_records(self, location_id, alias, batch_size):
+        """
+        Moves the location's rows of every sharded model (same ids) out of
+        default, batch by batch: all models are copied first, then deleted
+        from default children first. Re-running after an interruption
+        resumes (copies ignore rows already there). Returns the number of
+        records moved.
+        """
+        models = moved_models()
+        counts = {}
+        for model in models:
+            counts[model] = self.copy_rows(model, location_id, alias, batch_size)
+        for model in reversed(models):
+            self.delete_rows(model, location_id, batch_size)
+            if model is not Record:
+                self.stdout.write(f"{alias}: moved {counts[model]} {model.__name__} rows.")
+        return counts[Record]
+
+    def copy_rows(self, model, location_id, alias, batch_size):
+        source = model._base_manager.using(DEFAULT_DB_ALIAS).filter(location_id=location_id).order_by("pk")
+        copied, last = 0, None
+        while True:
+            batch = list((source if last is None else source.filter(pk__gt=last))[:batch_size])
+            if not batch:
+                return copied
+            with transaction.atomic(using=alias):
+                model._base_manager.using(alias).bulk_create(batch, ignore_conflicts=True)
+            copied += len(batch)
+            last = batch[-1].pk
+
+    def delete_rows(self, model, location_id, batch_size):
+        source = model._base_manager.using(DEFAULT_DB_ALIAS).filter(location_id=location_id)
+        while True:
+            ids = list(source.order_by("pk").values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                return
+            with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                source.filter(pk__in=ids).delete()
+
+
+def moved_models():
+    """
+    Every model in sharding.SHARDED_MODELS, in copy order: the change feed
+    first (its sequence numbers are kept; the record inserts add newer
+    rows), then records, then the rows that point at records. Deleting in
+    reverse order removes the record delete triggers' rows from default last.
+    """
+    models = [m for m in apps.get_app_config("Rachels").get_models() if m._meta.model_name in sharding.SHARDED_MODELS]
+    first = [RecordChange, Record]
+    return first + [m for m in models if m not in first]
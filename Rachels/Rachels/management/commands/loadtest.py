@@ -0,0 +1,296 @@
+import asyncio
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from io import BytesIO
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import got_request_exception
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from ...models import Location, VendorItem
+from ...perf import compare_to_baseline, load_baseline, percentile, save_baseline
+
+DEFAULT_MIX = "dashboard=4,list=4,order=2,export=1"
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the WSGI or ASGI application with concurrent virtual users "
+        "(dashboard refreshes, list browsing, order submissions, exports) and "
+        "report throughput, latency percentiles and error rates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--server", choices=["wsgi", "asgi"], default="wsgi")
+        parser.add_argument("--users", type=int, default=8, help="Concurrent virtual users.")
+        parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run.")
+        parser.add_argument("--think-time", type=float, default=0.0, help="Pause between a user's requests (s).")
+        parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted scenario mix (default: {DEFAULT_MIX}).")
+        parser.add_argument("--user", default=None, help="Superuser to run as (default: first superuser).")
+        parser.add_argument("--save", metavar="PATH", help="Write the results as a baseline JSON file.")
+        parser.add_argument("--baseline", metavar="PATH", help="Compare against this baseline JSON file.")
+        parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed regression (fraction).")
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options["mix"])
+        unknown = set(mix) - set(self.SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+
+        self.user = self.get_user(options["user"])
+        self.catalog = list(VendorItem.objects.values_list("pk", "vendor_id")[:50])
+        self.locations = [loc.pk for loc in Location.objects.cached()]
+        if "order" in mix and not self.catalog:
+            raise CommandError("No vendor items found; run generate_data first.")
+
+        self.samples = defaultdict(list)   # scenario -> [latency seconds]
+        self.statuses = defaultdict(Counter)
+        self.exceptions = Counter()
+        self.lock = threading.Lock()
+        got_request_exception.connect(self.on_exception)
+
+        self.stdout.write(
+            f"Running {options['users']} {options['server'].upper()} users for {options['duration']:.0f}s, mix {mix}"
+        )
+        start = time.perf_counter()
+        try:
+            if options["server"] == "wsgi":
+                self.run_wsgi(options, mix)
+            else:
+                asyncio.run(self.run_asgi(options, mix))
+        finally:
+            got_request_exception.disconnect(self.on_exception)
+        elapsed = time.perf_counter() - start
+
+        results = self.summarize(elapsed)
+        self.print_report(results)
+
+        if options["save"]:
+            save_baseline(options["save"], {"server": options["server"], "users": options["users"], "results": results})
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['save']}"))
+
+        if options["baseline"]:
+            baseline = load_baseline(options["baseline"])
+            if baseline is None:
+                raise CommandError(f"Baseline {options['baseline']} not found.")
+            regressions = compare_to_baseline(
+                results, baseline.get("results", {}), options["tolerance"],
+                higher_is_worse=("p95_ms", "p99_ms", "error_rate"),
+                lower_is_worse=("throughput",),
+            )
+            if regressions:
+                for line in regressions:
+                    self.stdout.write(self.style.ERROR(f"REGRESSION {line}"))
+                raise CommandError(f"{len(regressions)} regression(s) against the baseline.")
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
+
+    def get_user(self, username):
+        qs = User.objects.filter(is_superuser=True)
+        if username:
+            qs = qs.filter(username=username)
+        user = qs.order_by("pk").first()
+        if user is None:
+            raise CommandError("No superuser found; create one first (see create_initial_users).")
+        return user
+
+    def on_exception(self, sender, request=None, **kwargs):
+        exc = sys.exc_info()[1]
+        with self.lock:
+            self.exceptions[f"{type(exc).__name__}: {exc}" if exc else "unknown"] += 1
+
+    # ------------------------
+    # Virtual user session / requests
+    # ------------------------
+    def new_session(self):
+        """ Cookie header for a freshly logged-in session plus a CSRF token. """
+        client = Client()
+        client.force_login(self.user)
+        csrf = get_random_string(32)
+        cookies = {settings.SESSION_COOKIE_NAME: client.cookies[settings.SESSION_COOKIE_NAME].value,
+                   settings.CSRF_COOKIE_NAME: csrf}
+        return "; ".join(f"{k}={v}" for k, v in cookies.items()), csrf
+
+    SCENARIOS = ("dashboard", "list", "order", "export")
+
+    def build_request(self, scenario, rng):
+        """ (method, path, query string, form body) for one scenario run. """
+        if scenario == "dashboard":
+            return "GET", reverse("Home"), "", b""
+        if scenario == "list":
+            params = {"page": rng.randint(1, 5)}
+            if rng.random() < 0.5:
+                params["location"] = rng.choice(self.locations)
+            if rng.random() < 0.5:
+                params["status"] = rng.choice(["Pending", "Completed"])
+            return "GET", reverse("show_all_records"), urlencode(params), b""
+        if scenario == "export":
+            today = timezone.localdate()
+            params = {"from_date": today.replace(day=1).isoformat(), "to_date": today.isoformat()}
+            return "GET", reverse("export_csv"), urlencode(params), b""
+        lines = rng.sample(self.catalog, min(len(self.catalog), rng.randint(1, 5)))
+        body = urlencode({
+            "date": timezone.localdate().isoformat(),
+            "location": rng.choice(self.locations),
+            "vendor[]": [v for _i, v in lines],
+            "item[]": [i for i, _v in lines],
+            "quantity[]": [str(rng.randint(1, 10)) for _ in lines],
+        }, doseq=True).encode()
+        return "POST", reverse("add_record"), "", body
+
+    def record(self, scenario, latency, status):
+        with self.lock:
+            self.samples[scenario].append(latency)
+            self.statuses[scenario][status] += 1
+
+    # ------------------------
+    # WSGI driver (one thread per user)
+    # ------------------------
+    def run_wsgi(self, options, mix):
+        from Rachels.wsgi import application
+
+        deadline = time.perf_counter() + options["duration"]
+        names, weights = list(mix), list(mix.values())
+
+        def worker(seed):
+            rng = random.Random(seed)
+            cookie, csrf = self.new_session()
+            while time.perf_counter() < deadline:
+                scenario = rng.choices(names, weights)[0]
+                method, path, query, body = self.build_request(scenario, rng)
+                environ = {
+                    "REQUEST_METHOD": method, "PATH_INFO": path, "QUERY_STRING": query,
+                    "SERVER_NAME": "localhost", "SERVER_PORT": "80", "SERVER_PROTOCOL": "HTTP/1.1",
+                    "HTTP_HOST": "localhost", "HTTP_COOKIE": cookie, "HTTP_X_CSRFTOKEN": csrf,
+                    "CONTENT_TYPE": "application/x-www-form-urlencoded", "CONTENT_LENGTH": str(len(body)),
+                    "wsgi.input": BytesIO(body), "wsgi.url_scheme": "http", "wsgi.errors": BytesIO(),
+                    "wsgi.multithread": True, "wsgi.multiprocess": False, "wsgi.run_once": False,
+                    "wsgi.version": (1, 0),
+                }
+                status_holder = []
+                start = time.perf_counter()
+                result = application(environ, lambda status, headers, exc_info=None: status_holder.append(status))
+                try:
+                    for _chunk in result:
+                        pass
+                finally:
+                    if hasattr(result, "close"):
+                        result.close()
+                self.record(scenario, time.perf_counter() - start, int(status_holder[0].split()[0]))
+                if options["think_time"]:
+                    time.sleep(options["think_time"])
+
+        threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(options["users"])]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    # ------------------------
+    # ASGI driver (one task per user)
+    # ------------------------
+    async def run_asgi(self, options, mix):
+        from asgiref.sync import sync_to_async
+        from Rachels.asgi import application
+
+        deadline = time.perf_counter() + options["duration"]
+        names, weights = list(mix), list(mix.values())
+
+        async def worker(seed):
+            rng = random.Random(seed)
+            cookie, csrf = await sync_to_async(self.new_session)()
+            while time.perf_counter() < deadline:
+                scenario = rng.choices(names, weights)[0]
+                method, path, query, body = self.build_request(scenario, rng)
+                scope = {
+                    "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+                    "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+                    "query_string": query.encode(), "root_path": "",
+                    "headers": [
+                        (b"host", b"localhost"), (b"cookie", cookie.encode()),
+                        (b"x-csrftoken", csrf.encode()),
+                        (b"content-type", b"application/x-www-form-urlencoded"),
+                        (b"content-length", str(len(body)).encode()),
+                    ],
+                    "client": ("127.0.0.1", 0), "server": ("localhost", 80),
+                }
+                sent = False
+                status = []
+
+                async def receive():
+                    nonlocal sent
+                    if not sent:
+                        sent = True
+                        return {"type": "http.request", "body": body, "more_body": False}
+                    await asyncio.sleep(3600)
+                    return {"type": "http.disconnect"}
+
+                async def send(message):
+                    if message["type"] == "http.response.start":
+                        status.append(message["status"])
+
+                start = time.perf_counter()
+                await application(scope, receive, send)
+                self.record(scenario, time.perf_counter() - start, status[0] if status else 0)
+                if options["think_time"]:
+                    await asyncio.sleep(options["think_time"])
+
+        await asyncio.gather(*(worker(i) for i in range(options["users"])))
+
+    # ------------------------
+    # Reporting
+    # ------------------------
+    def summarize(self, elapsed):
+        results = {}
+        all_latencies, all_errors = [], 0
+        for scenario, latencies in sorted(self.samples.items()):
+            errors = sum(n for code, n in self.statuses[scenario].items() if code >= 500 or code == 0)
+            results[scenario] = self.stats(latencies, errors, elapsed)
+            all_latencies.extend(latencies)
+            all_errors += errors
+        results["total"] = self.stats(all_latencies, all_errors, elapsed)
+        return results
+
+    @staticmethod
+    def stats(latencies, errors, elapsed):
+        n = len(latencies)
+        return {
+            "requests": n,
+            "throughput": round(n / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "errors": errors,
+            "error_rate": round(errors / n, 4) if n else 0.0,
+        }
+
+    def print_report(self, results):
+        header = f"{'scenario':<12}{'requests':>10}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}{'err %':>8}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<12}{r['requests']:>10}{r['throughput']:>9.2f}{r['p50_ms']:>10.1f}"
+                f"{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['errors']:>8}{r['error_rate'] * 100:>7.1f}%"
+            )
+        if self.exceptions:
+            self.stdout.write("\nServer errors:")
+            for message, count in self.exceptions.most_common(10):
+                locked = " (lock contention)" if "database is locked" in message else ""
+                self.stdout.write(f"  {count:>6}  {message[:160]}{locked}")
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from ... import standing_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the pending records of every standing order due on a date "
+        "(default: today). Safe to re-run: a date already done is skipped. "
+        "Schedule it daily, e.g. from cron shortly after midnight."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="First date to materialize (YYYY-MM-DD, default today).")
+        parser.add_argument("--days", type=int, default=1, help="Number of consecutive dates, to order ahead.")
+
+    def handle(self, *args, **options):
+        start = timezone.localdate()
+        if options["date"]:
+            start = parse_date(options["date"])
+            if start is None:
+                raise CommandError("--date must be YYYY-MM-DD.")
+        if options["days"] < 1:
+            raise CommandError("--days must be at least 1.")
+
+        total = 0
+        for offset in range(options["days"]):
+            day = start + timedelta(days=offset)
+            created = len(standing_orders.materialize(day))
+            total += created
+            self.stdout.write(f"{day}: {created} records.")
+        self.stdout.write(self.style.SUCCESS(f"Materialized {total} standing-order records."))
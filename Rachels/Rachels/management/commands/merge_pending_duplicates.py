@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from ... import orders, sharding
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold pending order lines with the same location, date, vendor and "
+        "item into one line carrying the summed quantity (migration 0014 "
+        "does this once before adding the unique index)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=orders.KEY_CHUNK, help="Duplicate groups per transaction.")
+
+    def handle(self, *args, **options):
+        total = 0
+        for alias in sharding.aliases():
+            deleted = orders.merge_duplicates(alias, batch_size=options["batch_size"])
+            total += deleted
+            self.stdout.write(f"{alias}: {deleted} duplicate lines merged.")
+        self.stdout.write(self.style.SUCCESS(f"Merged {total} duplicate pending lines."))
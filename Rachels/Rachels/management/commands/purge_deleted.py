@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ... import deletion, sharding
+
+
+class Command(BaseCommand):
+    help = (
+        "Hard-delete records soft-deleted more than --days ago, in small "
+        "batches with a pause between them. Schedule it off-hours."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30, help="Keep tombstones this many days (restorable).")
+        parser.add_argument("--batch-size", type=int, default=deletion.ID_CHUNK, help="Records per transaction.")
+        parser.add_argument("--pause", type=float, default=0.2, help="Seconds to wait between batches.")
+
+    def handle(self, *args, **options):
+        if options["days"] < 0 or options["batch_size"] < 1:
+            raise CommandError("--days must be >= 0 and --batch-size >= 1.")
+        before = timezone.now() - timedelta(days=options["days"])
+        total = 0
+        for alias in sharding.aliases():
+            purged = deletion.purge(alias, before, batch_size=options["batch_size"], pause=options["pause"])
+            total += purged
+            self.stdout.write(f"{alias}: {purged} records purged.")
+        self.stdout.write(self.style.SUCCESS(f"Purged {total} records deleted before {before:%Y-%m-%d %H:%M}."))
@@ -0,0 +1,91 @@
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connections
+
+from ... import tasks
+
+logger = logging.getLogger("Rachels.tasks")
+
+
+class Command(BaseCommand):
+    help = "Run background tasks from the database queue (see Rachels/tasks.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=1, help="Worker processes.")
+        parser.add_argument("--threads", type=int, default=2, help="Threads per process.")
+        parser.add_argument(
+            "--visibility-timeout", type=int, default=300,
+            help="Seconds a claimed task stays invisible before another worker may retry it.",
+        )
+        parser.add_argument("--poll-interval", type=float, default=2.0, help="Idle sleep between polls (s).")
+        parser.add_argument("--burst", action="store_true", help="Exit once the queue is empty.")
+
+    def handle(self, *args, **options):
+        stop = multiprocessing.Event()
+
+        def request_stop(signum, frame):
+            stop.set()
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        if options["processes"] <= 1:
+            run_process(0, options, stop)
+            return
+
+        # Children must not inherit open database connections.
+        connections.close_all()
+        ctx = multiprocessing.get_context("fork")
+        children = [
+            ctx.Process(target=run_process, args=(i, options, stop), daemon=False)
+            for i in range(options["processes"])
+        ]
+        for child in children:
+            child.start()
+        self.stdout.write(f"Started {len(children)} worker processes x {options['threads']} threads.")
+        for child in children:
+            child.join()
+
+
+def run_process(index, options, stop):
+    host = f"{socket.gethostname()}:{os.getpid()}"
+    threads = [
+        threading.Thread(target=work_loop, args=(f"{host}/{i}", options, stop), daemon=True)
+        for i in range(options["threads"])
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def work_loop(worker_id, options, stop):
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                task_row = tasks.claim(worker_id, options["visibility_timeout"])
+            except OperationalError:
+                # SQLite writer lock held elsewhere; try again shortly.
+                stop.wait(options["poll_interval"])
+                continue
+            if task_row is None:
+                if options["burst"]:
+                    return
+                stop.wait(options["poll_interval"])
+                continue
+            try:
+                tasks.run(task_row)
+            except OperationalError:
+                # The status write hit the writer lock. The task stays
+                # RUNNING and is retried once its visibility timeout expires.
+                logger.exception("Could not record the outcome of task %s", task_row)
+                stop.wait(options["poll_interval"])
+    finally:
+        connections.close_all()
@@ -0,0 +1,263 @@
+"""
+Request-level timing / SQL instrumentation.
+
+RequestMetricsMiddleware measures every request (latency, number of SQL
+queries, time spent in SQL, response size) and folds the numbers into
+per-URL-name histograms kept in process memory. The histograms are rendered
+in the Prometheus text format by the admin-only ``/metrics`` view.
+
+The hot path only does a couple of perf_counter() calls per query and a
+bisect per histogram, so it is cheap enough to leave on in production.
+Each worker process keeps its own registry; scrape every worker (or run a
+single one) to get the whole picture.
+"""
+import bisect
+import heapq
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# Bucket upper bounds (Prometheus "le" labels). +Inf is implicit.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+SQL_TIME_BUCKETS = LATENCY_BUCKETS
+RESPONSE_SIZE_BUCKETS = (512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608)
+
+UNRESOLVED_VIEW = "<unresolved>"
+
+
+class Histogram:
+    """ Cumulative-bucket histogram, same semantics as a Prometheus histogram. """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        running = 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            running += n
+            yield bound, running
+
+
+class MetricsRegistry:
+    """
+    Holds one histogram per (metric, view) pair.
+    Thread-safe: observations from concurrent requests go through a lock.
+    """
+
+    METRICS = {
+        "rachels_request_duration_seconds": ("Request latency.", LATENCY_BUCKETS),
+        "rachels_request_sql_queries": ("SQL queries per request.", QUERY_COUNT_BUCKETS),
+        "rachels_request_sql_duration_seconds": ("Time spent in SQL per request.", SQL_TIME_BUCKETS),
+        "rachels_response_size_bytes": ("Response body size.", RESPONSE_SIZE_BUCKETS),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def observe(self, view, latency, query_count, sql_time, size):
+        values = (
+            ("rachels_request_duration_seconds", latency),
+            ("rachels_request_sql_queries", query_count),
+            ("rachels_request_sql_duration_seconds", sql_time),
+            ("rachels_response_size_bytes", size),
+        )
+        with self._lock:
+            for metric, value in values:
+                hist = self._histograms.get((metric, view))
+                if hist is None:
+                    hist = self._histograms[(metric, view)] = Histogram(self.METRICS[metric][1])
+                hist.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self):
+        """ Prometheus text exposition format (version 0.0.4). """
+        with self._lock:
+            snapshot = {
+                key: (list(h.cumulative()), h.sum, h.count)
+                for key, h in self._histograms.items()
+            }
+
+        lines = []
+        for metric, (help_text, _buckets) in self.METRICS.items():
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for (name, view), (buckets, total, count) in sorted(snapshot.items()):
+                if name != metric:
+                    continue
+                label = _escape_label(view)
+                for bound, running in buckets:
+                    le = "+Inf" if bound == float("inf") else _format_number(bound)
+                    lines.append(f'{metric}_bucket{{view="{label}",le="{le}"}} {running}')
+                lines.append(f'{metric}_sum{{view="{label}"}} {_format_number(total)}')
+                lines.append(f'{metric}_count{{view="{label}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = MetricsRegistry()
+
+
+# The recorders active in this context, innermost last (bench_views runs
+# the middleware inside its own). asgiref copies the context into the
+# threads sync_to_async runs code in, so under ASGI queries are counted for
+# the right request although they run on a worker thread's connection.
+_active_recorders = ContextVar("metrics_recorders", default=())
+
+
+def _record_sql(execute, sql, params, many, context):
+    recorders = _active_recorders.get()
+    if not recorders:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        for recorder in recorders:
+            recorder.add(sql, elapsed)
+
+
+def _add_wrapper(connection):
+    if _record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_sql)
+
+
+@receiver(connection_created)
+def _wrap_new_connection(sender, connection, **kwargs):
+    _add_wrapper(connection)
+
+
+def install_wrappers():
+    """
+    Adds the counting wrapper to this thread's connections. Connections
+    opened later, in any thread, get it from connection_created.
+    """
+    for conn in connections.all():
+        _add_wrapper(conn)
+
+
+class QueryRecorder:
+    """
+    Counts the queries run while it is active, and their total time.
+    Only the ``keep`` slowest statements are retained (for the slow log).
+    """
+
+    def __init__(self, keep=5):
+        self.count = 0
+        self.duration = 0.0
+        self.keep = keep
+        self._slowest = []  # min-heap of (duration, seq, sql)
+        self._lock = threading.Lock()
+
+    def add(self, sql, elapsed):
+        # An async view may run queries on several threads at once.
+        with self._lock:
+            self.count += 1
+            self.duration += elapsed
+            item = (elapsed, self.count, sql)
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, item)
+            elif elapsed > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+
+    def slowest(self):
+        return [(d, sql) for d, _seq, sql in sorted(self._slowest, reverse=True)]
+
+    @contextmanager
+    def active(self):
+        token = _active_recorders.set((*_active_recorders.get(), self))
+        try:
+            yield self
+        finally:
+            _active_recorders.reset(token)
+
+
+def _response_size(response):
+    if response.streaming:
+        return 0
+    return len(response.content)
+
+
+class RequestMetricsMiddleware:
+    """
+    Records latency, SQL query count / time and response size for every
+    request, labelled by URL name. Requests slower than
+    ``settings.SLOW_REQUEST_THRESHOLD`` seconds are logged together with
+    their slowest queries. Works in both the WSGI and the ASGI stack: the
+    queries are counted on whichever thread's connection runs them.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_threshold = getattr(settings, "SLOW_REQUEST_THRESHOLD", 1.0)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        install_wrappers()
+        with recorder.active():
+            response = self.get_response(request)
+        self.observe(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        # No install_wrappers() here: this is the event loop's thread. The
+        # ORM's threads got the wrapper when their connections were opened.
+        with recorder.active():
+            response = await self.get_response(request)
+        self.observe(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    def observe(self, request, response, recorder, latency):
+        match = getattr(request, "resolver_match", None)
+        view = (match.view_name if match else None) or UNRESOLVED_VIEW
+        registry.observe(view, latency, recorder.count, recorder.duration, _response_size(response))
+
+        if latency >= self.slow_threshold:
+            self.log_slow_request(request, view, latency, recorder)
+
+    def log_slow_request(self, request, view, latency, recorder):
+        top = "\n".join(f"  {d * 1000:.1f} ms  {sql}" for d, sql in recorder.slowest())
+        logger.warning(
+            "Slow request %s %s (%s): %.1f ms, %d queries, %.1f ms SQL\n%s",
+            request.method, request.path, view, latency * 1000,
+            recorder.count, recorder.duration * 1000, top,
+        )
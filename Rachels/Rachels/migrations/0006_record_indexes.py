@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Rachels', '0005_managerprofile'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='record',
+            index=models.Index(fields=['date'], name='record_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='record',
+            index=models.Index(fields=['status', 'date'], name='record_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='record',
+            index=models.Index(fields=['status', 'location'], name='record_status_location_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='record',
+            index=models.Index(fields=['location', 'date'], name='record_location_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='record',
+            index=models.Index(fields=['location', 'status', 'date'], name='record_loc_status_date_idx'),
+        ),
+    ]
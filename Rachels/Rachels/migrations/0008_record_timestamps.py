@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Rachels', '0007_task'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='record',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='record',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='record',
+            index=models.Index(fields=['updated_at'], name='record_updated_at_idx'),
+        ),
+    ]
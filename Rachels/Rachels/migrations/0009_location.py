@@ -0,0 +1,122 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# The locations that were hard-coded in ManagerProfile / RecordForm / views.
+DEFAULT_LOCATIONS = ['Dulari', 'Pours and Plates', 'Rachels', 'Rachels1', 'Rachels2']
+# Stand-in for records saved without a location name.
+UNKNOWN_LOCATION = 'Unknown'
+
+
+def names_to_foreign_keys(apps, schema_editor):
+    Location = apps.get_model('Rachels', 'Location')
+    Record = apps.get_model('Rachels', 'Record')
+    ManagerProfile = apps.get_model('Rachels', 'ManagerProfile')
+
+    Record.objects.filter(location='').update(location=UNKNOWN_LOCATION)
+    names = set(DEFAULT_LOCATIONS)
+    names.update(Record.objects.values_list('location', flat=True).distinct())
+    names.update(ManagerProfile.objects.exclude(location__isnull=True).exclude(location='')
+                 .values_list('location', flat=True).distinct())
+    Location.objects.bulk_create([Location(name=name) for name in sorted(names)], ignore_conflicts=True)
+
+    for location in Location.objects.all():
+        Record.objects.filter(location=location.name).update(location_ref=location)
+        ManagerProfile.objects.filter(location=location.name).update(location_ref=location)
+
+
+def foreign_keys_to_names(apps, schema_editor):
+    Location = apps.get_model('Rachels', 'Location')
+    Record = apps.get_model('Rachels', 'Record')
+    ManagerProfile = apps.get_model('Rachels', 'ManagerProfile')
+
+    for location in Location.objects.all():
+        Record.objects.filter(location_ref=location).update(location=location.name)
+        ManagerProfile.objects.filter(location_ref=location).update(location=location.name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Rachels', '0008_record_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Location',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='record',
+            name='location_ref',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='Rachels.location'),
+        ),
+        migrations.AddField(
+            model_name='managerprofile',
+            name='location_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='Rachels.location'),
+        ),
+        # Nullable while both columns exist, so the migration can be reversed.
+        migrations.AlterField(
+            model_name='record',
+            name='location',
+            field=models.CharField(max_length=100, null=True),
+        ),
+        migrations.RunPython(names_to_foreign_keys, foreign_keys_to_names),
+        migrations.RemoveIndex(
+            model_name='record',
+            name='record_status_location_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='record',
+            name='record_location_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='record',
+            name='record_loc_status_date_idx',
+        ),
+        migrations.RemoveField(
+            model_name='record',
+            name='location',
+        ),
+        migrations.RemoveField(
+            model_name='managerprofile',
+            name='location',
+        ),
+        migrations.RenameField(
+            model_name='record',
+            old_name='location_ref',
+            new_name='location',
+        ),
+        migrations.RenameField(
+            model_name='managerprofile',
+            old_name='location_ref',
+            new_name='location',
+        ),
+        migrations.AlterField(
+            model_name='record',
+            name='location',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='records', to='Rachels.location'),
+        ),
+        migrations.AlterField(
+            model_name='managerprofile',
+            name='location',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='managers', to='Rachels.location'),
+        ),
+        migrations.AddIndex(
+            model_name='record',
+            index=models.Index(fields=['status', 'location'], name='record_status_location_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='record',
+            index=models.Index(fields=['location', 'date'], name='record_location_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='record',
+            index=models.Index(fields=['location', 'status', 'date'], name='record_loc_status_date_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Rachels', '0009_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('receipt', 'Receipt'), ('count', 'Count'), ('usage', 'Usage')], max_length=20)),
+                ('quantity', models.IntegerField()),
+                ('note', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_entries', to='Rachels.vendoritem')),
+                ('location', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='inventory_entries', to='Rachels.location')),
+                ('record', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='inventory_entries', to='Rachels.record')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['location', 'item', 'created_at'], name='inventory_loc_item_time_idx'), models.Index(fields=['location', 'created_at'], name='inventory_loc_time_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('kind', 'receipt')), fields=('record',), name='inventory_one_receipt_per_record')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('on_hand', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_balances', to='Rachels.vendoritem')),
+                ('location', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='stock_balances', to='Rachels.location')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('location', 'item'), name='stock_balance_location_item')],
+            },
+        ),
+    ]
@@ -0,0 +1,123 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Every write to Rachels_record appends to Rachels_recordchange, whichever
+# code path (ORM save, update(), bulk_create, raw SQL) made it. A record
+# moved to another location leaves a tombstone at the old one.
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER rachels_record_change_insert AFTER INSERT ON "Rachels_record" BEGIN
+        INSERT INTO "Rachels_recordchange" (record_id, location_id, op, changed_at)
+        VALUES (NEW.id, NEW.location_id, 'upsert', strftime('%Y-%m-%d %H:%M:%f', 'now'));
+    END
+    """,
+    """
+    CREATE TRIGGER rachels_record_change_update AFTER UPDATE ON "Rachels_record" BEGIN
+        INSERT INTO "Rachels_recordchange" (record_id, location_id, op, changed_at)
+        SELECT OLD.id, OLD.location_id, 'delete', strftime('%Y-%m-%d %H:%M:%f', 'now')
+        WHERE OLD.location_id != NEW.location_id;
+        INSERT INTO "Rachels_recordchange" (record_id, location_id, op, changed_at)
+        VALUES (NEW.id, NEW.location_id, 'upsert', strftime('%Y-%m-%d %H:%M:%f', 'now'));
+    END
+    """,
+    """
+    CREATE TRIGGER rachels_record_change_delete AFTER DELETE ON "Rachels_record" BEGIN
+        INSERT INTO "Rachels_recordchange" (record_id, location_id, op, changed_at)
+        VALUES (OLD.id, OLD.location_id, 'delete', strftime('%Y-%m-%d %H:%M:%f', 'now'));
+    END
+    """,
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS rachels_record_change_insert',
+    'DROP TRIGGER IF EXISTS rachels_record_change_update',
+    'DROP TRIGGER IF EXISTS rachels_record_change_delete',
+]
+
+POSTGRES_TRIGGERS = [
+    """
+    CREATE OR REPLACE FUNCTION rachels_record_change() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO "Rachels_recordchange" (record_id, location_id, op, changed_at)
+            VALUES (OLD.id, OLD.location_id, 'delete', now());
+            RETURN NULL;
+        END IF;
+        IF TG_OP = 'UPDATE' THEN
+            IF OLD.location_id <> NEW.location_id THEN
+                INSERT INTO "Rachels_recordchange" (record_id, location_id, op, changed_at)
+                VALUES (OLD.id, OLD.location_id, 'delete', now());
+            END IF;
+        END IF;
+        INSERT INTO "Rachels_recordchange" (record_id, location_id, op, changed_at)
+        VALUES (NEW.id, NEW.location_id, 'upsert', now());
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER rachels_record_change AFTER INSERT OR UPDATE OR DELETE ON "Rachels_record"
+    FOR EACH ROW EXECUTE FUNCTION rachels_record_change()
+    """,
+]
+POSTGRES_DROP = [
+    'DROP TRIGGER IF EXISTS rachels_record_change ON "Rachels_record"',
+    'DROP FUNCTION IF EXISTS rachels_record_change()',
+]
+
+# Existing records enter the feed as one upsert each, oldest change first.
+BACKFILL = """
+    INSERT INTO "Rachels_recordchange" (record_id, location_id, op, changed_at)
+    SELECT id, location_id, 'upsert', updated_at FROM "Rachels_record" ORDER BY updated_at, id
+"""
+
+
+SUPPORTED_VENDORS = ('sqlite', 'postgresql')
+
+
+def _check_vendor(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in SUPPORTED_VENDORS:
+        raise NotImplementedError(
+            f'The record change feed (Rachels.sync) is kept by database triggers, which exist for SQLite '
+            f'and PostgreSQL only; the {vendor} backend is not supported.'
+        )
+    return vendor
+
+
+def create_triggers(apps, schema_editor):
+    vendor = _check_vendor(schema_editor)
+    schema_editor.execute(BACKFILL, params=None)
+    for sql in SQLITE_TRIGGERS if vendor == 'sqlite' else POSTGRES_TRIGGERS:
+        schema_editor.execute(sql, params=None)
+
+
+def drop_triggers(apps, schema_editor):
+    for sql in SQLITE_DROP if _check_vendor(schema_editor) == 'sqlite' else POSTGRES_DROP:
+        schema_editor.execute(sql, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Rachels', '0010_inventory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('record_id', models.BigIntegerField()),
+                ('op', models.CharField(max_length=10)),
+                ('changed_at', models.DateTimeField()),
+                ('location', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='Rachels.location')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['location', 'seq'], name='record_change_loc_seq_idx')],
+            },
+        ),
+        # Also on the location shards (see sharding.LocationShardRouter.allow_migrate).
+        migrations.RunPython(create_triggers, drop_triggers, hints={'model_name': 'recordchange'}),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Rachels', '0011_record_change_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('record_ids', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('location', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='Rachels.location')),
+            ],
+        ),
+    ]
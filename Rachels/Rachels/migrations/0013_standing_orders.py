@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Rachels', '0012_order_submission'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StandingOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('weekdays', models.CharField(default='0123456', help_text='Days to order on: 0 = Monday ... 6 = Sunday, e.g. 01234.', max_length=7)),
+                ('active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='Rachels.vendoritem')),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='standing_orders', to='Rachels.location')),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='Rachels.vendor')),
+            ],
+            options={
+                'ordering': ['location', 'vendor', 'item'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StandingOrderRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('records', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('location', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='Rachels.location')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('location', 'date'), name='standing_order_run_location_date')],
+            },
+        ),
+    ]
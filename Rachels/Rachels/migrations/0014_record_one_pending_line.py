@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:07
+
+from django.db import migrations, models
+from django.utils import timezone
+
+# Line keys per UPDATE / DELETE.
+CHUNK = 200
+
+
+def merge_pending_duplicates(apps, schema_editor):
+    # Existing duplicates would make the unique index fail to build: fold
+    # each group of pending lines into its oldest, with the summed quantity.
+    Record = apps.get_model('Rachels', 'Record')
+    pending = Record.objects.using(schema_editor.connection.alias).filter(status='Pending')
+    fields = ('location', 'date', 'vendor', 'item')
+    groups = list(
+        pending.values_list(*fields)
+        .annotate(lines=models.Count('pk'), total=models.Sum('quantity'), keep=models.Min('pk'))
+        .filter(lines__gt=1)
+        .values_list(*fields, 'total', 'keep')
+    )
+    for i in range(0, len(groups), CHUNK):
+        chunk = groups[i:i + CHUNK]
+        keeps = [row[-1] for row in chunk]
+        pending.filter(pk__in=keeps).update(
+            quantity=models.Case(*[models.When(pk=row[-1], then=models.Value(row[-2])) for row in chunk]),
+            updated_at=timezone.now(),
+        )
+        same_line = models.Q()
+        for location_id, date, vendor_id, item_id, _total, _keep in chunk:
+            same_line |= models.Q(location_id=location_id, date=date, vendor_id=vendor_id, item_id=item_id)
+        pending.filter(same_line).exclude(pk__in=keeps).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Rachels', '0013_standing_orders'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_pending_duplicates, migrations.RunPython.noop, hints={'model_name': 'record'}),
+        migrations.AddConstraint(
+            model_name='record',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'Pending')), fields=('location', 'date', 'vendor', 'item'), name='record_one_pending_line'),
+        ),
+    ]
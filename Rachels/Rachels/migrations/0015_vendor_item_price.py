@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Rachels', '0014_record_one_pending_line'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='record',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.CreateModel(
+            name='VendorItemPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('effective_from', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prices', to='Rachels.vendoritem')),
+            ],
+            options={
+                'ordering': ['item', '-effective_from'],
+                'constraints': [models.UniqueConstraint(fields=('item', 'effective_from'), name='vendor_item_price_item_from')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Rachels', '0015_vendor_item_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyDigest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('summary', models.JSONField(default=dict)),
+                ('html', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now=True)),
+                ('location', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='digests', to='Rachels.location')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'location'), name='daily_digest_date_location'), models.UniqueConstraint(condition=models.Q(('location__isnull', True)), fields=('date',), name='daily_digest_date_combined')],
+            },
+        ),
+    ]
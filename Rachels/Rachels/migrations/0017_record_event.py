@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:35
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+# The history is append-only: rows may be inserted (and pruned) but never
+# rewritten.
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER rachels_record_event_no_update BEFORE UPDATE ON "Rachels_recordevent" BEGIN
+        SELECT RAISE(ABORT, 'Rachels_recordevent is append-only');
+    END
+    """,
+]
+SQLITE_DROP = ['DROP TRIGGER IF EXISTS rachels_record_event_no_update']
+
+POSTGRES_TRIGGERS = [
+    """
+    CREATE OR REPLACE FUNCTION rachels_record_event_no_update() RETURNS trigger AS $$
+    BEGIN
+        RAISE EXCEPTION 'Rachels_recordevent is append-only';
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER rachels_record_event_no_update BEFORE UPDATE ON "Rachels_recordevent"
+    FOR EACH ROW EXECUTE FUNCTION rachels_record_event_no_update()
+    """,
+]
+POSTGRES_DROP = [
+    'DROP TRIGGER IF EXISTS rachels_record_event_no_update ON "Rachels_recordevent"',
+    'DROP FUNCTION IF EXISTS rachels_record_event_no_update()',
+]
+
+
+def create_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in ('sqlite', 'postgresql'):
+        raise NotImplementedError(f'No append-only trigger for the {vendor} backend.')
+    for sql in SQLITE_TRIGGERS if vendor == 'sqlite' else POSTGRES_TRIGGERS:
+        schema_editor.execute(sql, params=None)
+
+
+def drop_triggers(apps, schema_editor):
+    for sql in SQLITE_DROP if schema_editor.connection.vendor == 'sqlite' else POSTGRES_DROP:
+        schema_editor.execute(sql, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Rachels', '0016_daily_digest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('record_id', models.BigIntegerField()),
+                ('kind', models.CharField(choices=[('created', 'Created'), ('merged', 'Merged'), ('status', 'Status change'), ('deleted', 'Deleted')], max_length=10)),
+                ('old_status', models.CharField(blank=True, max_length=20)),
+                ('new_status', models.CharField(blank=True, max_length=20)),
+                ('quantity', models.IntegerField(blank=True, null=True)),
+                ('actor_id', models.IntegerField(blank=True, null=True)),
+                ('actor_name', models.CharField(blank=True, max_length=150)),
+                ('at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('location', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='Rachels.location')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['record_id', 'at'], name='record_event_record_at_idx'), models.Index(fields=['location', 'at'], name='record_event_loc_at_idx')],
+            },
+        ),
+        # Also on the location shards (see sharding.LocationShardRouter.allow_migrate).
+        migrations.RunPython(create_triggers, drop_triggers, hints={'model_name': 'recordevent'}),
+    ]
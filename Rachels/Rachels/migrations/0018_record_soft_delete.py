@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Rachels', '0017_record_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='record',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='recordevent',
+            name='kind',
+            field=models.CharField(choices=[('created', 'Created'), ('merged', 'Merged'), ('status', 'Status change'), ('deleted', 'Deleted'), ('restored', 'Restored')], max_length=10),
+        ),
+        # The hot indexes become partial: live rows only.
+        migrations.RemoveIndex(
+            model_name='record',
+            name='record_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='record',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['date'], name='record_date_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='record',
+            name='record_status_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='record',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['status', 'date'], name='record_status_date_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='record',
+            name='record_status_location_idx',
+        ),
+        migrations.AddIndex(
+            model_name='record',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['status', 'location'], name='record_status_location_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='record',
+            name='record_location_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='record',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['location', 'date'], name='record_location_date_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='record',
+            name='record_loc_status_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='record',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['location', 'status', 'date'], name='record_loc_status_date_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='record',
+            name='record_updated_at_idx',
+        ),
+        migrations.AddIndex(
+            model_name='record',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['updated_at'], name='record_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='record',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', False)), fields=['deleted_at'], name='record_deleted_at_idx'),
+        ),
+        migrations.RemoveConstraint(
+            model_name='record',
+            name='record_one_pending_line',
+        ),
+        migrations.AddConstraint(
+            model_name='record',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'Pending'), ('deleted_at__isnull', True)), fields=('location', 'date', 'vendor', 'item'), name='record_one_pending_line'),
+        ),
+    ]
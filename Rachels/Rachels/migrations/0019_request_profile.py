@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Rachels', '0018_record_soft_delete'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('view', models.CharField(blank=True, max_length=200)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('username', models.CharField(blank=True, max_length=150)),
+                ('trigger', models.CharField(choices=[('flag', 'Query flag'), ('sampled', 'Sampled')], max_length=10)),
+                ('profiler', models.CharField(choices=[('cprofile', 'cProfile'), ('stacks', 'Sampled stacks')], max_length=10)),
+                ('duration', models.FloatField(help_text='Seconds.')),
+                ('query_count', models.PositiveIntegerField(default=0)),
+                ('sql_duration', models.FloatField(default=0, help_text='Seconds.')),
+                ('summary', models.TextField(blank=True)),
+                ('sql', models.JSONField(default=list)),
+                ('stats', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='request_profile_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.db import migrations
+
+# The change feed's seq is the tablets' sync token, so a row must never
+# become visible after a row with a higher seq. On SQLite writers are
+# serialized by the database lock, so seq order is commit order. On
+# PostgreSQL two transactions can take seq 9 and 10 and commit 10 first; a
+# tablet reading then stores token 10 and never sees 9. The trigger now
+# takes a transaction-scoped advisory lock before appending, so record
+# writers queue behind each other until commit (as they do on SQLite) and
+# seq follows commit order.
+POSTGRES_FUNCTION = """
+    CREATE OR REPLACE FUNCTION rachels_record_change() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_advisory_xact_lock(hashtext('Rachels_recordchange'));
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO "Rachels_recordchange" (record_id, location_id, op, changed_at)
+            VALUES (OLD.id, OLD.location_id, 'delete', now());
+            RETURN NULL;
+        END IF;
+        IF TG_OP = 'UPDATE' THEN
+            IF OLD.location_id <> NEW.location_id THEN
+                INSERT INTO "Rachels_recordchange" (record_id, location_id, op, changed_at)
+                VALUES (OLD.id, OLD.location_id, 'delete', now());
+            END IF;
+        END IF;
+        INSERT INTO "Rachels_recordchange" (record_id, location_id, op, changed_at)
+        VALUES (NEW.id, NEW.location_id, 'upsert', now());
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+"""
+
+# The function as created by 0011.
+POSTGRES_FUNCTION_0011 = POSTGRES_FUNCTION.replace(
+    "        PERFORM pg_advisory_xact_lock(hashtext('Rachels_recordchange'));\n", "")
+
+
+def lock_in_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_FUNCTION, params=None)
+
+
+def unlock_in_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_FUNCTION_0011, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Rachels', '0019_request_profile'),
+    ]
+
+    operations = [
+        migrations.RunPython(lock_in_trigger, unlock_in_trigger, hints={'model_name': 'recordchange'}),
+    ]
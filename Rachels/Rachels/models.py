@@ -1,8 +1,77 @@
 # models.py
+import time
+
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from django.utils import timezone
+
+
+class LocationManager(models.Manager):
+    """
+    The location list is tiny and read on nearly every request, so views take
+    it from the cache (``cached()``) instead of querying; saves and deletes
+    invalidate it.
+    """
+    CACHE_KEY = "rachels:locations"
+
+    def cached(self):
+        locations = cache.get(self.CACHE_KEY)
+        if locations is None:
+            locations = list(self.order_by("name"))
+            cache.set(self.CACHE_KEY, locations, None)
+        return locations
+
+    async def acached(self):
+        locations = await cache.aget(self.CACHE_KEY)
+        if locations is None:
+            locations = [loc async for loc in self.order_by("name")]
+            await cache.aset(self.CACHE_KEY, locations, None)
+        return locations
+
+    def resolve(self, value, locations=None):
+        """
+        Finds a location by primary key or by name (old bookmarks and links
+        still pass names). Returns None when nothing matches.
+        """
+        value = str(value or "").strip()
+        for loc in self.cached() if locations is None else locations:
+            if str(loc.pk) == value or loc.name == value:
+                return loc
+        return None
+
+
+class Location(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+
+    objects = LocationManager()
+
+    def __str__(self):
+        return self.name
+
+
+@receiver([post_save, post_delete], sender=Location)
+def invalidate_location_cache(sender, **kwargs):
+    cache.delete(LocationManager.CACHE_KEY)
+
+
+# Changes whenever a location, vendor or item is saved or deleted; part of
+# the ETags of pages that show catalog names (views._etag callers). Like the
+# location list it relies on a cache shared by all worker processes, which
+# the production settings require once there is more than one.
+CATALOG_VERSION_KEY = "rachels:catalog_version"
+
+
+def catalog_version():
+    return cache.get_or_set(CATALOG_VERSION_KEY, time.time_ns, None)
+
+
+async def acatalog_version():
+    return await cache.aget_or_set(CATALOG_VERSION_KEY, time.time_ns, None)
 
 class Vendor(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -19,20 +88,294 @@ class VendorItem(models.Model):
         return f"{self.vendor.name} - {self.item_name}"
 
 
+class VendorItemPrice(models.Model):
+    """
+    An item's unit price from ``effective_from`` until the next price row.
+    New order lines copy the price in effect on their date (see pricing.py).
+    """
+    item = models.ForeignKey(VendorItem, on_delete=models.CASCADE, related_name="prices")
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    effective_from = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["item", "-effective_from"]
+        constraints = [
+            # Also the "price as of date" index: item = ? AND effective_from <= ?
+            models.UniqueConstraint(fields=["item", "effective_from"], name="vendor_item_price_item_from"),
+        ]
+
+    def __str__(self):
+        return f"{self.item}: {self.unit_price} from {self.effective_from}"
+
+
+class RecordQuerySet(models.QuerySet):
+    """ Keeps ``updated_at`` current on set-based writes, which bypass save(). """
+
+    def update(self, **kwargs):
+        kwargs.setdefault("updated_at", timezone.now())
+        return super().update(**kwargs)
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        if "updated_at" not in fields:
+            fields = [*fields, "updated_at"]
+        return super().bulk_update(objs, fields, batch_size=batch_size)
+
+
+class RecordManager(models.Manager.from_queryset(RecordQuerySet)):
+    """ Live records only: soft-deleted rows (``deleted_at`` set) are left out. """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+# Hot indexes and the pending-line constraint cover live rows only.
+LIVE = models.Q(deleted_at__isnull=True)
+
+
 class Record(models.Model):
+    PENDING = "Pending"
+    COMPLETED = "Completed"
+    # A pending order line is unique on these (see orders.py).
+    LINE_FIELDS = ("location", "date", "vendor", "item")
+
     date = models.DateField()
-    location = models.CharField(max_length=100)
+    # No single-column index: the composite indexes below all lead with location.
+    location = models.ForeignKey(Location, on_delete=models.PROTECT, related_name="records", db_index=False)
 
     vendor = models.ForeignKey(Vendor, on_delete=models.SET_NULL, null=True)
     item = models.ForeignKey(VendorItem, on_delete=models.SET_NULL, null=True)
     quantity = models.PositiveIntegerField(default=1)
+    # Price in effect on ``date`` when the line was entered; None if unpriced.
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
 
-    status = models.CharField(max_length=20, default="Pending")
+    status = models.CharField(max_length=20, default=PENDING)
+
+    # Set on save() and bulk_create(); RecordQuerySet covers update()/bulk_update().
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Soft delete (see deletion.py); purge_deleted removes old tombstones.
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = RecordManager()
+    # Includes soft-deleted rows.
+    all_objects = RecordQuerySet.as_manager()
+
+    class Meta:
+        # Hot query shapes (dashboard, list, export): see tests/test_query_plans.py
+        indexes = [
+            models.Index(fields=["date"], condition=LIVE, name="record_date_idx"),
+            models.Index(fields=["status", "date"], condition=LIVE, name="record_status_date_idx"),
+            models.Index(fields=["status", "location"], condition=LIVE, name="record_status_location_idx"),
+            models.Index(fields=["location", "date"], condition=LIVE, name="record_location_date_idx"),
+            models.Index(fields=["location", "status", "date"], condition=LIVE, name="record_loc_status_date_idx"),
+            # Conditional GET probe: max(updated_at)
+            models.Index(fields=["updated_at"], condition=LIVE, name="record_updated_at_idx"),
+            # Purge: oldest tombstones first. Not ~LIVE: SQLite only uses a
+            # partial index whose WHERE the query's implies, and NOT (x IS
+            # NULL) is not matched to x IS NOT NULL.
+            models.Index(fields=["deleted_at"], condition=models.Q(deleted_at__isnull=False),
+                         name="record_deleted_at_idx"),
+        ]
+        constraints = [
+            # Merge-on-write: a repeated pending line adds to the existing one.
+            models.UniqueConstraint(fields=["location", "date", "vendor", "item"],
+                                    condition=models.Q(status="Pending") & LIVE, name="record_one_pending_line"),
+        ]
 
     def __str__(self):
         return f"{self.vendor} - {self.item} ({self.quantity})"
 
 
+# --- Change feed (see sync.py) ---
+class RecordChange(models.Model):
+    """
+    One row per insert, update or delete of a Record, written by database
+    triggers (migration 0011) so bulk inserts and set-based updates are
+    captured too. ``seq`` never goes backwards and is the clients' sync token.
+    """
+    UPSERT = "upsert"
+    DELETE = "delete"
+
+    seq = models.BigAutoField(primary_key=True)
+    # Plain id: the record may no longer exist (tombstone).
+    record_id = models.BigIntegerField()
+    location = models.ForeignKey(Location, on_delete=models.DO_NOTHING, db_constraint=False,
+                                 db_index=False, related_name="+")
+    op = models.CharField(max_length=10)
+    changed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # The feed query: WHERE location_id = ? AND seq > ? ORDER BY seq
+            models.Index(fields=["location", "seq"], name="record_change_loc_seq_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.seq} {self.op} record {self.record_id}"
+
+
+# --- Order history (see audit.py) ---
+class RecordEvent(models.Model):
+    """
+    Append-only history of order lines: one row per create, merge into an
+    existing line, status change, delete or restore, with who did it and
+    when. Written in bulk in the same transaction as the change; migration
+    0017 makes the table reject UPDATEs.
+    """
+    CREATED = "created"
+    MERGED = "merged"
+    STATUS = "status"
+    DELETED = "deleted"
+    RESTORED = "restored"
+    KIND_CHOICES = [
+        (CREATED, "Created"), (MERGED, "Merged"), (STATUS, "Status change"), (DELETED, "Deleted"),
+        (RESTORED, "Restored"),
+    ]
+
+    # Plain id: the record may no longer exist.
+    record_id = models.BigIntegerField()
+    location = models.ForeignKey(Location, on_delete=models.DO_NOTHING, db_constraint=False,
+                                 db_index=False, related_name="+")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    old_status = models.CharField(max_length=20, blank=True)
+    new_status = models.CharField(max_length=20, blank=True)
+    # Line quantity (created, deleted) or quantity added (merged).
+    quantity = models.IntegerField(null=True, blank=True)
+    # User id and name copied in: the user table is not in the location shards.
+    actor_id = models.IntegerField(null=True, blank=True)
+    actor_name = models.CharField(max_length=150, blank=True)
+    at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["record_id", "at"], name="record_event_record_at_idx"),
+            models.Index(fields=["location", "at"], name="record_event_loc_at_idx"),
+        ]
+
+    def __str__(self):
+        return f"record {self.record_id} {self.kind} by {self.actor_name or 'system'}"
+
+
+class OrderSubmission(models.Model):
+    """
+    One order submitted through the offline queue (sync.submit_orders),
+    remembered by the client-generated idempotency key so a resent order
+    is recognised instead of being inserted twice.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    location = models.ForeignKey(Location, on_delete=models.PROTECT, related_name="+", db_index=False)
+    record_ids = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.key
+
+
+# --- Standing orders (see standing_orders.py) ---
+class StandingOrder(models.Model):
+    """
+    A line a location orders on fixed weekdays. The materialize_standing_orders
+    command turns each day's templates into pending records.
+    """
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name="standing_orders")
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name="+")
+    item = models.ForeignKey(VendorItem, on_delete=models.CASCADE, related_name="+")
+    quantity = models.PositiveIntegerField(default=1)
+    # Digits of date.weekday(): "01234" is Monday to Friday.
+    weekdays = models.CharField(max_length=7, default="0123456",
+                                help_text="Days to order on: 0 = Monday ... 6 = Sunday, e.g. 01234.")
+    active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["location", "vendor", "item"]
+
+    def clean(self):
+        if not self.weekdays or set(self.weekdays) - set("0123456"):
+            raise ValidationError({"weekdays": "Use the digits 0 (Monday) to 6 (Sunday)."})
+        self.weekdays = "".join(sorted(set(self.weekdays)))
+        if self.item_id and self.vendor_id and self.item.vendor_id != self.vendor_id:
+            raise ValidationError({"item": "This item is not sold by the chosen vendor."})
+
+    def __str__(self):
+        return f"{self.location}: {self.item} x{self.quantity} ({self.weekdays})"
+
+
+class StandingOrderRun(models.Model):
+    """
+    Marks a location's standing orders as materialized for a date. Lives
+    with the location's records (sharded), and its unique constraint makes
+    a second run for the same date a no-op.
+    """
+    location = models.ForeignKey(Location, on_delete=models.PROTECT, related_name="+", db_index=False)
+    date = models.DateField()
+    records = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["location", "date"], name="standing_order_run_location_date"),
+        ]
+
+    def __str__(self):
+        return f"{self.location} {self.date}: {self.records} records"
+
+
+# --- Inventory (see inventory.py) ---
+class InventoryEntry(models.Model):
+    """
+    Append-only stock ledger, one row per movement of an item at a
+    location. ``quantity`` is the signed change to the on-hand balance.
+    """
+    RECEIPT = "receipt"
+    COUNT = "count"
+    USAGE = "usage"
+    KIND_CHOICES = [(RECEIPT, "Receipt"), (COUNT, "Count"), (USAGE, "Usage")]
+
+    location = models.ForeignKey(Location, on_delete=models.PROTECT, related_name="inventory_entries", db_index=False)
+    item = models.ForeignKey(VendorItem, on_delete=models.CASCADE, related_name="inventory_entries")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    quantity = models.IntegerField()
+    # The completed order a receipt came from.
+    record = models.ForeignKey(Record, on_delete=models.SET_NULL, null=True, blank=True, related_name="inventory_entries")
+    note = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["location", "item", "created_at"], name="inventory_loc_item_time_idx"),
+            models.Index(fields=["location", "created_at"], name="inventory_loc_time_idx"),
+        ]
+        constraints = [
+            # A completed order is received once, even if two completions race.
+            models.UniqueConstraint(fields=["record"], condition=models.Q(kind="receipt"),
+                                    name="inventory_one_receipt_per_record"),
+        ]
+
+    def __str__(self):
+        return f"{self.location} {self.item}: {self.quantity:+d} ({self.kind})"
+
+
+class StockBalance(models.Model):
+    """ Current on-hand quantity per location and item, kept in step with the ledger. """
+    location = models.ForeignKey(Location, on_delete=models.PROTECT, related_name="stock_balances", db_index=False)
+    item = models.ForeignKey(VendorItem, on_delete=models.CASCADE, related_name="stock_balances")
+    on_hand = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["location", "item"], name="stock_balance_location_item"),
+        ]
+
+    def __str__(self):
+        return f"{self.location} {self.item}: {self.on_hand}"
+
+
 class AdvanceSalary(models.Model):
     employee_name = models.CharField("Name", max_length=200)
     paid_on = models.DateField("Date")
@@ -45,19 +388,53 @@ class AdvanceSalary(models.Model):
         return f"{self.employee_name} — {self.amount} on {self.paid_on}"
 
 
+# --- Daily digests (see digests.py) ---
+class DailyDigest(models.Model):
+    """
+    A day's review for one location, or for all of them (``location`` None),
+    built once by the build_digests command: a JSON summary plus the
+    rendered HTML, so showing a past day is a single row fetch.
+    """
+    date = models.DateField()
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, null=True, blank=True, related_name="digests")
+    summary = models.JSONField(default=dict)
+    html = models.TextField()
+    created_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["date", "location"], name="daily_digest_date_location"),
+            # NULLs are distinct in a unique index: one combined digest per date.
+            models.UniqueConstraint(fields=["date"], condition=models.Q(location__isnull=True),
+                                    name="daily_digest_date_combined"),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.location or 'All locations'}"
+
+
+@receiver([post_save, post_delete], sender=Location)
+@receiver([post_save, post_delete], sender=Vendor)
+@receiver([post_save, post_delete], sender=VendorItem)
+def bump_catalog_version(sender, **kwargs):
+    cache.set(CATALOG_VERSION_KEY, time.time_ns(), None)
+
+
+# Catalog rows are mirrored into the per-location shards (see sharding.py).
+@receiver([post_save, post_delete], sender=Location)
+@receiver([post_save, post_delete], sender=Vendor)
+@receiver([post_save, post_delete], sender=VendorItem)
+def mirror_catalog_to_shards(sender, instance, using, signal, **kwargs):
+    if settings.SHARD_LOCATIONS:
+        from .sharding import mirror_catalog  # sharding imports this module
+        mirror_catalog(sender, instance, using, deleted=signal is post_delete)
+
+
 # --- Manager profile (link user -> location) ---
 class ManagerProfile(models.Model):
-    LOCATION_CHOICES = [
-        ('Dulari', 'Dulari'),
-        ('Pours and Plates', 'Pours and Plates'),
-        ('Rachels', 'Rachels'),
-        ('Rachels1', 'Rachels1'),
-        ('Rachels2', 'Rachels2'),
-    ]
-
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='managerprofile')
     # only meaningful for manager accounts (admin will not have a managerprofile by default)
-    location = models.CharField(max_length=64, choices=LOCATION_CHOICES, blank=True, null=True)
+    location = models.ForeignKey(Location, on_delete=models.SET_NULL, blank=True, null=True, related_name='managers')
 
     def __str__(self):
         return f"{self.user.username} — {self.location or '(no location)'}"
@@ -68,3 +445,73 @@ class ManagerProfile(models.Model):
 def ensure_manager_profile(sender, instance, created, **kwargs):
     if created:
         ManagerProfile.objects.create(user=instance)
+
+
+# --- Request profiles (see profiling.py) ---
+class RequestProfile(models.Model):
+    """
+    One profiled request: the raw profile (``stats``), a text summary of
+    the hottest functions and the SQL timeline. Kept in the local database;
+    only admins can read them.
+    """
+    QUERY_FLAG = "flag"
+    SAMPLED = "sampled"
+    # WSGI requests: marshalled pstats (snakeviz, pstats). ASGI requests:
+    # collapsed stacks from a sampling profiler (speedscope, flamegraph.pl).
+    CPROFILE = "cprofile"
+    STACKS = "stacks"
+
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view = models.CharField(max_length=200, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    username = models.CharField(max_length=150, blank=True)
+    trigger = models.CharField(max_length=10, choices=[(QUERY_FLAG, "Query flag"), (SAMPLED, "Sampled")])
+    profiler = models.CharField(max_length=10, choices=[(CPROFILE, "cProfile"), (STACKS, "Sampled stacks")])
+    duration = models.FloatField(help_text="Seconds.")
+    query_count = models.PositiveIntegerField(default=0)
+    sql_duration = models.FloatField(default=0, help_text="Seconds.")
+    summary = models.TextField(blank=True)
+    # [{"start": s, "duration": s, "alias": ..., "sql": ...}, ...] in execution order.
+    sql = models.JSONField(default=list)
+    stats = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_at"], name="request_profile_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration * 1000:.0f} ms)"
+
+
+# --- Background task queue (see tasks.py / run_worker) ---
+class Task(models.Model):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    # Visibility timeout: a running task whose lock expired is picked up again.
+    locked_until = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="task_status_run_after_idx"),
+            models.Index(fields=["status", "locked_until"], name="task_status_locked_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
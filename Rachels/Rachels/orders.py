@@ -0,0 +1,159 @@
+"""
+Merge-on-write for pending order lines.
+
+A location has at most one pending line per (date, vendor, item), enforced
+by the partial unique index ``record_one_pending_line``. Every path that
+adds order lines (the order form, the offline queue, standing orders, the
+importers) goes through ``add_pending``: a line matching a pending one adds
+its quantity to it instead of inserting a second row.
+
+``merge_duplicates`` folds lines that predate the index into one; ``manage.py
+merge_pending_duplicates`` runs it on demand (migration 0014 has its own
+copy for the historical models).
+"""
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Min, Q, Value, When
+from django.utils import timezone
+
+from . import audit, pricing
+from .models import Record, RecordEvent
+
+# Line keys per lookup / UPDATE; keeps the OR and CASE expressions and their
+# parameters well inside SQLite's limits.
+KEY_CHUNK = 200
+
+
+def line_key(record):
+    return (record.location_id, record.date, record.vendor_id, record.item_id)
+
+
+def _key_q(key):
+    location_id, date, vendor_id, item_id = key
+    return Q(location_id=location_id, date=date, vendor_id=vendor_id, item_id=item_id)
+
+
+def add_quantities(queryset, increments):
+    """ Adds ``{pk: quantity}`` to the rows' quantities, in chunked UPDATEs. """
+    pairs = list(increments.items())
+    for i in range(0, len(pairs), KEY_CHUNK):
+        chunk = pairs[i:i + KEY_CHUNK]
+        queryset.filter(pk__in=[pk for pk, _ in chunk]).update(
+            quantity=F("quantity") + Case(*[When(pk=pk, then=Value(n)) for pk, n in chunk]),
+            updated_at=timezone.now(),
+        )
+
+
+def pending_lines(alias, keys):
+    """ ``{line key: record}`` for the live pending lines on ``alias`` matching ``keys``. """
+    keys = list(keys)
+    pending = Record.objects.using(alias).filter(status=Record.PENDING)
+    existing = {}
+    for i in range(0, len(keys), KEY_CHUNK):
+        matches = pending.filter(reduce(or_, map(_key_q, keys[i:i + KEY_CHUNK])))
+        existing.update((line_key(r), r) for r in matches.only(*Record.LINE_FIELDS, "quantity"))
+    return existing
+
+
+def _add_pending(alias, records, actor):
+    by_key = {}
+    for record in records:
+        by_key.setdefault(line_key(record), []).append(record)
+
+    pending = Record.objects.using(alias).filter(status=Record.PENDING)
+    existing = pending_lines(alias, by_key)
+
+    increments, created = {}, []
+    for key, lines in by_key.items():
+        total = sum(line.quantity for line in lines)
+        if key in existing:
+            increments[existing[key].pk] = total
+            existing[key].quantity += total
+        else:
+            lines[0].quantity = total
+            created.append(lines[0])
+    add_quantities(pending, increments)
+    updated = [existing[key] for key in by_key if key in existing]
+    # A merged line keeps the price it was entered at.
+    pricing.snapshot_prices(created)
+    Record.objects.using(alias).bulk_create(created)
+    audit.write(alias, [
+        *audit.events(RecordEvent.CREATED, created, actor),
+        *audit.events(RecordEvent.MERGED, updated, actor, quantities=increments),
+    ])
+
+    for key, lines in by_key.items():
+        target = existing.get(key, lines[0])
+        for line in lines:
+            if line is not target:
+                line.pk, line.quantity = target.pk, target.quantity
+                line._state.adding, line._state.db = False, alias
+    return created, updated
+
+
+def add_pending(alias, records, actor=None):
+    """
+    Adds new pending ``records`` (all of one database) to ``alias``,
+    merging each into the pending line with the same location, date,
+    vendor and item, if any; new lines get the current unit price
+    (pricing.py) and both are logged for ``actor`` (audit.py). Afterwards
+    every record's ``pk`` and ``quantity`` are those of the line it ended
+    up in. Returns ``(created, updated)``: the records actually inserted,
+    and the pending lines that were already there and got added to.
+    """
+    # Form posts pass strings; line keys must compare equal to the stored ones.
+    fields = [Record._meta.get_field(name) for name in ("location", "date", "vendor", "item", "quantity")]
+    for record in records:
+        for field in fields:
+            setattr(record, field.attname, field.to_python(getattr(record, field.attname)))
+        record.status = Record.PENDING
+    original = [(r.pk, r.quantity) for r in records]
+    try:
+        with transaction.atomic(using=alias):
+            return _add_pending(alias, records, actor)
+    except IntegrityError:
+        # A concurrent writer inserted one of these lines first: merge into it.
+        for record, (pk, quantity) in zip(records, original):
+            record.pk, record.quantity = pk, quantity
+            record._state.adding = True
+        with transaction.atomic(using=alias):
+            return _add_pending(alias, records, actor)
+
+
+def merge_duplicates(alias, batch_size=KEY_CHUNK):
+    """
+    Folds every group of pending lines sharing (location, date, vendor,
+    item) into its oldest line, which gets the summed quantity; the others
+    are deleted outright (a restorable tombstone would add its quantity
+    again) and both are logged (audit.py). Returns the rows deleted.
+    """
+    pending = Record.objects.using(alias).filter(status=Record.PENDING)
+    groups = list(
+        pending.values_list(*Record.LINE_FIELDS)
+        .annotate(lines=Count("pk"), keep=Min("pk"))
+        .filter(lines__gt=1)
+        .values_list(*Record.LINE_FIELDS, "keep")
+    )
+    deleted = 0
+    for i in range(0, len(groups), batch_size):
+        chunk = groups[i:i + batch_size]
+        keep_for = {row[:4]: row[-1] for row in chunk}
+        with transaction.atomic(using=alias):
+            folded = list(
+                pending.filter(reduce(or_, map(_key_q, keep_for))).exclude(pk__in=keep_for.values())
+                .select_for_update().only(*Record.LINE_FIELDS, "quantity", "status")
+            )
+            increments = {}
+            for r in folded:
+                keep = keep_for[line_key(r)]
+                increments[keep] = increments.get(keep, 0) + r.quantity
+            add_quantities(pending, increments)
+            kept = pending.filter(pk__in=list(increments)).only("location")
+            audit.write(alias, [
+                *audit.events(RecordEvent.DELETED, folded),
+                *audit.events(RecordEvent.MERGED, kept, quantities=increments),
+            ])
+            deleted += pending.filter(pk__in=[r.pk for r in folded]).delete()[0]
+    return deleted
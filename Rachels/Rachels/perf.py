@@ -0,0 +1,64 @@
+"""
+Small helpers shared by the benchmark / load-test management commands:
+percentiles and reading, writing and comparing JSON baselines.
+"""
+import json
+import math
+from pathlib import Path
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of ``values`` (need not be sorted).
+    Returns 0.0 for an empty sequence.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def load_baseline(path):
+    path = Path(path)
+    if not path.exists():
+        return None
+    with path.open() as fh:
+        return json.load(fh)
+
+
+def save_baseline(path, data):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w") as fh:
+        json.dump(data, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+
+
+def compare_to_baseline(current, baseline, tolerance, higher_is_worse, lower_is_worse=()):
+    """
+    Compare two ``{name: {metric: value}}`` mappings.
+
+    A metric listed in ``higher_is_worse`` regresses when it grows by more
+    than ``tolerance`` (a fraction, e.g. 0.2 == 20%); one listed in
+    ``lower_is_worse`` regresses when it shrinks by more than that.
+    Returns a list of human readable regression lines.
+    """
+    regressions = []
+    for name, metrics in current.items():
+        base = (baseline or {}).get(name)
+        if not base:
+            continue
+        for key in higher_is_worse:
+            old, new = base.get(key), metrics.get(key)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + tolerance) and new - old > 1e-9:
+                regressions.append(f"{name}: {key} {old:g} -> {new:g}")
+        for key in lower_is_worse:
+            old, new = base.get(key), metrics.get(key)
+            if old is None or new is None:
+                continue
+            if new < old * (1 - tolerance):
+                regressions.append(f"{name}: {key} {old:g} -> {new:g}")
+    return regressions
@@ -0,0 +1,105 @@
+"""
+Vendor price lists and spend.
+
+A VendorItemPrice row gives an item's unit price from ``effective_from``
+on, until the item's next row. New order lines copy the price in effect on
+their date (``snapshot_prices``, called by orders.add_pending), so spend is
+``quantity * unit_price`` summed over Record and later price changes never
+rewrite past orders.
+
+``spend`` aggregates that in the database, per location or vendor and per
+day, week or month, on every record database in parallel; only the
+grouped totals come back.
+"""
+from bisect import bisect_right
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+from . import sharding
+from .models import Location, Vendor, VendorItemPrice
+
+PERIODS = {"day": TruncDay, "week": TruncWeek, "month": TruncMonth}
+GROUPS = {"location": "location_id", "vendor": "vendor_id"}
+# Item ids per price list query.
+ITEM_CHUNK = 500
+
+LINE_TOTAL = ExpressionWrapper(F("quantity") * F("unit_price"), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def price_lists(item_ids, until):
+    """ ``{item id: ([effective_from, ...], [unit_price, ...])}``, oldest first, up to ``until``. """
+    item_ids = sorted(set(item_ids))
+    lists = {}
+    for i in range(0, len(item_ids), ITEM_CHUNK):
+        rows = (
+            VendorItemPrice.objects.filter(item_id__in=item_ids[i:i + ITEM_CHUNK], effective_from__lte=until)
+            .order_by("item_id", "effective_from").values_list("item_id", "effective_from", "unit_price")
+        )
+        for item_id, effective_from, unit_price in rows:
+            dates, prices = lists.setdefault(item_id, ([], []))
+            dates.append(effective_from)
+            prices.append(unit_price)
+    return lists
+
+
+def snapshot_prices(records):
+    """
+    Sets ``unit_price`` on unsaved records that have none to the price in
+    effect on their date, with one price list query for the whole batch.
+    """
+    unpriced = [r for r in records if r.unit_price is None and r.item_id is not None]
+    if not unpriced:
+        return
+    lists = price_lists((r.item_id for r in unpriced), max(r.date for r in unpriced))
+    for record in unpriced:
+        dates, prices = lists.get(record.item_id, ((), ()))
+        i = bisect_right(dates, record.date)
+        if i:
+            record.unit_price = prices[i - 1]
+
+
+def _spend_rows(qs, group_field, trunc):
+    return list(
+        qs.annotate(period=trunc("date"))
+        .values("period", group_field)
+        .annotate(
+            spend=Sum(LINE_TOTAL),
+            quantity=Sum("quantity"),
+            lines=Count("pk"),
+            unpriced=Count("pk", filter=Q(unit_price__isnull=True)),
+        )
+        .order_by()
+    )
+
+
+def spend(queryset, by="location", period="month"):
+    """
+    Spend of the records in ``queryset`` per ``by`` (location or vendor)
+    and ``period`` (day, week or month), newest period first. Each row is a
+    dict with period, key, name, spend, quantity, lines and unpriced (lines
+    without a price, left out of spend).
+    """
+    group_field, trunc = GROUPS[by], PERIODS[period]
+    totals = {}
+    for rows in sharding.fan_out(lambda qs: _spend_rows(qs, group_field, trunc), sharding.split(queryset)):
+        for row in rows:
+            key = (row["period"], row[group_field])
+            total = totals.setdefault(key, {"spend": Decimal("0"), "quantity": 0, "lines": 0, "unpriced": 0})
+            total["spend"] += row["spend"] or 0
+            total["quantity"] += row["quantity"]
+            total["lines"] += row["lines"]
+            total["unpriced"] += row["unpriced"]
+
+    if by == "location":
+        names = {loc.pk: loc.name for loc in Location.objects.cached()}
+    else:
+        names = dict(Vendor.objects.filter(pk__in={k for _, k in totals}).values_list("pk", "name"))
+    result = [
+        {"period": period_start, "key": key, "name": names.get(key, "(none)"), **total}
+        for (period_start, key), total in totals.items()
+    ]
+    result.sort(key=lambda row: row["name"])
+    result.sort(key=lambda row: row["period"], reverse=True)
+    return result
@@ -0,0 +1,266 @@
+"""
+On-demand request profiling.
+
+ProfilingMiddleware profiles a request when a superuser adds
+``?_profile=1`` (``settings.PROFILING_QUERY_FLAG``) to the URL, or at
+random for ``settings.PROFILING_SAMPLE_PERCENT`` percent of all requests.
+A profiled request records
+
+* a profile of the view: cProfile under WSGI; under ASGI, where the view
+  may run on the event loop or in a worker thread, a sampling profiler that
+  walks every thread's stack every few milliseconds;
+* the SQL timeline: every statement with its start offset, duration and
+  database alias, from whichever thread runs it.
+
+The result is stored as a RequestProfile row (local database) and can be
+browsed and downloaded in the admin. Requests that are not profiled pay
+at most one random() call.
+"""
+import cProfile
+import io
+import logging
+import marshal
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .models import RequestProfile
+
+logger = logging.getLogger(__name__)
+
+# Functions listed in the stored summary.
+SUMMARY_LINES = 40
+# Sampling interval of the ASGI profiler (seconds).
+SAMPLE_INTERVAL = 0.002
+# SQL statements kept per profile.
+MAX_SQL = 1000
+
+
+# The timeline of the request being profiled. asgiref copies the context
+# into the threads sync_to_async runs code in, so under ASGI statements are
+# credited to the right request whichever thread (and connection) runs them.
+_active_timeline = ContextVar("profiling_timeline", default=None)
+
+
+def _record_sql(execute, sql, params, many, context):
+    timeline = _active_timeline.get()
+    if timeline is None:
+        return execute(sql, params, many, context)
+    return timeline.record(context["connection"].alias, execute, sql, params, many, context)
+
+
+def _add_wrapper(connection):
+    if _record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_sql)
+
+
+@receiver(connection_created)
+def _wrap_new_connection(sender, connection, **kwargs):
+    _add_wrapper(connection)
+
+
+def install_wrappers():
+    """
+    Adds the recording wrapper to this thread's connections. Connections
+    opened later, in any thread, get it from connection_created.
+    """
+    for conn in connections.all():
+        _add_wrapper(conn)
+
+
+class SqlTimeline:
+    """ Records every statement run while it is active, with its timing. """
+
+    def __init__(self, start):
+        self.start = start
+        self.entries = []
+
+    def record(self, alias, execute, sql, params, many, context):
+        began = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if len(self.entries) < MAX_SQL:
+                self.entries.append({
+                    "start": round(began - self.start, 6),
+                    "duration": round(time.perf_counter() - began, 6),
+                    "alias": alias,
+                    "sql": sql,
+                })
+
+    @contextmanager
+    def active(self):
+        token = _active_timeline.set(self)
+        try:
+            yield self
+        finally:
+            _active_timeline.reset(token)
+
+    @property
+    def duration(self):
+        return sum(entry["duration"] for entry in self.entries)
+
+
+class StackSampler:
+    """
+    Statistical profiler: a background thread records the stacks of all
+    other threads every ``interval`` seconds as collapsed stacks
+    (``frame;frame;frame count``).
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common()).encode()
+
+    def summary(self):
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        samples = sum(self.stacks.values())
+        lines = [f"{samples} samples every {self.interval * 1000:g} ms, all threads", "", "Own samples:"]
+        lines += [f"{n:8d}  {frame}" for frame, n in own.most_common(SUMMARY_LINES // 2)]
+        lines += ["", "Inclusive samples:"]
+        lines += [f"{n:8d}  {frame}" for frame, n in total.most_common(SUMMARY_LINES // 2)]
+        return "\n".join(lines)
+
+
+def _cprofile_summary(profiler):
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(SUMMARY_LINES)
+    return out.getvalue()
+
+
+def _cprofile_dump(profiler):
+    stats = pstats.Stats(profiler)
+    return marshal.dumps(stats.stats)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the selected requests (see module docstring) and stores a
+    RequestProfile. Must come after AuthenticationMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.flag = getattr(settings, "PROFILING_QUERY_FLAG", "_profile")
+        self.sample_rate = getattr(settings, "PROFILING_SAMPLE_PERCENT", 0.0) / 100.0
+        self.keep = getattr(settings, "PROFILING_KEEP", 200)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def trigger(self, request, user):
+        if request.GET.get(self.flag) and user.is_superuser:
+            return RequestProfile.QUERY_FLAG
+        if self.sample_rate and random.random() < self.sample_rate:
+            return RequestProfile.SAMPLED
+        return None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        trigger = self.trigger(request, request.user)
+        if trigger is None:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        timeline = SqlTimeline(start)
+        profiler = cProfile.Profile()
+        install_wrappers()
+        with timeline.active():
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        duration = time.perf_counter() - start
+        self.store(request, request.user, response, trigger, duration, timeline,
+                   RequestProfile.CPROFILE, _cprofile_summary(profiler), _cprofile_dump(profiler))
+        return response
+
+    async def __acall__(self, request):
+        user = await request.auser()
+        trigger = self.trigger(request, user)
+        if trigger is None:
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        timeline = SqlTimeline(start)
+        sampler = StackSampler()
+        # The view's ORM calls run in the request's sync thread, not here.
+        await sync_to_async(install_wrappers)()
+        with timeline.active():
+            sampler.start()
+            try:
+                response = await self.get_response(request)
+            finally:
+                sampler.stop()
+        duration = time.perf_counter() - start
+        await sync_to_async(self.store)(request, user, response, trigger, duration, timeline,
+                                        RequestProfile.STACKS, sampler.summary(), sampler.dump())
+        return response
+
+    def store(self, request, user, response, trigger, duration, timeline, profiler, summary, stats):
+        match = getattr(request, "resolver_match", None)
+        try:
+            RequestProfile.objects.create(
+                method=request.method,
+                path=request.get_full_path()[:500],
+                view=(match.view_name if match else "") or "",
+                status_code=response.status_code,
+                username=user.get_username() if user.is_authenticated else "",
+                trigger=trigger,
+                profiler=profiler,
+                duration=duration,
+                query_count=len(timeline.entries),
+                sql_duration=timeline.duration,
+                summary=summary,
+                sql=timeline.entries,
+                stats=stats,
+            )
+            stale = RequestProfile.objects.order_by("-created_at").values_list("pk", flat=True)[self.keep:]
+            RequestProfile.objects.filter(pk__in=list(stale)).delete()
+        except DatabaseError:
+            # Profiling must never break the request it observed.
+            logger.exception("Could not store the profile of %s %s", request.method, request.path)
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -19,11 +22,20 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
+# Settings profile: 'development' (default) or 'production', chosen with
+# RACHELS_PROFILE. The production overrides are at the end of this file;
+# `manage.py check_profile` confirms they are in effect.
+PROFILE = os.environ.get('RACHELS_PROFILE', 'development')
+PRODUCTION = PROFILE == 'production'
+
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-^x0=%r)90-ubje-48!-2v%h$(2f0bl3^!+2j009x^=*q2)_jxz'
+SECRET_KEY = os.environ.get(
+    'RACHELS_SECRET_KEY',
+    'django-insecure-^x0=%r)90-ubje-48!-2v%h$(2f0bl3^!+2j009x^=*q2)_jxz',
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = not PRODUCTION
 
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
@@ -42,11 +54,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'Rachels.assets.StaticAssetMiddleware',
+    'Rachels.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'Rachels.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -69,9 +84,15 @@ TEMPLATES = [
 ]
 
 ALLOWED_HOSTS = ['localhost', '127.0.0.1', '192.168.131.93']
+if os.environ.get('RACHELS_ALLOWED_HOSTS'):
+    ALLOWED_HOSTS = os.environ['RACHELS_ALLOWED_HOSTS'].split(',')
 
 WSGI_APPLICATION = 'Rachels.wsgi.application'
 
+# Serve the read-heavy views (dashboard, list, detail, JSON APIs) with their
+# async implementations. asgi.py switches this on; leave it off under WSGI.
+ASYNC_VIEWS = os.environ.get('RACHELS_ASYNC_VIEWS', '') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -83,6 +104,25 @@ DATABASES = {
     }
 }
 
+# Optional per-location sharding (see Rachels/sharding.py): each location id
+# listed in RACHELS_SHARD_LOCATIONS (e.g. "1,3") keeps its records in its
+# own SQLite file. Run `manage.py init_shards` after changing the list.
+SHARD_LOCATIONS = [
+    int(location_id) for location_id in os.environ.get('RACHELS_SHARD_LOCATIONS', '').split(',')
+    if location_id.strip()
+]
+for _location_id in SHARD_LOCATIONS:
+    DATABASES[f'location_{_location_id}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'shards' / f'location_{_location_id}.sqlite3',
+    }
+if SHARD_LOCATIONS:
+    DATABASE_ROUTERS = ['Rachels.sharding.LocationShardRouter']
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('django.contrib.auth.middleware.AuthenticationMiddleware') + 1,
+        'Rachels.sharding.ShardMiddleware',
+    )
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -119,8 +159,130 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# With DEBUG off, collectstatic writes content-hashed copies (plus .gz / .br
+# variants) to STATIC_ROOT and Rachels.assets.StaticAssetMiddleware serves
+# them with far-future cache headers. Development (and the test runner) use
+# the plain storage, so no collectstatic run is needed there.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'Rachels.assets.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+
+# CSV exports larger than this many lines are written by the task worker
+# (see exports.py) into EXPORT_ROOT/<user id>/ and listed on the export page.
+EXPORT_INLINE_ROWS = 5000
+EXPORT_ROOT = BASE_DIR / 'exports'
+
+# Request metrics
+# Requests slower than this (seconds) are logged with their slowest queries.
+SLOW_REQUEST_THRESHOLD = 1.0
+# Optional bearer token that lets a Prometheus scraper read /metrics.
+METRICS_TOKEN = ''
+
+# Request profiling (see profiling.py): superusers add ?_profile=1 to a URL;
+# RACHELS_PROFILE_SAMPLE profiles that percentage of all requests.
+PROFILING_QUERY_FLAG = '_profile'
+PROFILING_SAMPLE_PERCENT = float(os.environ.get('RACHELS_PROFILE_SAMPLE', '0') or 0)
+# Stored profiles beyond this many (newest kept) are deleted.
+PROFILING_KEEP = 200
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'Rachels.metrics': {'handlers': ['console'], 'level': 'INFO'},
+        'Rachels.profiling': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Production profile (RACHELS_PROFILE=production)
+
+if PRODUCTION:
+    # Only what production requests need. Static files are served
+    # precompressed by StaticAssetMiddleware, so it sits above GZipMiddleware;
+    # set RACHELS_SERVE_STATIC=0 when a proxy serves STATIC_ROOT and drop it.
+    # The profiler is only stacked in when profiling is asked for
+    # (RACHELS_PROFILING=1 for the ?_profile=1 flag, or a sample rate).
+    MIDDLEWARE = [
+        'django.middleware.gzip.GZipMiddleware',
+        'Rachels.metrics.RequestMetricsMiddleware',
+        'django.middleware.security.SecurityMiddleware',
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.middleware.common.CommonMiddleware',
+        'django.middleware.csrf.CsrfViewMiddleware',
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+        'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    ]
+    if os.environ.get('RACHELS_SERVE_STATIC', '1') == '1':
+        MIDDLEWARE.insert(0, 'Rachels.assets.StaticAssetMiddleware')
+    _after_auth = MIDDLEWARE.index('django.contrib.auth.middleware.AuthenticationMiddleware') + 1
+    if os.environ.get('RACHELS_PROFILING', '') == '1' or PROFILING_SAMPLE_PERCENT:
+        MIDDLEWARE.insert(_after_auth, 'Rachels.profiling.ProfilingMiddleware')
+    if SHARD_LOCATIONS:
+        MIDDLEWARE.insert(_after_auth, 'Rachels.sharding.ShardMiddleware')
+
+    # Compile each template once per process.
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
+    # Server processes (gunicorn_asgi.py reads the same variable).
+    WORKERS = int(os.environ.get('RACHELS_WORKERS', '1'))
+
+    # Shared cache when RACHELS_REDIS_URL is set, otherwise per process.
+    # The catalog version (ETags) and the location list are invalidated by
+    # the process that saved the change, so with a per-process cache the
+    # other workers would keep serving stale names: more than one worker
+    # needs Redis.
+    if os.environ.get('RACHELS_REDIS_URL'):
+        CACHES = {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                'LOCATION': os.environ['RACHELS_REDIS_URL'],
+            },
+        }
+    elif WORKERS > 1:
+        raise ImproperlyConfigured(
+            f'RACHELS_WORKERS={WORKERS} needs a shared cache: set RACHELS_REDIS_URL or run one worker.')
+    else:
+        CACHES = {
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'rachels',
+            },
+        }
+
+    # Sessions live in a signed cookie: no session-table query per request.
+    SESSION_ENGINE = 'django.contrib.sessions.backends.signed_cookies'
+    SESSION_COOKIE_HTTPONLY = True
+
+    # Reuse database connections across requests.
+    for _database in DATABASES.values():
+        _database['CONN_MAX_AGE'] = 60
+        _database['CONN_HEALTH_CHECKS'] = True
+
+    # HTTPS-only cookies once the site is served over TLS.
+    SESSION_COOKIE_SECURE = CSRF_COOKIE_SECURE = os.environ.get('RACHELS_HTTPS', '') == '1'
@@ -0,0 +1,322 @@
+"""
+Optional per-location database sharding.
+
+Listing location ids in RACHELS_SHARD_LOCATIONS (see settings.py) gives each
+of those locations its own SQLite database alias, ``location_<id>``, holding
+its Record rows and inventory ledger; every other location stays in ``default``. Each location
+then has its own writer lock, so order entry at one restaurant never waits
+on another.
+
+* LocationShardRouter sends a new Record to its location's shard and all
+  other Record queries to the shard pinned for the request (a manager's own
+  location, set by ShardMiddleware) or ``default``.
+* The catalog (Location, Vendor, VendorItem) is mirrored into every shard so
+  joins (select_related) stay inside one database; writes go to ``default``
+  and are copied over by ``mirror_catalog`` (see models.py).
+* Admin-wide views use ``split`` / ``fan_out`` to run a query on every
+  record database in parallel and merge the results.
+* Record ids are allocated from a per-shard range (``ID_SPAN``), so a
+  record's shard can be read off its primary key.
+
+With sharding off every helper degrades to the single ``default`` database
+and runs inline.
+"""
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from itertools import islice
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .models import Location, Record, Vendor, VendorItem
+
+# Shard ``location_<id>`` allocates record ids from id * ID_SPAN upwards.
+ID_SPAN = 10 ** 12
+
+# Per-location rows: orders (and their submissions / change feed / history /
+# standing-order runs) and the inventory ledger.
+SHARDED_MODELS = {
+    "record", "recordchange", "recordevent", "ordersubmission", "inventoryentry", "stockbalance",
+    "standingorderrun",
+}
+MIRRORED_MODELS = {"location", "vendor", "vendoritem"}
+CATALOG = (Location, Vendor, VendorItem)
+
+_pinned = ContextVar("rachels_shard", default=None)
+
+
+# ------------------------
+# Shard lookup
+# ------------------------
+def shard_alias(location_id):
+    return f"location_{location_id}"
+
+
+def shard_aliases():
+    return [shard_alias(location_id) for location_id in settings.SHARD_LOCATIONS]
+
+
+def enabled():
+    return bool(settings.SHARD_LOCATIONS)
+
+
+def aliases():
+    """ Every database that may hold Record rows. """
+    return [DEFAULT_DB_ALIAS, *shard_aliases()]
+
+
+def alias_for_location(location_id):
+    if location_id in settings.SHARD_LOCATIONS:
+        return shard_alias(location_id)
+    return DEFAULT_DB_ALIAS
+
+
+def alias_for_record(pk):
+    """
+    Database holding record ``pk``. Ids in a shard's range map directly;
+    smaller ids predate sharding and are looked up (by primary key).
+    """
+    if not enabled():
+        return DEFAULT_DB_ALIAS
+    location_id = pk // ID_SPAN
+    if location_id:
+        return alias_for_location(location_id)
+    for alias in aliases():
+        if Record.all_objects.using(alias).filter(pk=pk).exists():
+            return alias
+    return DEFAULT_DB_ALIAS
+
+
+async def aalias_for_record(pk):
+    """ Async alias_for_record. """
+    if not enabled():
+        return DEFAULT_DB_ALIAS
+    location_id = pk // ID_SPAN
+    if location_id:
+        return alias_for_location(location_id)
+    for alias in aliases():
+        if await Record.all_objects.using(alias).filter(pk=pk).aexists():
+            return alias
+    return DEFAULT_DB_ALIAS
+
+
+def alias_for_user(user):
+    """ Managers are pinned to their location's database; admins span all. """
+    if not enabled() or not user.is_authenticated or user.is_superuser:
+        return None
+    profile = getattr(user, "managerprofile", None)
+    if profile is None or profile.location_id is None:
+        return None
+    return alias_for_location(profile.location_id)
+
+
+def group_by_database(records):
+    """ New per-location rows (Record, InventoryEntry, ...) grouped by their database. """
+    groups = {}
+    for record in records:
+        groups.setdefault(alias_for_location(record.location_id), []).append(record)
+    return groups
+
+
+@contextmanager
+def pinned(alias):
+    token = _pinned.set(alias)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+# ------------------------
+# Fan-out helpers
+# ------------------------
+def split(qs):
+    """
+    The querysets covering every database that may hold rows of ``qs``:
+    ``qs`` itself when it is already bound (``using()``), sharding is off or
+    the request is pinned to one shard; otherwise one copy per database.
+    """
+    if not enabled() or qs._db is not None:
+        return [qs]
+    alias = _pinned.get()
+    if alias is not None:
+        return [qs.using(alias)]
+    return [qs.using(alias) for alias in aliases()]
+
+
+def _run(context, fn, item):
+    try:
+        return context.run(fn, item)
+    finally:
+        connections.close_all()
+
+
+def fan_out(fn, items):
+    """
+    ``[fn(item) for item in items]``, run in parallel threads when there is
+    more than one item (each thread opens its own connections).
+    """
+    items = list(items)
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=len(items)) as pool:
+        futures = [pool.submit(_run, copy_context(), fn, item) for item in items]
+        return [f.result() for f in futures]
+
+
+def merge(lists, key, reverse=False, limit=None):
+    """ Merges individually sorted lists into one sorted list. """
+    merged = heapq.merge(*lists, key=key, reverse=reverse)
+    return list(islice(merged, limit))
+
+
+def record_order(record):
+    return (record.date, record.pk)
+
+
+class MergedRecords:
+    """
+    Paginator-compatible view over the same ordered record query on several
+    databases. Ordering must be newest first, by (date, id). Slicing is lazy;
+    evaluate a slice by iterating it (sync) or with ``alist()`` (async).
+    """
+    ordered = True
+
+    def __init__(self, querysets, start=0, stop=None):
+        self.querysets = querysets
+        self.start, self.stop = start, stop
+        self._result = None
+
+    def count(self):
+        return sum(fan_out(lambda qs: qs.count(), self.querysets))
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step:
+            raise TypeError("MergedRecords only supports plain slices")
+        start = self.start + (index.start or 0)
+        stop = self.stop if index.stop is None else self.start + index.stop
+        return MergedRecords(self.querysets, start, stop)
+
+    def _merge(self, lists):
+        return merge(lists, record_order, reverse=True)[self.start:self.stop]
+
+    def __iter__(self):
+        if self._result is None:
+            # Each database must contribute its first ``stop`` rows.
+            self._result = self._merge(fan_out(lambda qs: list(qs[:self.stop]), self.querysets))
+        return iter(self._result)
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+    async def alist(self):
+        if self._result is None:
+            lists = [[r async for r in qs[:self.stop]] for qs in self.querysets]
+            self._result = self._merge(lists)
+        return self._result
+
+
+# ------------------------
+# Router / middleware
+# ------------------------
+class LocationShardRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.model_name in SHARDED_MODELS:
+            instance = hints.get("instance")
+            if instance is not None and instance._state.db:
+                return instance._state.db
+            return _pinned.get()
+        return None
+
+    def db_for_write(self, model, **hints):
+        if model._meta.model_name in SHARDED_MODELS:
+            instance = hints.get("instance")
+            if instance is not None:
+                return instance._state.db or alias_for_location(instance.location_id)
+            return _pinned.get()
+        if model._meta.model_name in MIRRORED_MODELS:
+            # The catalog is written to default and mirrored from there.
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        names = {obj1._meta.model_name, obj2._meta.model_name}
+        if names <= SHARDED_MODELS | MIRRORED_MODELS:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in shard_aliases():
+            return app_label == "Rachels" and model_name in SHARDED_MODELS | MIRRORED_MODELS
+        return None
+
+
+class ShardMiddleware:
+    """ Pins a manager's requests to their location's database. """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with pinned(alias_for_user(request.user)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        user = await request.auser()
+        alias = await sync_to_async(alias_for_user)(user)
+        with pinned(alias):
+            return await self.get_response(request)
+
+
+# ------------------------
+# Catalog mirroring / shard setup
+# ------------------------
+def mirror_catalog(model, instance, using, deleted=False):
+    """ Copies one catalog change made on ``default`` to every shard. """
+    if using != DEFAULT_DB_ALIAS:
+        return
+    for alias in shard_aliases():
+        manager = model._base_manager.using(alias)
+        if deleted:
+            manager.filter(pk=instance.pk).delete()
+        else:
+            values = {
+                f.attname: getattr(instance, f.attname)
+                for f in model._meta.concrete_fields if not f.primary_key
+            }
+            manager.update_or_create(pk=instance.pk, defaults=values)
+
+
+def sync_catalog(alias):
+    """ Makes the catalog tables of shard ``alias`` match ``default``. """
+    for model in CATALOG:
+        rows = list(model._base_manager.using(DEFAULT_DB_ALIAS).order_by("pk"))
+        fields = [f.name for f in model._meta.concrete_fields if not f.primary_key]
+        model._base_manager.using(alias).bulk_create(
+            rows, update_conflicts=True, unique_fields=["id"], update_fields=fields)
+    # Deletions: children first (VendorItem before Vendor).
+    for model in reversed(CATALOG):
+        keep = model._base_manager.using(DEFAULT_DB_ALIAS).values_list("pk", flat=True)
+        model._base_manager.using(alias).exclude(pk__in=list(keep)).delete()
+
+
+def reserve_id_range(alias, location_id):
+    """ Starts the shard's record ids at its range (SQLite AUTOINCREMENT). """
+    table = Record._meta.db_table
+    floor = location_id * ID_SPAN
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", [table])
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)", [table, floor])
+        elif row[0] < floor:
+            cursor.execute("UPDATE sqlite_sequence SET seq = %s WHERE name = %s", [floor, table])
@@ -0,0 +1,62 @@
+"""
+Standing orders.
+
+A StandingOrder is a line a location orders on fixed weekdays. Once a day
+``materialize`` (run by ``manage.py materialize_standing_orders``) turns
+every template due that day into a pending Record, with one bulk insert per
+database instead of one form post per line.
+
+A StandingOrderRun row per (location, date) records that the day is done.
+It is written in the same transaction as the records, and its unique
+constraint makes a repeated or concurrent run for the same date a no-op.
+"""
+from django.db import IntegrityError, transaction
+
+from . import orders, sharding
+from .models import Record, StandingOrder, StandingOrderRun
+
+
+def due_on(day):
+    """ Active templates due on ``day``. """
+    return StandingOrder.objects.filter(active=True, weekdays__contains=str(day.weekday()))
+
+
+def _materialize(alias, day, templates):
+    with transaction.atomic(using=alias):
+        runs = StandingOrderRun.objects.using(alias)
+        done = set(
+            runs.filter(date=day, location_id__in={t.location_id for t in templates})
+            .values_list("location_id", flat=True)
+        )
+        templates = [t for t in templates if t.location_id not in done]
+        counts = {}
+        for t in templates:
+            counts[t.location_id] = counts.get(t.location_id, 0) + 1
+        # Claim the day first: a concurrent run fails here, before inserting anything.
+        runs.bulk_create([
+            StandingOrderRun(location_id=location_id, date=day, records=count)
+            for location_id, count in counts.items()
+        ])
+        records = [
+            Record(date=day, location_id=t.location_id, vendor_id=t.vendor_id, item_id=t.item_id,
+                   quantity=t.quantity, status=Record.PENDING)
+            for t in templates
+        ]
+        # A line the location already ordered by hand for the day adds to it.
+        return orders.add_pending(alias, records)[0]
+
+
+def materialize(day):
+    """
+    Adds the pending lines of every standing order due on ``day`` at
+    locations not yet materialized for it, merging into lines already
+    pending. Returns the records created.
+    """
+    created = []
+    for alias, templates in sharding.group_by_database(due_on(day).order_by("location_id", "pk")).items():
+        try:
+            created.extend(_materialize(alias, day, templates))
+        except IntegrityError:
+            # Another run claimed one of these locations first: retry, now skipping it.
+            created.extend(_materialize(alias, day, templates))
+    return created
@@ -0,0 +1,180 @@
+// 1. Build Data Map
+const vendorItems = JSON.parse(document.getElementById('vendor-items').textContent);
+
+// 2. Populate Logic
+function populateItemsForRow(selectVendorEl) {
+  const vendorId = selectVendorEl.value;
+  const row = selectVendorEl.closest('.item-row');
+  const itemSelect = row.querySelector('.item-select');
+
+  // Clear and add placeholder
+  itemSelect.innerHTML = '<option value="">Select Item</option>';
+
+  if (vendorId && vendorItems[vendorId]) {
+    vendorItems[vendorId].forEach(it => {
+      const opt = document.createElement('option');
+      opt.value = it.id;
+      opt.textContent = it.name;
+      itemSelect.appendChild(opt);
+    });
+    // Visual flair: flash the item select to show it updated
+    itemSelect.style.borderColor = 'var(--accent)';
+    setTimeout(() => itemSelect.style.borderColor = '', 300);
+  }
+}
+
+// 3. Remove Logic
+function removeItemRow(btn) {
+  const wrap = document.getElementById('itemsWrap');
+  const rows = wrap.querySelectorAll('.item-row');
+
+  // Prevent removing the last row, just clear it
+  if (rows.length <= 1) {
+    const row = btn.closest('.item-row');
+    row.querySelector('.vendor-select').value = '';
+    row.querySelector('.item-select').innerHTML = '<option value="">Select Item</option>';
+    row.querySelector('input[name="quantity[]"]').value = 1;
+    return;
+  }
+
+  // Animate out
+  const row = btn.closest('.item-row');
+  row.style.opacity = '0';
+  row.style.transform = 'scale(0.95)';
+  setTimeout(() => row.remove(), 200);
+}
+
+// 4. Add Row Logic
+document.getElementById('addRowBtn').addEventListener('click', function(){
+  const wrap = document.getElementById('itemsWrap');
+  const div = document.createElement('div');
+  div.className = 'item-row';
+  const vendorOptions = document.querySelector('#itemsWrap .vendor-select').innerHTML;
+
+  div.innerHTML = `
+    <select name="vendor[]" class="form-control vendor-select" required onchange="populateItemsForRow(this)">
+      ${vendorOptions}
+    </select>
+
+    <select name="item[]" class="form-control item-select" required>
+      <option value="">Select Item</option>
+    </select>
+
+    <input type="number" name="quantity[]" class="form-control" min="1" value="1" placeholder="Qty" required />
+
+    <button type="button" class="btn-remove" onclick="removeItemRow(this)" title="Remove item">
+      <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+        <polyline points="3 6 5 6 21 6"></polyline>
+        <path d="M19 6v14a2 2 0 0 1-2 2H7a2 2 0 0 1-2-2V6m3 0V4a2 2 0 0 1 2-2h4a2 2 0 0 1 2 2v2"></path>
+        <line x1="10" y1="11" x2="10" y2="17"></line>
+        <line x1="14" y1="11" x2="14" y2="17"></line>
+      </svg>
+    </button>
+  `;
+  wrap.appendChild(div);
+});
+
+// 5. Init Scripts to ensure styling applies to Django fields
+document.addEventListener('DOMContentLoaded', function() {
+  // Add class 'form-control' to Django-rendered inputs if they don't have it
+  const dateInput = document.querySelector('input[name="date"]');
+  if(dateInput) {
+      dateInput.classList.add('form-control');
+      dateInput.type = 'date'; // Force date picker
+  }
+
+  const locInput = document.querySelector('select[name="location"]');
+  if(locInput) locInput.classList.add('form-control');
+});
+
+// 6. Offline queue: submissions wait in localStorage until the batch
+// endpoint has settled them. Each order keeps its idempotency key across
+// retries, so a resend after a lost response never doubles it.
+(function () {
+  const form = document.getElementById('recordForm');
+  if (!form || !window.fetch || !window.localStorage || !window.JSON) return;
+
+  const QUEUE_KEY = 'rachels:order-queue';
+  const BATCH = 200;  // sync.MAX_BATCH_ORDERS
+  const status = document.getElementById('queue-status');
+  let flushing = null;
+
+  function readQueue() {
+    try { return JSON.parse(localStorage.getItem(QUEUE_KEY)) || []; } catch (e) { return []; }
+  }
+  function writeQueue(queue) {
+    if (queue.length) localStorage.setItem(QUEUE_KEY, JSON.stringify(queue));
+    else localStorage.removeItem(QUEUE_KEY);
+  }
+  function newKey() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2, 12);
+  }
+  function showStatus(text, isError) {
+    if (!status) return;
+    status.hidden = !text;
+    status.textContent = text || '';
+    status.classList.toggle('error', !!isError);
+  }
+  function showPending() {
+    const n = readQueue().length;
+    showStatus(n ? n + ' order(s) saved on this device, waiting to be sent.' : '', false);
+  }
+
+  // Sends the queue in batches; resolves true once it is empty.
+  function flushQueue() {
+    if (flushing) return flushing;
+    const csrf = form.querySelector('input[name="csrfmiddlewaretoken"]').value;
+    flushing = (function next() {
+      const batch = readQueue().slice(0, BATCH);
+      if (!batch.length) return Promise.resolve(true);
+      return fetch(form.dataset.batchUrl, {
+        method: 'POST',
+        credentials: 'same-origin',
+        headers: {'Content-Type': 'application/json', 'X-CSRFToken': csrf},
+        body: JSON.stringify({orders: batch}),
+      })
+        .then(r => { if (!r.ok || r.redirected) throw new Error(r.status); return r.json(); })
+        .then(data => {
+          const settled = new Set(data.results.filter(res => res.status).map(res => res.key));
+          const rejected = data.results.filter(res => res.status === 'invalid');
+          writeQueue(readQueue().filter(order => !settled.has(order.key)));
+          if (rejected.length) showStatus('Rejected: ' + rejected.map(res => res.error).join(' '), true);
+          return next();
+        });
+    })()
+      .catch(() => false)
+      .finally(() => { flushing = null; });
+    return flushing;
+  }
+
+  form.addEventListener('submit', function (e) {
+    e.preventDefault();
+    const data = new FormData(form);
+    const vendors = data.getAll('vendor[]');
+    const items = data.getAll('item[]');
+    const quantities = data.getAll('quantity[]');
+    const lines = [];
+    vendors.forEach((vendor, i) => {
+      if (vendor && items[i] && quantities[i]) lines.push({vendor: vendor, item: items[i], quantity: quantities[i]});
+    });
+    if (!lines.length) return;
+
+    const queue = readQueue();
+    queue.push({key: newKey(), date: data.get('date'), location: data.get('location'), lines: lines});
+    writeQueue(queue);
+    showStatus('', false);
+    flushQueue().then(sent => {
+      if (sent && !(status && status.classList.contains('error'))) {
+        window.location.href = form.dataset.doneUrl;
+        return;
+      }
+      form.reset();
+      if (!sent) showPending();
+    });
+  });
+
+  window.addEventListener('online', () => flushQueue().then(showPending));
+  setInterval(() => { if (navigator.onLine !== false) flushQueue().then(sent => { if (sent) showPending(); }); }, 30000);
+  flushQueue().then(sent => { if (!sent) showPending(); });
+})();
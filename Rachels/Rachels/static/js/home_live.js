@@ -0,0 +1,86 @@
+// Live updates: patch counters and card lists from the SSE stream instead
+// of reloading the whole dashboard.
+(function () {
+  if (!window.EventSource) return;
+  const liveUrl = document.currentScript.dataset.liveUrl;
+
+  function esc(s) {
+    return String(s).replace(/[&<>"']/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c]));
+  }
+
+  function bump(el, delta) {
+    if (el) el.textContent = Math.max(0, (parseInt(el.textContent, 10) || 0) + delta);
+  }
+
+  function prepend(list, html) {
+    if (!list) return;
+    const empty = list.querySelector('[data-live="empty"]');
+    if (empty) empty.remove();
+    list.insertAdjacentHTML('afterbegin', html);
+  }
+
+  function removeRecord(card, id) {
+    if (!card) return;
+    card.querySelectorAll('[data-record-id="' + id + '"]').forEach(el => el.remove());
+  }
+
+  function pendingRow(r) {
+    return '<div data-record-id="' + r.id + '" style="display:flex; justify-content:space-between; margin-bottom:12px; padding-bottom:12px; border-bottom:1px solid rgba(0,0,0,0.03);">' +
+      '<div><div style="font-weight:600; font-size:13px; color:var(--text);">' + esc(r.vendor) + '</div>' +
+      '<div class="muted" style="font-size:12px;">' + esc(r.item) + ' × ' + esc(r.quantity) + '</div></div>' +
+      '<div style="text-align:right; flex-shrink:0;"><span class="badge pending" style="font-size:10px;">' + esc(r.status) + '</span>' +
+      '<div style="margin-top:4px;"><a class="muted" style="font-size:11px; text-decoration:underline;" href="' + esc(r.url) + '">View</a></div></div></div>';
+  }
+
+  function historyRow(r) {
+    return '<div data-record-id="' + r.id + '" style="display:flex; justify-content:space-between; align-items:center; margin-bottom:10px;">' +
+      '<div style="font-size:13px; color:var(--muted);">' + esc(r.vendor) + ' &rarr; ' + esc(r.item) + '</div>' +
+      '<a class="muted" style="font-size:11px;" href="' + esc(r.url) + '">View</a></div>';
+  }
+
+  function applyCounts(ev) {
+    const d = ev.deltas;
+    const card = document.querySelector('[data-live-card="' + CSS.escape(ev.location) + '"]');
+    if (d.pending) {
+      bump(document.querySelector('[data-live="total-pending"]'), d.pending);
+      const row = document.querySelector('[data-live="pending-by-location"] tr[data-location="' + CSS.escape(ev.location) + '"]');
+      if (row) bump(row.querySelector('[data-live="count"]'), d.pending);
+      if (card) bump(card.querySelector('[data-live="pending-count"]'), d.pending);
+    }
+    if (d.completed && card) bump(card.querySelector('[data-live="done-count"]'), d.completed);
+    return card;
+  }
+
+  const source = new EventSource(liveUrl);
+
+  source.addEventListener('created', function (e) {
+    const ev = JSON.parse(e.data);
+    const card = applyCounts(ev);
+    if (card && ev.record.status === 'Pending') prepend(card.querySelector('[data-live="pending-list"]'), pendingRow(ev.record));
+    else if (card) prepend(card.querySelector('[data-live="history-list"]'), historyRow(ev.record));
+  });
+
+  source.addEventListener('completed', function (e) {
+    const ev = JSON.parse(e.data);
+    const card = applyCounts(ev);
+    removeRecord(card, ev.record.id);
+    if (card) prepend(card.querySelector('[data-live="history-list"]'), historyRow(ev.record));
+  });
+
+  source.addEventListener('updated', function (e) {
+    const ev = JSON.parse(e.data);
+    const card = applyCounts(ev);
+    if (!card) return;
+    card.querySelectorAll('[data-live="pending-list"] [data-record-id="' + ev.record.id + '"]')
+      .forEach(el => el.outerHTML = pendingRow(ev.record));
+  });
+
+  source.addEventListener('deleted', function (e) {
+    const ev = JSON.parse(e.data);
+    removeRecord(applyCounts(ev), ev.record.id);
+  });
+
+  source.addEventListener('resync', function () {
+    window.location.reload();
+  });
+})();
@@ -0,0 +1,48 @@
+// Filter / page changes fetch only the results fragment and swap it in.
+(function () {
+  const results = document.getElementById('records-results');
+  const form = document.getElementById('records-filter');
+  if (!results || !window.fetch) return;
+
+  function load(url, push) {
+    const fragmentUrl = new URL(url, window.location.href);
+    fragmentUrl.searchParams.set('format', 'fragment');
+    results.style.opacity = '0.5';
+    return fetch(fragmentUrl, {credentials: 'same-origin'})
+      .then(r => { if (!r.ok) throw new Error(r.status); return r.text(); })
+      .then(html => {
+        results.innerHTML = html;
+        results.style.opacity = '';
+        if (push) history.pushState({records: true}, '', url);
+      })
+      .catch(() => { window.location.href = url; });
+  }
+
+  if (form) {
+    form.addEventListener('submit', function (e) {
+      e.preventDefault();
+      const params = new URLSearchParams(new FormData(form));
+      const month = new URLSearchParams(window.location.search).get('month');
+      if (month) params.set('month', month);
+      for (const [k, v] of Array.from(params.entries())) { if (!v) params.delete(k); }
+      load(window.location.pathname + '?' + params.toString(), true);
+    });
+  }
+
+  // "Select all" ticks every pending row of the current page for bulk completion.
+  results.addEventListener('change', function (e) {
+    if (!e.target.classList.contains('select-all')) return;
+    results.querySelectorAll('input[name="ids"]').forEach(box => { box.checked = e.target.checked; });
+  });
+
+  results.addEventListener('click', function (e) {
+    const link = e.target.closest('.pagination a.page-item');
+    if (!link || e.metaKey || e.ctrlKey || e.shiftKey) return;
+    e.preventDefault();
+    load(link.href, true);
+  });
+
+  window.addEventListener('popstate', function () {
+    load(window.location.href, false);
+  });
+})();
@@ -0,0 +1,231 @@
+"""
+Delta sync for the kitchen tablets, and the offline order queue.
+
+Database triggers append every insert, update and delete of a record to
+RecordChange (migration 0011). Its ``seq`` is the sync token. A tablet keeps
+the token from its last response and asks what changed at its location
+since then. The answer costs one range scan of record_change_loc_seq_idx
+plus a primary-key lookup of the records still alive. Tokens rely on seq
+following commit order: SQLite serializes writers, and on PostgreSQL the
+trigger queues record writers on an advisory lock (migration 0020).
+
+The order form queues submissions in the browser while offline and sends
+them in batches (``submit_orders``). Each order carries a client-generated
+idempotency key. OrderSubmission keeps the keys under a unique index, so a
+batch resent after a dropped response never doubles an order.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_date
+
+from . import orders as order_lines, sharding
+from .models import Location, OrderSubmission, Record, RecordChange, VendorItem
+
+FEED_LIMIT = 500
+# Superseded change rows deleted per statement when compacting.
+COMPACT_BATCH = 500
+
+
+def changes_since(location_id, since=0, limit=FEED_LIMIT):
+    """
+    What changed at ``location_id`` after token ``since``:
+
+    * ``upserts``: records created or updated, in their current state;
+    * ``deletes``: ids of records deleted (or moved to another location);
+    * ``token``: pass it as ``since`` next time; ``more`` means call again now;
+    * ``reset``: the token is unknown here, so the client must resync from 0.
+    """
+    alias = sharding.alias_for_location(location_id)
+    changes = RecordChange.objects.using(alias)
+    rows = list(
+        changes.filter(location_id=location_id, seq__gt=since)
+        .order_by("seq").values_list("seq", "record_id", "op")[:limit]
+    )
+    if not rows:
+        newest = changes.aggregate(newest=Max("seq"))["newest"] or 0
+        return {"token": since, "more": False, "reset": since > newest, "upserts": [], "deletes": []}
+
+    latest = {}
+    for _seq, record_id, op in rows:
+        latest.pop(record_id, None)
+        latest[record_id] = op  # a record's last change in the window wins
+    upsert_ids = [record_id for record_id, op in latest.items() if op == RecordChange.UPSERT]
+    records = Record.objects.using(alias).filter(pk__in=upsert_ids, location_id=location_id)
+    alive = {r.pk: r for r in records.select_related("location", "vendor", "item")}
+    return {
+        "token": rows[-1][0],
+        "more": len(rows) == limit,
+        "reset": False,
+        "upserts": [alive[record_id] for record_id in upsert_ids if record_id in alive],
+        # Gone since (its later change is further on in the feed): a tombstone now.
+        "deletes": [record_id for record_id in latest if record_id not in alive],
+    }
+
+
+def compact(alias):
+    """
+    Deletes change rows superseded by a later change of the same record at
+    the same location. No client loses anything: the later row carries the
+    record's current state (or its tombstone). Returns the rows deleted.
+    """
+    seen = set()
+    superseded = []
+    rows = RecordChange.objects.using(alias).order_by("-seq").values_list("seq", "record_id", "location_id")
+    for seq, record_id, location_id in rows.iterator(chunk_size=5000):
+        key = (record_id, location_id)
+        if key in seen:
+            superseded.append(seq)
+        else:
+            seen.add(key)
+
+    for i in range(0, len(superseded), COMPACT_BATCH):
+        with transaction.atomic(using=alias):
+            RecordChange.objects.using(alias).filter(seq__in=superseded[i:i + COMPACT_BATCH]).delete()
+    return len(superseded)
+
+
+# ------------------------
+# Offline order queue
+# ------------------------
+MAX_BATCH_ORDERS = 200
+MAX_ORDER_LINES = 50
+KEY_MAX_LENGTH = OrderSubmission._meta.get_field("key").max_length
+
+CREATED = "created"
+DUPLICATE = "duplicate"
+INVALID = "invalid"
+
+
+def _positive_int(value, what):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{what} must be a number.")
+    if number < 1:
+        raise ValueError(f"{what} must be at least 1.")
+    return number
+
+
+def _parse_order(order, location, catalog):
+    """ ``(key, location_id, date, lines)`` for one queued order; ValueError when unusable. """
+    if not isinstance(order, dict):
+        raise ValueError("Order must be an object.")
+    key = order.get("key")
+    if not isinstance(key, str) or not 0 < len(key) <= KEY_MAX_LENGTH:
+        raise ValueError(f"key must be a string of 1-{KEY_MAX_LENGTH} characters.")
+    date = parse_date(str(order.get("date") or ""))
+    if date is None:
+        raise ValueError("date must be YYYY-MM-DD.")
+    if location is None:
+        location = Location.objects.resolve(order.get("location"))
+        if location is None:
+            raise ValueError("Unknown location.")
+
+    lines = order.get("lines")
+    if not isinstance(lines, list) or not 0 < len(lines) <= MAX_ORDER_LINES:
+        raise ValueError(f"An order needs 1-{MAX_ORDER_LINES} lines.")
+    parsed = []
+    for line in lines:
+        if not isinstance(line, dict):
+            raise ValueError("Order line must be an object.")
+        item_id = _positive_int(line.get("item"), "item")
+        vendor_id = _positive_int(line.get("vendor"), "vendor")
+        if catalog.get(item_id) != vendor_id:
+            raise ValueError(f"Item {item_id} is not sold by vendor {vendor_id}.")
+        parsed.append((vendor_id, item_id, _positive_int(line.get("quantity"), "quantity")))
+    return key, location.pk, date, parsed
+
+
+def _catalog_for(orders):
+    """ item id -> vendor id for every item the orders mention (one query). """
+    item_ids = set()
+    for order in orders:
+        lines = order.get("lines") if isinstance(order, dict) else None
+        for line in lines if isinstance(lines, list) else ():
+            if isinstance(line, dict) and str(line.get("item", "")).isdigit():
+                item_ids.add(int(line["item"]))
+    return dict(VendorItem.objects.filter(pk__in=item_ids).values_list("pk", "vendor_id"))
+
+
+def _insert_orders(alias, orders, actor):
+    """
+    Inserts the orders not submitted before, all in one transaction on
+    ``alias``. Returns ``{key: (status, record ids)}``, the new records and
+    the pending lines merged into (orders.add_pending).
+    """
+    submissions = OrderSubmission.objects.using(alias)
+    with transaction.atomic(using=alias):
+        done = dict(submissions.filter(key__in=[o[0] for o in orders]).values_list("key", "record_ids"))
+        outcome = {key: (DUPLICATE, ids) for key, ids in done.items()}
+        new_orders, records = [], []
+        for key, location_id, date, lines in orders:
+            if key in outcome:
+                continue
+            new_orders.append((key, location_id, len(lines)))
+            records.extend(
+                Record(date=date, location_id=location_id, vendor_id=vendor_id, item_id=item_id,
+                       quantity=quantity, status=Record.PENDING)
+                for vendor_id, item_id, quantity in lines
+            )
+        # Lines merged into an existing pending line report that line's id.
+        created, updated = order_lines.add_pending(alias, records, actor)
+
+        rows, ids = [], iter(r.pk for r in records)
+        for key, location_id, line_count in new_orders:
+            record_ids = [next(ids) for _ in range(line_count)]
+            outcome[key] = (CREATED, record_ids)
+            rows.append(OrderSubmission(key=key, location_id=location_id, record_ids=record_ids))
+        # The unique index on key is the final word when two batches race.
+        submissions.bulk_create(rows)
+    return outcome, created, updated
+
+
+def submit_orders(orders, location=None, actor=None):
+    """
+    Inserts a batch of queued orders (``{"key", "date", "location", "lines":
+    [{"vendor", "item", "quantity"}]}``), one transaction per database. A
+    key seen before is reported as a duplicate with its original record
+    ids; ``location`` (a manager's) overrides the orders' own; ``actor`` is
+    logged as the submitter (audit.py). Returns one result per order, in
+    order, the records created and the pending lines merged into.
+    """
+    catalog = _catalog_for(orders)
+    results, valid, keys = [], [], set()
+    for order in orders:
+        try:
+            parsed = _parse_order(order, location, catalog)
+        except ValueError as exc:
+            key = order.get("key") if isinstance(order, dict) else None
+            results.append({"key": key, "status": INVALID, "error": str(exc)})
+            continue
+        results.append({"key": parsed[0]})
+        if parsed[0] not in keys:
+            keys.add(parsed[0])
+            valid.append(parsed)
+
+    outcome, created, updated = {}, [], []
+    by_alias = {}
+    for parsed in valid:
+        by_alias.setdefault(sharding.alias_for_location(parsed[1]), []).append(parsed)
+    for alias, alias_orders in by_alias.items():
+        try:
+            alias_outcome, records, merged_into = _insert_orders(alias, alias_orders, actor)
+        except IntegrityError:
+            # A concurrent batch committed one of these keys first: retry,
+            # now seeing it as a duplicate.
+            alias_outcome, records, merged_into = _insert_orders(alias, alias_orders, actor)
+        outcome.update(alias_outcome)
+        created.extend(records)
+        updated.extend(merged_into)
+
+    seen = set()
+    for result in results:
+        if "status" in result:
+            continue
+        status, record_ids = outcome[result["key"]]
+        # The same key twice in one batch: only the first can be new.
+        if result["key"] in seen:
+            status = DUPLICATE
+        seen.add(result["key"])
+        result.update(status=status, records=record_ids)
+    return results, created, updated
@@ -0,0 +1,177 @@
+"""
+Small database-backed task queue.
+
+Heavy work is registered with ``@task`` and queued with ``enqueue()`` (or
+``my_task.enqueue(...)``); it is executed by ``manage.py run_worker``. No
+external broker is needed: tasks are rows in the Task table, claimed with a
+conditional UPDATE and protected by a visibility timeout, so a task whose
+worker died is retried once its lock expires.
+
+Large CSV exports are queued by the export view; the nightly jobs and the
+legacy catalog import can be queued from cron with ``manage.py
+enqueue_task`` so they run on the worker pool instead of in cron's shell.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import exports
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+# Retry backoff: RETRY_BASE_SECONDS * 2 ** (attempt - 1), capped.
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+
+
+def task(name=None, max_attempts=3):
+    """
+    Registers a function as a task. The function receives the enqueued
+    keyword arguments, which must be JSON serialisable.
+    """
+    def decorator(func):
+        task_name = name or f"{func.__module__}.{func.__name__}"
+        _registry[task_name] = (func, max_attempts)
+        func.task_name = task_name
+        func.enqueue = lambda run_after=None, **payload: enqueue(task_name, run_after=run_after, **payload)
+        return func
+    return decorator
+
+
+def enqueue(name, run_after=None, **payload):
+    if name not in _registry:
+        raise KeyError(f"Unknown task {name!r}")
+    _func, max_attempts = _registry[name]
+    task_row = Task(name=name, payload=payload, max_attempts=max_attempts)
+    if run_after is not None:
+        task_row.run_after = run_after
+    # Inside a transaction the row, and so the task, only becomes visible
+    # to workers once it commits.
+    task_row.save()
+    return task_row
+
+
+def _claimable(now):
+    return (
+        Q(status=Task.QUEUED, run_after__lte=now)
+        | Q(status=Task.RUNNING, locked_until__lt=now)
+    )
+
+
+def claim(worker_id, visibility_timeout, batch=10):
+    """
+    Claims the next runnable task for ``worker_id`` or returns None.
+    The conditional UPDATE makes the claim atomic across processes.
+    """
+    now = timezone.now()
+    candidates = list(
+        Task.objects.filter(_claimable(now)).order_by("run_after", "pk").values_list("pk", flat=True)[:batch]
+    )
+    for pk in candidates:
+        claimed = Task.objects.filter(_claimable(now), pk=pk).update(
+            status=Task.RUNNING,
+            locked_until=now + timedelta(seconds=visibility_timeout),
+            locked_by=worker_id,
+            attempts=F("attempts") + 1,
+        )
+        if claimed:
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def run(task_row):
+    """ Executes a claimed task and records success, retry or failure. """
+    entry = _registry.get(task_row.name)
+    if task_row.attempts > task_row.max_attempts:
+        _finish(task_row, Task.FAILED, "Gave up: visibility timeout expired on the last attempt.")
+        return False
+    if entry is None:
+        _finish(task_row, Task.FAILED, f"Unknown task {task_row.name!r}")
+        return False
+
+    func, _max_attempts = entry
+    try:
+        func(**task_row.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Task %s failed (attempt %d/%d)", task_row, task_row.attempts, task_row.max_attempts)
+        if task_row.attempts < task_row.max_attempts:
+            delay = min(RETRY_BASE_SECONDS * 2 ** (task_row.attempts - 1), RETRY_MAX_SECONDS)
+            Task.objects.filter(pk=task_row.pk).update(
+                status=Task.QUEUED,
+                run_after=timezone.now() + timedelta(seconds=delay),
+                locked_until=None,
+                locked_by="",
+                last_error=error,
+            )
+        else:
+            _finish(task_row, Task.FAILED, error)
+        return False
+
+    _finish(task_row, Task.DONE, "")
+    return True
+
+
+def _finish(task_row, status, error):
+    Task.objects.filter(pk=task_row.pk).update(
+        status=status,
+        locked_until=None,
+        last_error=error,
+        finished_at=timezone.now(),
+    )
+
+
+# ------------------------
+# Built-in tasks
+# ------------------------
+@task(name="prune_tasks")
+def prune_tasks(days=7):
+    """ Deletes finished tasks older than ``days``. """
+    cutoff = timezone.now() - timedelta(days=days)
+    with transaction.atomic():
+        Task.objects.filter(status__in=[Task.DONE, Task.FAILED], finished_at__lt=cutoff).delete()
+
+
+@task(name="export_records")
+def export_records(user_id, filename, from_date=None, to_date=None, location_id=None, status=""):
+    """ Writes a CSV export for ``user_id`` (see exports.py). """
+    qs = exports.queryset(parse_date(from_date) if from_date else None,
+                          parse_date(to_date) if to_date else None, location_id, status)
+    exports.save(user_id, filename, qs)
+
+
+# The nightly jobs and the legacy import run their management command;
+# keyword arguments are its options (``date="2024-05-01"``, ``days=30``).
+@task(name="build_digests")
+def build_digests(**options):
+    call_command("build_digests", **options)
+
+
+@task(name="materialize_standing_orders")
+def materialize_standing_orders(**options):
+    call_command("materialize_standing_orders", **options)
+
+
+@task(name="purge_deleted")
+def purge_deleted(**options):
+    call_command("purge_deleted", **options)
+
+
+@task(name="compact_changes")
+def compact_changes(**options):
+    call_command("compact_changes", **options)
+
+
+# Not retried: a failed import is resumed by hand with --after.
+@task(name="import_legacy", max_attempts=1)
+def import_legacy(**options):
+    call_command("import_legacy", **options)
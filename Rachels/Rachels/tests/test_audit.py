@@ -0,0 +1,63 @@
+"""
+Order line history (audit.py): each change writes its events in the same
+transaction, with the acting user, and the table rejects rewrites.
+"""
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+from django.test import TestCase
+
+from .. import audit, deletion, inventory, orders
+from ..models import Location, Record, RecordEvent, Vendor, VendorItem
+
+DAY = date(2024, 1, 1)
+
+
+class AuditTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.location = Location.objects.create(name="Audit test")
+        cls.vendor = Vendor.objects.create(name="Metro")
+        cls.rice = VendorItem.objects.create(vendor=cls.vendor, item_name="Rice")
+        cls.user = User.objects.create_user(username="auditor", password="x")
+
+    def add(self, quantity, actor=None):
+        record = Record(date=DAY, location=self.location, vendor=self.vendor, item=self.rice, quantity=quantity)
+        orders.add_pending("default", [record], actor=actor)
+        return record
+
+    def events(self, record):
+        return [(e.kind, e.old_status, e.new_status, e.quantity, e.actor_name) for e in audit.history(record.pk)]
+
+    def test_line_lifecycle_is_logged(self):
+        record = self.add(2, actor=self.user)
+        self.add(3)
+        inventory.complete_records(Record.objects.filter(pk=record.pk), actor=self.user)
+        deletion.soft_delete(Record.objects.filter(pk=record.pk), actor=self.user)
+        deletion.restore(Record.all_objects.filter(pk=record.pk))
+
+        self.assertEqual(self.events(record), [
+            (RecordEvent.CREATED, "", Record.PENDING, 2, "auditor"),
+            (RecordEvent.MERGED, "", "", 3, ""),
+            (RecordEvent.STATUS, Record.PENDING, Record.COMPLETED, 5, "auditor"),
+            (RecordEvent.DELETED, Record.COMPLETED, "", 5, "auditor"),
+            (RecordEvent.RESTORED, "", "", 5, ""),
+        ])
+        created = RecordEvent.objects.get(record_id=record.pk, kind=RecordEvent.CREATED)
+        self.assertEqual((created.location_id, created.actor_id), (self.location.pk, self.user.pk))
+
+    def test_events_roll_back_with_the_change(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.add(1, actor=self.user)
+            raise RuntimeError
+        self.assertFalse(RecordEvent.objects.exists())
+
+    def test_history_is_append_only(self):
+        record = self.add(1)
+        with self.assertRaises(DatabaseError), transaction.atomic():
+            RecordEvent.objects.filter(record_id=record.pk).update(quantity=99)
+        self.assertEqual(RecordEvent.objects.get(record_id=record.pk).quantity, 1)
@@ -0,0 +1,65 @@
+"""
+Conditional GET on the dashboard, list and detail pages: the ETag follows
+record and catalog changes, and pages carrying flash messages are never
+answered with 304.
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Location, Record, Vendor, VendorItem
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.admin = User.objects.create_superuser(username="etag-admin", password="x")
+        cls.location = Location.objects.create(name="Etag test")
+        cls.vendor = Vendor.objects.create(name="Metro")
+        cls.item = VendorItem.objects.create(vendor=cls.vendor, item_name="Rice")
+        cls.record = Record.objects.create(
+            date=timezone.localdate(), location=cls.location, vendor=cls.vendor, item=cls.item)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def revalidate(self, url):
+        # The first visit sets the CSRF cookie, which is part of the ETag.
+        self.client.get(url)
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        return self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+    def test_unchanged_pages_are_not_modified(self):
+        for url in (reverse("Home"), reverse("show_all_records"), reverse("record_detail", args=[self.record.pk])):
+            self.assertEqual(self.revalidate(url).status_code, 304, url)
+
+    def test_record_change_invalidates(self):
+        etag = self.client.get(reverse("Home"))["ETag"]
+        Record.objects.filter(pk=self.record.pk).update(quantity=5)
+        self.assertEqual(self.client.get(reverse("Home"), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_catalog_rename_invalidates(self):
+        urls = (reverse("Home"), reverse("show_all_records"), reverse("record_detail", args=[self.record.pk]))
+        etags = {url: self.client.get(url)["ETag"] for url in urls}
+        self.vendor.name = "Metro Cash"
+        self.vendor.save()
+        for url, etag in etags.items():
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertContains(response, "Metro Cash")
+
+    def test_flash_message_is_not_lost_to_304(self):
+        etag = self.client.get(reverse("Home"))["ETag"]
+        # Flashes a message without changing any data.
+        self.client.get(reverse("export_csv"), {"from_date": "2024-02-01", "to_date": "2024-01-01"})
+
+        response = self.client.get(reverse("Home"), HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, "From date cannot be after To date.")
+        self.assertNotIn("ETag", response)
+        # Shown once; afterwards the page is cacheable again.
+        self.assertEqual(self.client.get(reverse("Home"), HTTP_IF_NONE_MATCH=etag).status_code, 304)
@@ -0,0 +1,95 @@
+"""
+Soft delete (deletion.py): tombstones are left out of live queries and
+actions, restoring merges into a line ordered again since (once), and
+the admin changelist keeps estimating the unfiltered live list.
+"""
+from datetime import date
+from unittest import mock
+
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from .. import admin as rachels_admin
+from .. import deletion, inventory, orders
+from ..models import InventoryEntry, Location, Record, RecordEvent, Vendor, VendorItem
+
+DAY = date(2024, 1, 1)
+
+
+class SoftDeleteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.location = Location.objects.create(name="Deletion test")
+        cls.vendor = Vendor.objects.create(name="Metro")
+        cls.rice = VendorItem.objects.create(vendor=cls.vendor, item_name="Rice")
+
+    def add(self, quantity):
+        record = Record(date=DAY, location=self.location, vendor=self.vendor, item=self.rice, quantity=quantity)
+        orders.add_pending("default", [record])
+        return record
+
+    def delete(self, record):
+        return deletion.soft_delete(Record.objects.filter(pk=record.pk))
+
+    def test_restore_revives_line(self):
+        record = self.add(2)
+        self.delete(record)
+        self.assertFalse(Record.objects.exists())
+
+        restored, updated = deletion.restore(Record.all_objects.filter(pk=record.pk))
+        self.assertEqual(([r.pk for r in restored], updated), ([record.pk], []))
+        self.assertEqual(Record.objects.get().quantity, 2)
+
+    def test_restore_merges_once_into_line_ordered_again(self):
+        old = self.add(2)
+        self.delete(old)
+        new = self.add(3)
+
+        restored, updated = deletion.restore(Record.all_objects.filter(pk=old.pk))
+        self.assertEqual((restored, [r.pk for r in updated]), ([], [new.pk]))
+        self.assertEqual(list(Record.all_objects.values_list("pk", "quantity")), [(new.pk, 5)])
+        # The tombstone is consumed: restoring again changes nothing.
+        self.assertEqual(deletion.restore(Record.all_objects.filter(pk=old.pk)), ([], []))
+        self.assertEqual(Record.objects.get().quantity, 5)
+        self.assertEqual(RecordEvent.objects.filter(record_id=new.pk, kind=RecordEvent.MERGED).get().quantity, 2)
+
+    def test_deleted_lines_are_not_completed(self):
+        record = self.add(2)
+        self.delete(record)
+        self.assertEqual(inventory.complete_records(Record.all_objects.filter(pk=record.pk)), [])
+        self.assertEqual(Record.all_objects.get().status, Record.PENDING)
+        self.assertFalse(InventoryEntry.objects.exists())
+
+    def test_purge_only_old_tombstones(self):
+        gone, kept = self.add(1), Record.objects.create(date=DAY, location=self.location, status=Record.COMPLETED)
+        self.delete(gone)
+        self.assertEqual(deletion.purge("default", timezone.now()), 1)
+        self.assertEqual(list(Record.all_objects.values_list("pk", flat=True)), [kept.pk])
+
+
+class ChangelistCountTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.admin = User.objects.create_superuser(username="count-admin", password="x")
+        cls.location = Location.objects.create(name="Count test")
+        Record.objects.create(date=DAY, location=cls.location)
+
+    def paginator(self, params):
+        request = RequestFactory().get("/", params)
+        request.user = self.admin
+        changelist = site._registry[Record].get_changelist_instance(request)
+        return changelist.paginator
+
+    def test_live_list_uses_estimate(self):
+        with mock.patch.object(rachels_admin, "estimated_count", return_value=10 ** 6) as estimate:
+            self.assertEqual(self.paginator({}).count, 10 ** 6)
+            self.assertEqual(self.paginator({"status__exact": Record.PENDING}).count, 1)
+            self.assertEqual(self.paginator({"deleted": "yes"}).count, 0)
+        self.assertEqual(estimate.call_count, 1)
@@ -0,0 +1,85 @@
+"""
+Daily digests (digests.py): what a built digest counts for each location
+and for all of them, rebuilding a day, and the digest page serving it.
+"""
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import digests
+from ..models import AdvanceSalary, DailyDigest, Location, Record, Vendor, VendorItem
+
+DAY = date(2024, 3, 4)
+
+
+class DigestTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.north = Location.objects.create(name="Digest north")
+        cls.south = Location.objects.create(name="Digest south")
+        vendor = Vendor.objects.create(name="Metro")
+        cls.rice = VendorItem.objects.create(vendor=vendor, item_name="Rice")
+        cls.oil = VendorItem.objects.create(vendor=vendor, item_name="Oil")
+
+        def line(location, item, quantity, price, day=DAY, status=Record.PENDING):
+            return Record.objects.create(date=day, location=location, vendor=vendor, item=item,
+                                         quantity=quantity, unit_price=Decimal(price), status=status)
+
+        line(cls.north, cls.rice, 3, "2.00")
+        line(cls.north, cls.oil, 1, "5.50")
+        line(cls.south, cls.rice, 4, "2.00")
+        # Placed earlier, completed on DAY; and one still pending from before.
+        done = line(cls.south, cls.oil, 2, "5.50", day=date(2024, 3, 1), status=Record.COMPLETED)
+        Record.objects.filter(pk=done.pk).update(
+            updated_at=timezone.make_aware(datetime.combine(DAY, time(15))))
+        line(cls.north, cls.oil, 6, "5.50", day=date(2024, 3, 2))
+        # Deleted lines are left out.
+        gone = line(cls.north, cls.rice, 9, "2.00", day=date(2024, 3, 3))
+        Record.objects.filter(pk=gone.pk).update(deleted_at=timezone.now())
+
+        AdvanceSalary.objects.create(employee_name="Ana", paid_on=DAY, amount=Decimal("100.00"))
+        AdvanceSalary.objects.create(employee_name="Ben", paid_on=date(2024, 3, 5), amount=Decimal("50.00"))
+
+    def test_per_location_and_combined_summaries(self):
+        digests.build(DAY)
+        north = digests.get(DAY, self.north).summary
+        self.assertEqual({k: north[k] for k in ("placed", "quantity", "completed", "pending")},
+                         {"placed": 2, "quantity": 4, "completed": 0, "pending": 3})
+        self.assertEqual(Decimal(north["spend"]), Decimal("11.50"))
+        self.assertEqual([(i["item"], i["quantity"]) for i in north["top_items"]],
+                         [(self.rice.pk, 3), (self.oil.pk, 1)])
+
+        combined = digests.get(DAY).summary
+        self.assertEqual({k: combined[k] for k in ("placed", "quantity", "completed", "pending")},
+                         {"placed": 3, "quantity": 8, "completed": 1, "pending": 4})
+        self.assertEqual(Decimal(combined["spend"]), Decimal("19.50"))
+        self.assertEqual(combined["top_items"][0], {"item": self.rice.pk, "name": str(self.rice), "quantity": 7})
+        self.assertEqual(combined["advances"], {"count": 1, "amount": "100.00",
+                                                "paid": [{"name": "Ana", "amount": "100.00"}]})
+        completed = {row["name"]: row["completed"] for row in combined["locations"]}
+        self.assertEqual((completed["Digest north"], completed["Digest south"]), (0, 1))
+
+    def test_rebuild_replaces_the_day(self):
+        digests.build(DAY)
+        Record.objects.filter(location=self.south, date=DAY).update(quantity=10)
+        digests.build(DAY)
+        # One per location plus the combined one.
+        self.assertEqual(DailyDigest.objects.filter(date=DAY).count(), Location.objects.count() + 1)
+        self.assertEqual(digests.get(DAY, self.south).summary["quantity"], 10)
+        self.assertIsNone(digests.get(date(2024, 3, 5)))
+
+    def test_digest_page(self):
+        digests.build(DAY)
+        self.client.force_login(User.objects.create_superuser(username="digest-admin", password="x"))
+        url = reverse("daily_digest")
+        data = self.client.get(url, {"date": DAY.isoformat(), "location": self.north.pk, "format": "json"}).json()
+        self.assertEqual((data["location"], data["summary"]["placed"]), (self.north.pk, 2))
+        self.assertContains(self.client.get(url, {"date": DAY.isoformat()}), "Ana")
+        self.assertEqual(self.client.get(url, {"date": "2024-03-05", "format": "json"}).status_code, 404)
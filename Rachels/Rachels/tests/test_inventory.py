@@ -0,0 +1,79 @@
+"""
+Inventory ledger behaviour (inventory.py): receipts from completed orders,
+counts and usage keep StockBalance equal to the sum of the ledger, and a
+completion that loses a race never receives an order twice.
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db.models import Sum
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import inventory
+from ..models import InventoryEntry, Location, Record, RecordEvent, Vendor, VendorItem
+
+
+class InventoryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.location = Location.objects.create(name="Inventory test")
+        vendor = Vendor.objects.create(name="Metro")
+        cls.rice = VendorItem.objects.create(vendor=vendor, item_name="Rice")
+        cls.oil = VendorItem.objects.create(vendor=vendor, item_name="Oil")
+        cls.vendor = vendor
+
+    def order(self, item, quantity, days_ago=0):
+        return Record.objects.create(date=timezone.localdate() - timedelta(days=days_ago), location=self.location,
+                                     vendor=self.vendor, item=item, quantity=quantity)
+
+    def assertOnHand(self, item, expected):
+        self.assertEqual(inventory.on_hand(self.location.pk, item.pk), expected)
+        ledger = InventoryEntry.objects.filter(location=self.location, item=item).aggregate(total=Sum("quantity"))
+        self.assertEqual(ledger["total"] or 0, expected)
+
+    def test_completion_posts_receipts_once(self):
+        lines = [self.order(self.rice, 3), self.order(self.rice, 2, days_ago=1), self.order(self.oil, 4)]
+        qs = Record.objects.filter(pk__in=[r.pk for r in lines])
+
+        self.assertEqual(len(inventory.complete_records(qs)), 3)
+        self.assertOnHand(self.rice, 5)
+        self.assertOnHand(self.oil, 4)
+        self.assertEqual(set(qs.values_list("status", flat=True)), {Record.COMPLETED})
+        self.assertEqual(RecordEvent.objects.filter(kind=RecordEvent.STATUS).count(), 3)
+
+        # Completing again is a no-op.
+        self.assertEqual(inventory.complete_records(qs), [])
+        self.assertOnHand(self.rice, 5)
+
+    def test_count_and_usage(self):
+        inventory.complete_records(Record.objects.filter(pk=self.order(self.rice, 10).pk))
+        inventory.post_usage(self.location.pk, self.rice.pk, 4)
+        self.assertOnHand(self.rice, 6)
+
+        entry = inventory.post_count(self.location.pk, self.rice.pk, 9)
+        self.assertEqual((entry.kind, entry.quantity), (InventoryEntry.COUNT, 3))
+        self.assertOnHand(self.rice, 9)
+
+        inventory.post_count(self.location.pk, self.oil.pk, 2)
+        self.assertOnHand(self.oil, 2)
+
+    def test_lost_race_is_treated_as_completed(self):
+        record = self.order(self.rice, 3)
+        stale = Record.objects.get(pk=record.pk)
+        # The other request completes the line first.
+        inventory.complete_records(Record.objects.filter(pk=record.pk))
+
+        # This request read the line as pending before that commit.
+        real = inventory._locked_pending
+        reads = iter([lambda qs: [stale], real])
+        with mock.patch.object(inventory, "_locked_pending", side_effect=lambda qs: next(reads)(qs)):
+            completed = inventory.complete_records(Record.all_objects.filter(pk=record.pk))
+
+        self.assertEqual(completed, [])
+        self.assertEqual(InventoryEntry.objects.filter(record=record).count(), 1)
+        self.assertOnHand(self.rice, 3)
+        self.assertEqual(RecordEvent.objects.filter(record_id=record.pk, kind=RecordEvent.STATUS).count(), 1)
@@ -0,0 +1,59 @@
+"""
+Request metrics (metrics.py): SQL queries are counted per view under both
+WSGI and ASGI, where the view's queries run in a thread other than the
+middleware's.
+"""
+import re
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import metrics
+from ..models import Location, Record
+
+
+class RequestMetricsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.admin = User.objects.create_superuser(username="metrics-admin", password="x")
+        cls.record = Record.objects.create(date=timezone.localdate(), location=Location.objects.create(name="Metered"))
+
+    def setUp(self):
+        metrics.registry.reset()
+        self.addCleanup(metrics.registry.reset)
+
+    def sample(self, metric, view):
+        match = re.search(rf'^{metric}_(sum|count){{view="{view}"}} (\S+)$', metrics.registry.render(), re.M)
+        self.assertIsNotNone(match, f"No {metric} for {view}")
+        return float(match.group(2))
+
+    def assertSqlCounted(self, views):
+        for view in views:
+            self.assertGreater(self.sample("rachels_request_sql_queries", view), 0, view)
+            self.assertGreater(self.sample("rachels_request_sql_duration_seconds", view), 0, view)
+
+    def test_wsgi_requests(self):
+        self.client.force_login(self.admin)
+        for url in (reverse("Home"), reverse("show_all_records"), reverse("record_detail", args=[self.record.pk])):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertSqlCounted(["Home", "show_all_records", "record_detail"])
+
+    async def test_asgi_requests(self):
+        await self.async_client.aforce_login(self.admin)
+        for url in (reverse("Home"), reverse("show_all_records"), reverse("record_detail", args=[self.record.pk])):
+            self.assertEqual((await self.async_client.get(url)).status_code, 200)
+        self.assertSqlCounted(["Home", "show_all_records", "record_detail"])
+
+    def test_nested_recorders_both_count(self):
+        outer = metrics.QueryRecorder()
+        metrics.install_wrappers()
+        with outer.active():
+            with metrics.QueryRecorder().active() as inner:
+                Record.objects.count()
+            Record.objects.count()
+        self.assertEqual((outer.count, inner.count), (2, 1))
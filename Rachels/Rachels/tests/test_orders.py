@@ -0,0 +1,148 @@
+"""
+Merge-on-write for pending lines (orders.py): a second line for the same
+location, date, vendor and item adds to the first, and reassigning keeps
+record ids, merging only lines that collide at the new location. Merges
+are logged and pushed to the live dashboard.
+"""
+from datetime import date
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import live, orders
+from ..admin import reassign_location
+from ..models import Location, Record, RecordEvent, Vendor, VendorItem
+
+DAY = date(2024, 1, 1)
+
+
+class AddPendingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.north = Location.objects.create(name="Merge north")
+        cls.south = Location.objects.create(name="Merge south")
+        cls.vendor = Vendor.objects.create(name="Metro")
+        cls.rice = VendorItem.objects.create(vendor=cls.vendor, item_name="Rice")
+        cls.oil = VendorItem.objects.create(vendor=cls.vendor, item_name="Oil")
+
+    def line(self, item, quantity, location=None, **fields):
+        return Record(date=DAY, location=location or self.north, vendor=self.vendor, item=item,
+                      quantity=quantity, **fields)
+
+    def add(self, *records):
+        created, _updated = orders.add_pending("default", list(records))
+        return created
+
+    def test_same_line_adds_quantity(self):
+        first, = self.add(self.line(self.rice, 2))
+        again = self.line(self.rice, 3)
+        self.assertEqual(self.add(again), [])
+        self.assertEqual((again.pk, again.quantity), (first.pk, 5))
+        self.assertEqual(Record.objects.get().quantity, 5)
+        self.assertEqual(
+            list(RecordEvent.objects.order_by("pk").values_list("record_id", "kind", "quantity")),
+            [(first.pk, RecordEvent.CREATED, 2), (first.pk, RecordEvent.MERGED, 3)])
+
+    def test_merge_targets_are_returned(self):
+        first, = self.add(self.line(self.rice, 2))
+        created, updated = orders.add_pending("default", [self.line(self.rice, 3), self.line(self.oil, 1)])
+        self.assertEqual([r.item_id for r in created], [self.oil.pk])
+        self.assertEqual([(r.pk, r.quantity) for r in updated], [(first.pk, 5)])
+
+    def test_lines_within_one_call_merge(self):
+        lines = [self.line(self.rice, 1), self.line(self.oil, 4), self.line(self.rice, 2)]
+        created = self.add(*lines)
+        self.assertEqual(sorted((r.item_id, r.quantity) for r in created), sorted([(self.oil.pk, 4), (self.rice.pk, 3)]))
+        self.assertEqual(lines[0].pk, lines[2].pk)
+        self.assertEqual(Record.objects.count(), 2)
+
+    def test_other_location_or_completed_line_is_not_merged(self):
+        Record.objects.create(date=DAY, location=self.north, vendor=self.vendor, item=self.rice, quantity=7,
+                              status=Record.COMPLETED)
+        self.add(self.line(self.rice, 1), self.line(self.rice, 1, location=self.south))
+        self.assertEqual(Record.objects.count(), 3)
+        self.assertEqual(Record.objects.filter(status=Record.PENDING).count(), 2)
+
+    def test_merge_duplicates_leaves_completed_lines(self):
+        self.add(self.line(self.rice, 2))
+        Record.objects.bulk_create([self.line(self.rice, 1, status=Record.COMPLETED) for _ in range(2)])
+        self.assertEqual(orders.merge_duplicates("default"), 0)
+        self.assertEqual(Record.objects.count(), 3)
+
+    @skipUnless(connection.vendor == "sqlite", "drops the unique index inside the test transaction")
+    def test_merge_duplicates_folds_into_oldest(self):
+        with connection.cursor() as cursor:
+            # Lines from before the index existed.
+            cursor.execute('DROP INDEX "record_one_pending_line"')
+        keep, *extra = Record.objects.bulk_create([self.line(self.rice, n) for n in (1, 2, 4)])
+        other = self.add(self.line(self.oil, 1))[0]
+
+        self.assertEqual(orders.merge_duplicates("default", batch_size=1), 2)
+        self.assertEqual(sorted(Record.objects.values_list("pk", "quantity")), [(keep.pk, 7), (other.pk, 1)])
+        self.assertEqual(
+            sorted(RecordEvent.objects.exclude(kind=RecordEvent.CREATED).values_list("record_id", "kind", "quantity")),
+            sorted([(keep.pk, RecordEvent.MERGED, 6), *((r.pk, RecordEvent.DELETED, r.quantity) for r in extra)]))
+        self.assertEqual(orders.merge_duplicates("default"), 0)
+
+    def test_reassign_keeps_ids_and_merges_collisions(self):
+        rice_north, oil_north = self.add(self.line(self.rice, 2), self.line(self.oil, 1))
+        rice_south, = self.add(self.line(self.rice, 5, location=self.south))
+        done = Record.objects.create(date=DAY, location=self.north, vendor=self.vendor, item=self.rice,
+                                     status=Record.COMPLETED)
+
+        moved = reassign_location(Record.objects.filter(location=self.north), self.south)
+        self.assertEqual(moved, 3)
+        self.assertEqual(
+            sorted(Record.objects.values_list("pk", "location_id", "quantity")),
+            sorted([(oil_north.pk, self.south.pk, 1), (rice_south.pk, self.south.pk, 7),
+                    (done.pk, self.south.pk, 1)]))
+        self.assertFalse(Record.all_objects.filter(pk=rice_north.pk).exists())
+        self.assertEqual(
+            set(RecordEvent.objects.filter(kind__in=[RecordEvent.MERGED, RecordEvent.DELETED])
+                .values_list("record_id", "kind", "quantity")),
+            {(rice_north.pk, RecordEvent.DELETED, 2), (rice_south.pk, RecordEvent.MERGED, 2)})
+
+
+class LiveMergeEventTests(TestCase):
+    """ The order form and the batch endpoint push merged quantities to the dashboard. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.admin = User.objects.create_superuser(username="merge-admin", password="x")
+        cls.location = Location.objects.create(name="Merge live")
+        cls.vendor = Vendor.objects.create(name="Metro")
+        cls.rice = VendorItem.objects.create(vendor=cls.vendor, item_name="Rice")
+        cls.existing = Record.objects.create(date=DAY, location=cls.location, vendor=cls.vendor, item=cls.rice,
+                                             quantity=2)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def events(self, post):
+        published = []
+        with mock.patch.object(live.hub, "has_subscribers", return_value=True), \
+                mock.patch.object(live.hub, "publish", side_effect=published.extend), \
+                self.captureOnCommitCallbacks(execute=True):
+            post()
+        return [(e["type"], e["record"]["id"], e["record"]["quantity"], e["deltas"]) for e in published]
+
+    def test_order_form(self):
+        events = self.events(lambda: self.client.post(reverse("add_record"), {
+            "date": DAY.isoformat(), "location": self.location.pk,
+            "vendor[]": [self.vendor.pk], "item[]": [self.rice.pk], "quantity[]": [3],
+        }))
+        self.assertEqual(events, [(live.UPDATED, self.existing.pk, 5, {})])
+
+    def test_batch_endpoint(self):
+        order = {"key": "merge-1", "date": DAY.isoformat(), "location": self.location.pk,
+                 "lines": [{"vendor": self.vendor.pk, "item": self.rice.pk, "quantity": 4}]}
+        events = self.events(lambda: self.client.post(reverse("submit_order_batch"), {"orders": [order]},
+                                                      content_type="application/json"))
+        self.assertEqual(events, [(live.UPDATED, self.existing.pk, 6, {})])
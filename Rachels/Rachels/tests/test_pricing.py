@@ -0,0 +1,96 @@
+"""
+Prices and spend (pricing.py): new lines copy the price in effect on their
+date, later price changes leave them alone, and spend sums quantity times
+that price per location or vendor and period.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from .. import orders, pricing
+from ..models import Location, Record, Vendor, VendorItem, VendorItemPrice
+
+
+class SnapshotPriceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.location = Location.objects.create(name="Pricing test")
+        cls.vendor = Vendor.objects.create(name="Metro")
+        cls.rice = VendorItem.objects.create(vendor=cls.vendor, item_name="Rice")
+        cls.oil = VendorItem.objects.create(vendor=cls.vendor, item_name="Oil")
+        for price, effective_from in (("2.00", date(2024, 1, 1)), ("2.50", date(2024, 2, 1))):
+            VendorItemPrice.objects.create(item=cls.rice, unit_price=Decimal(price), effective_from=effective_from)
+
+    def line(self, day, item=None, **fields):
+        return Record(date=day, location=self.location, vendor=self.vendor, item=item or self.rice, **fields)
+
+    def test_price_in_effect_on_the_date(self):
+        lines = [self.line(date(2023, 12, 31)), self.line(date(2024, 1, 31)), self.line(date(2024, 2, 1)),
+                 self.line(date(2024, 6, 1)), self.line(date(2024, 6, 1), item=self.oil)]
+        pricing.snapshot_prices(lines)
+        self.assertEqual([r.unit_price for r in lines],
+                         [None, Decimal("2.00"), Decimal("2.50"), Decimal("2.50"), None])
+
+    def test_given_price_is_kept(self):
+        line = self.line(date(2024, 6, 1), unit_price=Decimal("1.75"))
+        pricing.snapshot_prices([line])
+        self.assertEqual(line.unit_price, Decimal("1.75"))
+
+    def test_snapshot_survives_later_price_change(self):
+        day = date(2024, 3, 1)
+        created, _updated = orders.add_pending("default", [self.line(day, quantity=2)])
+        VendorItemPrice.objects.create(item=self.rice, unit_price=Decimal("9.00"), effective_from=date(2024, 2, 15))
+        # A line merged in later keeps the price the line was entered at.
+        orders.add_pending("default", [self.line(day, quantity=1)])
+
+        record = Record.objects.get(pk=created[0].pk)
+        self.assertEqual((record.quantity, record.unit_price), (3, Decimal("2.50")))
+        new, _updated = orders.add_pending("default", [self.line(date(2024, 3, 2), quantity=1)])
+        self.assertEqual(Record.objects.get(pk=new[0].pk).unit_price, Decimal("9.00"))
+
+
+class SpendTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.north = Location.objects.create(name="Spend north")
+        cls.south = Location.objects.create(name="Spend south")
+        cls.metro = Vendor.objects.create(name="Metro")
+        cls.market = Vendor.objects.create(name="Market")
+        rice = VendorItem.objects.create(vendor=cls.metro, item_name="Rice")
+        eggs = VendorItem.objects.create(vendor=cls.market, item_name="Eggs")
+
+        def line(location, item, day, quantity, price):
+            Record.objects.create(date=day, location=location, vendor=item.vendor, item=item, quantity=quantity,
+                                  unit_price=None if price is None else Decimal(price))
+
+        line(cls.north, rice, date(2024, 1, 5), 3, "2.00")
+        line(cls.north, eggs, date(2024, 1, 20), 2, "1.25")
+        line(cls.south, rice, date(2024, 1, 9), 1, "2.00")
+        line(cls.south, eggs, date(2024, 1, 9), 4, None)
+        line(cls.north, rice, date(2024, 2, 2), 5, "2.50")
+
+    def totals(self, rows):
+        return [(row["period"].strftime("%Y-%m-%d"), row["name"], Decimal(row["spend"]), row["quantity"],
+                 row["lines"], row["unpriced"]) for row in rows]
+
+    def test_per_location_and_month(self):
+        self.assertEqual(self.totals(pricing.spend(Record.objects.all())), [
+            ("2024-02-01", "Spend north", Decimal("12.50"), 5, 1, 0),
+            ("2024-01-01", "Spend north", Decimal("8.50"), 5, 2, 0),
+            ("2024-01-01", "Spend south", Decimal("2.00"), 5, 2, 1),
+        ])
+
+    def test_per_vendor_and_day(self):
+        rows = pricing.spend(Record.objects.filter(date__month=1), by="vendor", period="day")
+        self.assertEqual(self.totals(rows), [
+            ("2024-01-20", "Market", Decimal("2.50"), 2, 1, 0),
+            ("2024-01-09", "Market", Decimal("0"), 4, 1, 1),
+            ("2024-01-09", "Metro", Decimal("2.00"), 1, 1, 0),
+            ("2024-01-05", "Metro", Decimal("6.00"), 3, 1, 0),
+        ])
@@ -0,0 +1,48 @@
+"""
+Request profiling (profiling.py): a ?_profile=1 request by a superuser is
+stored with its SQL timeline under both WSGI and ASGI, where the view's
+queries run in a thread other than the middleware's.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Location, Record, RequestProfile
+
+
+class ProfilingMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.admin = User.objects.create_superuser(username="profile-admin", password="x")
+        cls.record = Record.objects.create(date=timezone.localdate(), location=Location.objects.create(name="Profiled"))
+
+    def setUp(self):
+        self.url = reverse("record_detail", args=[self.record.pk])
+
+    def assertProfiled(self, profiler):
+        profile = RequestProfile.objects.get()
+        self.assertEqual((profile.profiler, profile.trigger, profile.status_code, profile.username),
+                         (profiler, RequestProfile.QUERY_FLAG, 200, "profile-admin"))
+        record_sql = [q for q in profile.sql if Record._meta.db_table in q["sql"]]
+        self.assertTrue(record_sql, profile.sql)
+        self.assertEqual(profile.query_count, len(profile.sql))
+        self.assertEqual({q["alias"] for q in record_sql}, {"default"})
+
+    def test_wsgi_request(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertFalse(RequestProfile.objects.exists())
+
+        self.client.get(self.url, {"_profile": "1"})
+        self.assertProfiled(RequestProfile.CPROFILE)
+
+    async def test_asgi_request(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get(self.url, {"_profile": "1"})
+        self.assertEqual(response.status_code, 200)
+        await sync_to_async(self.assertProfiled)(RequestProfile.STACKS)
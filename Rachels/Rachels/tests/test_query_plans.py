@@ -0,0 +1,125 @@
+"""
+Query-plan regression tests for the hot Record queries.
+
+Every SELECT against the record table (or its change feed) issued by the
+dashboard, list, export, detail and sync views is run through
+``EXPLAIN QUERY PLAN``. A test fails when
+such a query falls back to a full table scan or needs a temporary B-tree
+(an unindexed sort or grouping), which is how index regressions show up
+long before they are visible at production data sizes.
+"""
+import re
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import deletion, pricing
+from ..models import Record, RecordChange, VendorItemPrice
+
+HOT_TABLES = (Record._meta.db_table, RecordChange._meta.db_table)
+
+# "SCAN Rachels_record" with no index at all == full table scan.
+FULL_SCAN = re.compile(rf'^SCAN "?({"|".join(HOT_TABLES)})"?$')
+TEMP_BTREE = "USE TEMP B-TREE"
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN output is SQLite specific")
+class HotQueryPlanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Cached catalog rows from other test classes were rolled back.
+        cache.clear()
+        cls.admin = User.objects.create_superuser(username="plan-admin", password="x")
+        call_command("generate_data", records=300, advances=0, seed=7, stdout=StringIO())
+        cls.record = Record.objects.order_by("pk").first()
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [row[-1] for row in cursor.fetchall()]
+
+    def record_queries(self, captured):
+        for query in captured:
+            sql = query["sql"]
+            if sql.lstrip().upper().startswith("SELECT") and any(table in sql for table in HOT_TABLES):
+                yield sql
+
+    def assertIndexedPlans(self, url, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            b"".join(response.streaming_content)
+
+        checked = 0
+        for sql in self.record_queries(ctx.captured_queries):
+            plan = self.explain(sql)
+            checked += 1
+            for step in plan:
+                self.assertFalse(FULL_SCAN.match(step), f"Full table scan:\n{sql}\n{plan}")
+                self.assertNotIn(TEMP_BTREE, step, f"Temp B-tree sort/group:\n{sql}\n{plan}")
+        self.assertGreater(checked, 0, f"No record queries captured for {url}")
+
+    def test_dashboard(self):
+        self.assertIndexedPlans(reverse("Home"))
+
+    def test_list(self):
+        self.assertIndexedPlans(reverse("show_all_records"))
+
+    def test_list_filtered_by_location(self):
+        self.assertIndexedPlans(reverse("show_all_records"), {"location": "Rachels"})
+
+    def test_list_filtered_by_status(self):
+        self.assertIndexedPlans(reverse("show_all_records"), {"status": "pending"})
+
+    def test_list_filtered_by_location_and_status(self):
+        self.assertIndexedPlans(reverse("show_all_records"), {"location": "Dulari", "status": "Completed"})
+
+    def test_list_this_month(self):
+        self.assertIndexedPlans(reverse("show_all_records"), {"month": "this", "page": 2})
+
+    def test_export_date_range(self):
+        self.assertIndexedPlans(reverse("export_csv"), {"from_date": "2020-01-01", "to_date": "2100-01-01"})
+
+    def test_export_filtered(self):
+        self.assertIndexedPlans(reverse("export_csv"), {
+            "from_date": "2020-01-01", "location": "Rachels", "status": "Pending",
+        })
+
+    def test_detail(self):
+        self.assertIndexedPlans(reverse("record_detail", args=[self.record.pk]))
+
+    def test_sync_feed(self):
+        self.assertIndexedPlans(reverse("sync_changes"), {"location": self.record.location_id, "since": 5})
+
+    def test_sync_feed_idle(self):
+        self.assertIndexedPlans(reverse("sync_changes"), {"location": self.record.location_id, "since": 10 ** 9})
+
+    def test_purge_batch(self):
+        with CaptureQueriesContext(connection) as ctx:
+            deletion.purge("default", self.record.created_at)
+        for sql in self.record_queries(ctx.captured_queries):
+            plan = self.explain(sql)
+            self.assertIn("record_deleted_at_idx", " ".join(plan), plan)
+            for step in plan:
+                self.assertNotIn(TEMP_BTREE, step, plan)
+
+    def test_price_lists(self):
+        with CaptureQueriesContext(connection) as ctx:
+            pricing.price_lists([self.record.item_id], self.record.date)
+        plan = self.explain(ctx.captured_queries[-1]["sql"])
+        table = VendorItemPrice._meta.db_table
+        for step in plan:
+            self.assertNotRegex(step, rf'^SCAN "?{table}"?$', plan)
+            self.assertNotIn(TEMP_BTREE, step, plan)
@@ -0,0 +1,70 @@
+"""
+Standing orders (standing_orders.py): a day is materialized once per
+location, however often the command runs, and lines merge into what the
+location already ordered by hand.
+"""
+from datetime import date
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from .. import orders, standing_orders
+from ..models import Location, Record, StandingOrder, StandingOrderRun, Vendor, VendorItem
+
+MONDAY = date(2024, 1, 1)
+
+
+class MaterializeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.north = Location.objects.create(name="Standing north")
+        cls.south = Location.objects.create(name="Standing south")
+        cls.vendor = Vendor.objects.create(name="Metro")
+        cls.rice = VendorItem.objects.create(vendor=cls.vendor, item_name="Rice")
+        cls.oil = VendorItem.objects.create(vendor=cls.vendor, item_name="Oil")
+        cls.template(cls.north, cls.rice, 2, weekdays="0")
+        cls.template(cls.north, cls.oil, 1, weekdays="01234")
+        cls.template(cls.south, cls.rice, 5, weekdays="1")
+
+    @classmethod
+    def template(cls, location, item, quantity, weekdays):
+        return StandingOrder.objects.create(location=location, vendor=cls.vendor, item=item,
+                                            quantity=quantity, weekdays=weekdays)
+
+    def lines(self, day):
+        return sorted(Record.objects.filter(date=day).values_list("location__name", "item__item_name", "quantity"))
+
+    def test_only_templates_due_that_day(self):
+        created = standing_orders.materialize(MONDAY)
+        self.assertEqual(len(created), 2)
+        self.assertEqual(self.lines(MONDAY), [("Standing north", "Oil", 1), ("Standing north", "Rice", 2)])
+        self.assertEqual(list(StandingOrderRun.objects.values_list("location_id", "date", "records")),
+                         [(self.north.pk, MONDAY, 2)])
+
+    def test_second_run_for_a_date_is_a_no_op(self):
+        standing_orders.materialize(MONDAY)
+        self.assertEqual(standing_orders.materialize(MONDAY), [])
+        self.assertEqual(Record.objects.filter(date=MONDAY).count(), 2)
+        self.assertEqual(StandingOrderRun.objects.count(), 1)
+
+        # Each date is its own run.
+        tuesday = date(2024, 1, 2)
+        self.assertEqual(len(standing_orders.materialize(tuesday)), 2)
+        self.assertEqual(StandingOrderRun.objects.filter(date=tuesday).count(), 2)
+
+    def test_rerun_picks_up_locations_not_yet_run(self):
+        standing_orders.materialize(MONDAY)
+        self.template(self.south, self.oil, 3, weekdays="0")
+        created = standing_orders.materialize(MONDAY)
+        # South had no run for Monday yet, north keeps its one.
+        self.assertEqual([(r.location_id, r.quantity) for r in created], [(self.south.pk, 3)])
+        self.assertEqual(StandingOrderRun.objects.filter(date=MONDAY).count(), 2)
+
+    def test_merges_into_line_ordered_by_hand(self):
+        orders.add_pending("default", [Record(date=MONDAY, location=self.north, vendor=self.vendor,
+                                              item=self.rice, quantity=4)])
+        created = standing_orders.materialize(MONDAY)
+        self.assertEqual([r.item_id for r in created], [self.oil.pk])
+        self.assertEqual(self.lines(MONDAY), [("Standing north", "Oil", 1), ("Standing north", "Rice", 6)])
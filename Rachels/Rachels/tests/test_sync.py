@@ -0,0 +1,156 @@
+"""
+Delta sync and the offline order queue (sync.py): feed tokens, tombstones
+and compaction, and idempotent replay of submitted batches.
+"""
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import sync
+from ..models import Location, Record, RecordChange, Vendor, VendorItem
+
+
+class ChangeFeedTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.here = Location.objects.create(name="Feed here")
+        cls.there = Location.objects.create(name="Feed there")
+        cls.vendor = Vendor.objects.create(name="Metro")
+        cls.item = VendorItem.objects.create(vendor=cls.vendor, item_name="Rice")
+
+    def record(self, location=None, quantity=1, days_ago=0):
+        return Record.objects.create(date=timezone.localdate() - timedelta(days=days_ago),
+                                     location=location or self.here, vendor=self.vendor, item=self.item,
+                                     quantity=quantity)
+
+    def feed(self, since, limit=sync.FEED_LIMIT):
+        return sync.changes_since(self.here.pk, since, limit)
+
+    def test_changes_after_token(self):
+        first = self.record()
+        start = self.feed(0)
+        self.assertEqual([r.pk for r in start["upserts"]], [first.pk])
+        self.assertFalse(start["more"] or start["reset"])
+
+        # Nothing new: same token back.
+        self.assertEqual(self.feed(start["token"])["token"], start["token"])
+
+        Record.objects.filter(pk=first.pk).update(quantity=4)
+        self.record(location=self.there)
+        changed = self.feed(start["token"])
+        self.assertGreater(changed["token"], start["token"])
+        self.assertEqual([(r.pk, r.quantity) for r in changed["upserts"]], [(first.pk, 4)])
+        self.assertEqual(changed["deletes"], [])
+
+    def test_deletes_and_moves_leave_tombstones(self):
+        gone, moved = self.record(), self.record(days_ago=1)
+        token = self.feed(0)["token"]
+
+        Record.all_objects.filter(pk=gone.pk).delete()
+        Record.objects.filter(pk=moved.pk).update(location=self.there)
+        changed = self.feed(token)
+        self.assertEqual(changed["upserts"], [])
+        self.assertEqual(sorted(changed["deletes"]), sorted([gone.pk, moved.pk]))
+        self.assertEqual([r.pk for r in sync.changes_since(self.there.pk, 0)["upserts"]], [moved.pk])
+
+    def test_paging_and_unknown_token(self):
+        for day in range(3):
+            self.record(days_ago=day)
+        page = self.feed(0, limit=2)
+        self.assertTrue(page["more"])
+        rest = self.feed(page["token"], limit=2)
+        self.assertFalse(rest["more"])
+        self.assertEqual(len(page["upserts"]) + len(rest["upserts"]), 3)
+
+        self.assertTrue(self.feed(rest["token"] + 1000)["reset"])
+
+    def test_compact_keeps_every_token_correct(self):
+        record = self.record()
+        token = self.feed(0)["token"]
+        for quantity in (2, 3, 4):
+            Record.objects.filter(pk=record.pk).update(quantity=quantity)
+        before = self.feed(0)
+
+        self.assertEqual(sync.compact("default"), 3)
+        self.assertEqual(RecordChange.objects.filter(record_id=record.pk).count(), 1)
+        after = self.feed(0)
+        self.assertEqual((after["token"], [r.quantity for r in after["upserts"]]),
+                         (before["token"], [4]))
+        self.assertEqual([r.quantity for r in self.feed(token)["upserts"]], [4])
+
+
+class SyncViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.location = Location.objects.create(name="Feed view")
+        cls.admin = User.objects.create_superuser(username="feed-admin", password="x")
+
+    def test_feed_json(self):
+        self.client.force_login(self.admin)
+        record = Record.objects.create(date=timezone.localdate(), location=self.location)
+        data = self.client.get(reverse("sync_changes"), {"location": self.location.pk}).json()
+        self.assertEqual([row[0] for row in data["upserts"]], [record.pk])
+        self.assertEqual(self.client.get(reverse("sync_changes"), {"location": self.location.pk,
+                                                                   "since": data["token"]}).json()["upserts"], [])
+
+
+class OrderBatchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.location = Location.objects.create(name="Queue test")
+        cls.vendor = Vendor.objects.create(name="Metro")
+        cls.rice = VendorItem.objects.create(vendor=cls.vendor, item_name="Rice")
+        cls.oil = VendorItem.objects.create(vendor=cls.vendor, item_name="Oil")
+        cls.admin = User.objects.create_superuser(username="queue-admin", password="x")
+
+    def order(self, key, *lines, date=None):
+        return {
+            "key": key,
+            "date": (date or timezone.localdate()).isoformat(),
+            "location": self.location.pk,
+            "lines": [{"vendor": self.vendor.pk, "item": item.pk, "quantity": quantity} for item, quantity in lines],
+        }
+
+    def test_resent_batch_is_not_inserted_twice(self):
+        batch = [self.order("tablet-1", (self.rice, 2), (self.oil, 1))]
+        results, created, _updated = sync.submit_orders(batch)
+        self.assertEqual(results[0]["status"], sync.CREATED)
+        self.assertEqual(len(created), 2)
+
+        replay, created_again, _updated = sync.submit_orders(batch)
+        self.assertEqual((replay[0]["status"], replay[0]["records"]), (sync.DUPLICATE, results[0]["records"]))
+        self.assertEqual(created_again, [])
+        self.assertEqual(Record.objects.count(), 2)
+
+    def test_same_key_twice_in_one_batch(self):
+        order = self.order("tablet-2", (self.rice, 1))
+        results, _created, _updated = sync.submit_orders([order, order])
+        self.assertEqual([r["status"] for r in results], [sync.CREATED, sync.DUPLICATE])
+        self.assertEqual(results[0]["records"], results[1]["records"])
+        self.assertEqual(Record.objects.get().quantity, 1)
+
+    def test_invalid_orders_are_reported_alone(self):
+        wrong_vendor = self.order("tablet-3", (self.rice, 1))
+        wrong_vendor["lines"][0]["vendor"] = self.vendor.pk + 100
+        results, created, _updated = sync.submit_orders([wrong_vendor, {"key": ""}, self.order("tablet-4", (self.oil, 5))])
+        self.assertEqual([r["status"] for r in results], [sync.INVALID, sync.INVALID, sync.CREATED])
+        self.assertEqual([(r.item_id, r.quantity) for r in created], [(self.oil.pk, 5)])
+
+    def test_batch_endpoint(self):
+        self.client.force_login(self.admin)
+        body = {"orders": [self.order("tablet-5", (self.rice, 3))]}
+        first = self.client.post(reverse("submit_order_batch"), body, content_type="application/json").json()
+        again = self.client.post(reverse("submit_order_batch"), body, content_type="application/json").json()
+        self.assertEqual(first["results"][0]["status"], sync.CREATED)
+        self.assertEqual(again["results"][0], {**first["results"][0], "status": sync.DUPLICATE})
+        self.assertEqual(Record.objects.count(), 1)
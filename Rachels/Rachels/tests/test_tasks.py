@@ -0,0 +1,150 @@
+"""
+Behaviour of the database task queue (tasks.py): claiming, retries with
+backoff, the visibility timeout, a worker surviving a locked database,
+and the export that runs on it.
+"""
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import exports, tasks
+from ..management.commands.run_worker import work_loop
+from ..models import Location, Record, Task
+
+calls = []
+
+
+@tasks.task(name="test_record_call", max_attempts=2)
+def record_call(**payload):
+    calls.append(payload)
+    if payload.get("fail"):
+        raise RuntimeError("boom")
+
+
+class TaskQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_unknown_task(self):
+        with self.assertRaises(KeyError):
+            tasks.enqueue("no_such_task")
+
+    def test_claim_runs_in_order_and_once(self):
+        first = record_call.enqueue(n=1)
+        second = record_call.enqueue(n=2)
+
+        claimed = tasks.claim("w1", visibility_timeout=60)
+        self.assertEqual(claimed.pk, first.pk)
+        self.assertEqual((claimed.status, claimed.attempts, claimed.locked_by), (Task.RUNNING, 1, "w1"))
+        # The claimed task is invisible to a second worker.
+        self.assertEqual(tasks.claim("w2", visibility_timeout=60).pk, second.pk)
+        self.assertIsNone(tasks.claim("w3", visibility_timeout=60))
+
+        self.assertTrue(tasks.run(claimed))
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, Task.DONE)
+        self.assertIsNotNone(claimed.finished_at)
+        self.assertEqual(calls, [{"n": 1}])
+
+    def test_future_task_not_claimed(self):
+        record_call.enqueue(run_after=timezone.now() + timedelta(minutes=5))
+        self.assertIsNone(tasks.claim("w1", visibility_timeout=60))
+
+    def test_failure_is_retried_with_backoff_then_fails(self):
+        task_row = record_call.enqueue(fail=True)
+
+        before = timezone.now()
+        with self.assertLogs("Rachels.tasks", "WARNING"):
+            self.assertFalse(tasks.run(tasks.claim("w1", visibility_timeout=60)))
+        task_row.refresh_from_db()
+        self.assertEqual(task_row.status, Task.QUEUED)
+        self.assertIn("RuntimeError: boom", task_row.last_error)
+        self.assertGreaterEqual(task_row.run_after, before + timedelta(seconds=tasks.RETRY_BASE_SECONDS))
+        self.assertIsNone(tasks.claim("w1", visibility_timeout=60))
+
+        Task.objects.filter(pk=task_row.pk).update(run_after=timezone.now())
+        with self.assertLogs("Rachels.tasks", "WARNING"):
+            self.assertFalse(tasks.run(tasks.claim("w1", visibility_timeout=60)))
+        task_row.refresh_from_db()
+        self.assertEqual((task_row.status, task_row.attempts), (Task.FAILED, 2))
+        self.assertEqual(len(calls), 2)
+
+    def test_expired_lock_is_claimed_again(self):
+        task_row = record_call.enqueue()
+        tasks.claim("dead-worker", visibility_timeout=60)
+        self.assertIsNone(tasks.claim("w2", visibility_timeout=60))
+
+        Task.objects.filter(pk=task_row.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        reclaimed = tasks.claim("w2", visibility_timeout=60)
+        self.assertEqual((reclaimed.pk, reclaimed.locked_by, reclaimed.attempts), (task_row.pk, "w2", 2))
+        self.assertTrue(tasks.run(reclaimed))
+
+    def test_expired_lock_on_last_attempt_gives_up(self):
+        task_row = record_call.enqueue()
+        Task.objects.filter(pk=task_row.pk).update(
+            status=Task.RUNNING, attempts=2, locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertFalse(tasks.run(tasks.claim("w1", visibility_timeout=60)))
+        task_row.refresh_from_db()
+        self.assertEqual(task_row.status, Task.FAILED)
+        self.assertEqual(calls, [])
+
+
+class WorkLoopTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_locked_database_while_finishing_does_not_kill_the_worker(self):
+        task_row = record_call.enqueue(n=1)
+        options = {"visibility_timeout": 60, "poll_interval": 0, "burst": True}
+        with mock.patch.object(tasks, "_finish", side_effect=OperationalError("database is locked")), \
+                self.assertLogs("Rachels.tasks", "ERROR") as logs:
+            # Returns (burst: queue empty) instead of raising.
+            work_loop("w1", options, threading.Event())
+
+        self.assertIn("Could not record the outcome", logs.output[0])
+        self.assertEqual(calls, [{"n": 1}])
+        task_row.refresh_from_db()
+        self.assertEqual((task_row.status, task_row.locked_by), (Task.RUNNING, "w1"))
+
+
+class BackgroundExportTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.export_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.export_root)
+        self.user = User.objects.create_superuser(username="export-admin", password="x")
+        self.client.force_login(self.user)
+        location = Location.objects.create(name="Export test")
+        Record.objects.bulk_create([Record(date=timezone.localdate(), location=location, quantity=i) for i in (1, 2, 3)])
+
+    def test_small_export_streams_inline(self):
+        with override_settings(EXPORT_ROOT=self.export_root, EXPORT_INLINE_ROWS=10):
+            response = self.client.get(reverse("export_csv"))
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(len(response.content.decode().splitlines()), 4)
+        self.assertFalse(Task.objects.exists())
+
+    def test_large_export_is_queued_and_listed(self):
+        with override_settings(EXPORT_ROOT=self.export_root, EXPORT_INLINE_ROWS=2):
+            response = self.client.get(reverse("export_csv"))
+            self.assertRedirects(response, reverse("export_form"))
+            self.assertTrue(tasks.run(tasks.claim("w1", visibility_timeout=60)))
+
+            (name, _size, _modified), = exports.ready(self.user.pk)
+            download = self.client.get(reverse("export_download", args=[name]))
+            lines = b"".join(download.streaming_content).decode().splitlines()
+            self.assertEqual(lines[0].split(","), exports.HEADER)
+            self.assertEqual(len(lines), 4)
+            self.assertContains(self.client.get(reverse("export_form")), name)
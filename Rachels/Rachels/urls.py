@@ -1,8 +1,15 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
 from django.contrib.auth import views as auth_views
 from . import views
 
+# Read-heavy pages get their async implementation when served over ASGI.
+if settings.ASYNC_VIEWS:
+    from . import async_views as read_views
+else:
+    read_views = views
+
 urlpatterns = [
     path('admin/', admin.site.urls),
 
@@ -11,21 +18,41 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
 
     # MAIN
-    path('', views.home, name='Home'),
+    path('', read_views.home, name='Home'),
     path('add/', views.add_record, name='add_record'),
-    path('records/', views.show_all_records, name='show_all_records'),
+    path('records/', read_views.show_all_records, name='show_all_records'),
     path('record/<int:pk>/delete/', views.delete_record, name='delete_record'),
-    path('record/<int:pk>/', views.record_detail, name='record_detail'),
+    path('record/<int:pk>/', read_views.record_detail, name='record_detail'),
     path('record/<int:pk>/complete/', views.mark_completed, name='mark_completed'),
+    path('records/complete/', views.complete_records, name='complete_records'),
+
+    path('inventory/', views.inventory_list, name='inventory'),
 
     path('export/', views.export_form, name='export_form'),
     path('export/csv/', views.export_csv, name='export_csv'),
+    path('export/files/<str:name>', views.export_download, name='export_download'),
+    path('digest/', views.daily_digest, name='daily_digest'),
+    path('spend/', views.spend_report, name='spend_report'),
 
     path('vendors/add/', views.add_vendor, name='add_vendor'),
 
+    # JSON APIs
+    path('api/vendors/', read_views.vendor_catalog, name='vendor_catalog'),
+    path('api/sync/', views.sync_changes, name='sync_changes'),
+    path('api/orders/batch/', views.submit_order_batch, name='submit_order_batch'),
+
     # ADVANCES (admin only)
     path("advances/", views.advance_list, name="advance_list"),
     path("advances/add/", views.advance_add, name="advance_add"),
     path("advances/<int:pk>/delete/", views.advance_delete, name="advance_delete"),
     path("advance-salary/", views.advance_list, name="advance_salary_home"),
+
+    # OBSERVABILITY (admin only)
+    path('metrics', views.metrics, name='metrics'),
 ]
+
+# Server-Sent Events need the async stack; only routed when served over ASGI.
+if settings.ASYNC_VIEWS:
+    urlpatterns += [
+        path('live/events/', read_views.live_events, name='live_events'),
+    ]
@@ -1,18 +1,29 @@
 # views.py
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import csv
+import hashlib
+import hmac
+import json
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import logout
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.db.models import Count, Sum
-from django.http import HttpResponse, HttpResponseForbidden
+from django.db.models import Count, Max, Q, Sum
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, HttpResponseNotAllowed,
+    JsonResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag, url_has_allowed_host_and_scheme
 from django.core.paginator import Paginator
 
-from .forms import AdvanceSalaryForm, RecordForm, VendorForm
-from .models import AdvanceSalary, Record, Vendor, VendorItem
+from . import deletion, digests, exports, inventory, live, orders, pricing, sharding, sync, tasks
+from .forms import AdvanceSalaryForm, InventoryForm, RecordForm, VendorForm
+from .metrics import registry as metrics_registry
+from .models import AdvanceSalary, InventoryEntry, Location, Record, Vendor, VendorItem, catalog_version
 
 
 # ------------------------
@@ -20,12 +31,12 @@ from .models import AdvanceSalary, Record, Vendor, VendorItem
 # ------------------------
 def _normalize_location_for_group(loc):
     """
-    Normalizes a location string to a group fragment.
+    Normalizes a location (or its name) to a group fragment.
     e.g. "Pours and Plates" -> "pours_and_plates"
     """
     if not loc:
         return ""
-    return ''.join(ch.lower() if ch.isalnum() else '_' for ch in loc).strip('_')
+    return ''.join(ch.lower() if ch.isalnum() else '_' for ch in str(loc)).strip('_')
 
 
 def user_is_admin(user):
@@ -60,6 +71,56 @@ def admin_required(view_func):
     return user_passes_test(user_is_admin)(view_func)
 
 
+# ------------------------
+# Conditional GET
+# ------------------------
+def _probe(qs):
+    """
+    Cheap change probe for a record set: newest updated_at plus row count
+    (the count catches deletions, which leave max(updated_at) unchanged).
+    """
+    return qs.order_by().aggregate(latest=Max('updated_at'), total=Count('id'))
+
+
+def _combine_probes(probes):
+    """ One probe from the per-database probes of a sharded record set. """
+    latest = max((p['latest'] for p in probes if p['latest']), default=None)
+    return {'latest': latest, 'total': sum(p['total'] for p in probes)}
+
+
+def _etag(request, *parts):
+    """
+    ETag for a per-user page. The CSRF cookie is part of it so a page
+    cached before a login never comes back with a stale form token.
+    """
+    key = '|'.join(str(p) for p in (
+        request.user.pk, request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''), *parts))
+    return quote_etag(hashlib.md5(key.encode()).hexdigest())
+
+
+def _has_messages(request):
+    """ Pending flash messages are shown once, so that page is never a 304 nor revalidated. """
+    return bool(len(messages.get_messages(request)))
+
+
+def _not_modified(request, etag, last_modified=None):
+    """ Returns a 304 response when the client's copy is current, else None. """
+    if _has_messages(request):
+        return None
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def _with_validators(request, response, etag, last_modified=None):
+    """ Adds ETag / Last-Modified; clients must revalidate before reuse. """
+    if response.status_code == 200 and not _has_messages(request):
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 # ------------------------
 # Dashboard / Home
 # ------------------------
@@ -69,56 +130,33 @@ def home(request):
     Dashboard — show totals, top orders and per-location cards.
     Managers will only see the locations they are allowed to; admin sees all.
     """
-    # detect whether model has a 'status' field
-    field_names = [f.name for f in Record._meta.fields]
-    has_status = 'status' in field_names
-
-    # total pending
-    if has_status:
-        total_pending = Record.objects.filter(status__iexact='Pending').count()
-    else:
-        total_pending = Record.objects.count()
-
-    # pending by location
-    if has_status:
-        pending_by_location_qs = (
-            Record.objects
-                  .filter(status__iexact='Pending')
-                  .values('location')
-                  .annotate(count=Count('id'))
-                  .order_by('-count', 'location')
-        )
-    else:
-        pending_by_location_qs = (
-            Record.objects
-                  .values('location')
-                  .annotate(count=Count('id'))
-                  .order_by('-count', 'location')
-        )
-    pending_by_location = list(pending_by_location_qs)
-
-    # top 5 orders
-    if has_status:
-        top5_orders = Record.objects.filter(status__iexact='Pending').order_by('-date', '-id')[:5]
-    else:
-        top5_orders = Record.objects.all().order_by('-date', '-id')[:5]
+    all_locations = Location.objects.cached()
+    locations = [loc for loc in all_locations if user_can_view_location(request.user, loc)]
+    # The dashboard mixes per-location cards with global totals, so any
+    # record change invalidates it.
+    databases = sharding.split(Record.objects.all())
+    probe = _combine_probes(sharding.fan_out(_probe, databases))
+    etag = _etag(request, 'home', [loc.pk for loc in locations], catalog_version(), *probe.values())
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+
+    # Totals / top lists per database (in parallel when sharded), merged.
+    summaries = sharding.fan_out(_dashboard_summary, databases)
+    total_pending = sum(summary['total_pending'] for summary in summaries)
+    pending_by_location = _pending_by_location(
+        [row for summary in summaries for row in summary['by_location']], all_locations)
+    top5_orders = sharding.merge(
+        [summary['top5'] for summary in summaries], sharding.record_order, reverse=True, limit=5)
+    latest_records = sharding.merge(
+        [summary['latest'] for summary in summaries], sharding.record_order, reverse=True, limit=5)
 
-    latest_records = Record.objects.all().order_by('-date', '-id')[:5]
-
-    # Locations to build cards for — sync with your choices/form
-    ALL_LOCATIONS = ['Dulari', 'Pours and Plates', 'Rachels', 'Rachels1', 'Rachels2']
     location_cards = []
-    for loc in ALL_LOCATIONS:
-        # if user not allowed to view this location, skip
-        if not user_can_view_location(request.user, loc):
-            continue
-
-        if has_status:
-            pending_qs = Record.objects.filter(location=loc, status__iexact='Pending').order_by('-date', '-id')
-            successful_qs = Record.objects.filter(location=loc).exclude(status__iexact='Pending').order_by('-date', '-id')
-        else:
-            pending_qs = Record.objects.filter(location=loc).order_by('-date', '-id')
-            successful_qs = Record.objects.none()
+    for loc in locations:
+        with_related = Record.objects.using(sharding.alias_for_location(loc.pk)).select_related(
+            'vendor', 'item', 'location')
+        pending_qs = with_related.filter(location=loc, status=Record.PENDING).order_by('-date', '-id')
+        successful_qs = with_related.filter(location=loc).exclude(status=Record.PENDING).order_by('-date', '-id')
 
         location_cards.append({
             'location': loc,
@@ -135,42 +173,84 @@ def home(request):
         'top5_orders': top5_orders,
         'location_cards': location_cards,
     }
-    return render(request, "home.html", context)
+    return _with_validators(request, render(request, "home.html", context), etag)
+
+
+def _dashboard_summary(records):
+    """ Dashboard totals and top lists from one database's records. """
+    pending = records.filter(status=Record.PENDING)
+    return {
+        'total_pending': pending.count(),
+        # (sorted in _pending_by_location: ordering by the aggregate would
+        # force a temp B-tree sort in the database)
+        'by_location': list(pending.values('location').annotate(count=Count('id')).order_by()),
+        'top5': list(pending.select_related('vendor', 'item', 'location').order_by('-date', '-id')[:5]),
+        'latest': list(records.select_related('location').order_by('-date', '-id')[:5]),
+    }
+
+
+def _pending_by_location(rows, locations):
+    """
+    Turns (location id, count) rows into location objects, busiest first.
+    Sorted here: ordering by the aggregate would force a temp B-tree sort
+    in the database.
+    """
+    by_id = {loc.pk: loc for loc in locations}
+    return sorted(
+        ({'location': by_id[row['location']], 'count': row['count']} for row in rows if row['location'] in by_id),
+        key=lambda row: (-row['count'], row['location'].name),
+    )
 
 
 # ------------------------
 # All records listing (with filters + pagination)
 # ------------------------
-@login_required
-def show_all_records(request):
-    qs = Record.objects.all().order_by('-date', '-id')
+def _normalize_status(status):
+    """
+    Maps user input onto the stored status spelling so filters can use an
+    exact (indexable) comparison instead of a case-insensitive LIKE.
+    """
+    known = {s.lower(): s for s in (Record.PENDING, Record.COMPLETED)}
+    return known.get(status.lower(), status)
 
-    # text search (your model previously referenced "details" — if absent remove this)
-    q = request.GET.get('q', '').strip()
+
+def _filter_location(qs, value, locations=None):
+    """ Filters by location id (or name); an unknown location matches nothing. """
+    location = Location.objects.resolve(value, locations)
+    if location is None:
+        return qs.none()
+    return qs.filter(location_id=location.pk).using(sharding.alias_for_location(location.pk))
+
+
+def _filter_records(params, locations=None):
+    """
+    Applies the list-page filters (search, location, status, month) from a
+    QueryDict. Shared by the sync and async list views; async callers pass
+    the (already fetched) location list.
+    """
+    qs = Record.objects.select_related('vendor', 'item', 'location').order_by('-date', '-id')
+
+    # text search over vendor and item names
+    q = params.get('q', '').strip()
     if q:
-        qs = qs.filter(details__icontains=q)
+        qs = qs.filter(Q(vendor__name__icontains=q) | Q(item__item_name__icontains=q))
 
-    location = request.GET.get('location', '').strip()
+    location = params.get('location', '').strip()
     if location:
-        qs = qs.filter(location=location)
+        qs = _filter_location(qs, location, locations)
 
-    status = request.GET.get('status', '').strip()
+    status = params.get('status', '').strip()
     if status:
-        qs = qs.filter(status__iexact=status)
+        qs = qs.filter(status=_normalize_status(status))
 
-    if request.GET.get('month') == 'this':
+    if params.get('month') == 'this':
         today = date.today()
         qs = qs.filter(date__year=today.year, date__month=today.month)
+    return qs
 
-    # Pagination
-    per_page = 25
-    paginator = Paginator(qs, per_page)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
 
-    # compact pagination list
-    total_pages = paginator.num_pages
-    current = page_obj.number if page_obj else 1
+def _pagination_items(total_pages, current):
+    """ Compact page list: first two, last two and the neighbours of current. """
     pagination_items = []
     last_was_ellipsis = False
     for p in range(1, total_pages + 1):
@@ -186,43 +266,132 @@ def show_all_records(request):
             if not last_was_ellipsis:
                 pagination_items.append('...')
                 last_was_ellipsis = True
+    return pagination_items
 
+
+RECORDS_PER_PAGE = 25
+
+
+RECORD_JSON_FIELDS = ['id', 'date', 'location', 'status', 'vendor', 'item', 'quantity']
+
+
+def _record_row(r):
+    """ A record as a RECORD_JSON_FIELDS row (location, vendor and item selected). """
+    return [
+        r.pk,
+        r.date.isoformat(),
+        r.location.name,
+        r.status,
+        r.vendor.name if r.vendor else '',
+        r.item.item_name if r.item else '',
+        r.quantity,
+    ]
+
+
+def _records_list_response(request, paginator, page_obj, locations=None):
+    """
+    Renders a page of the records list. ``?format=fragment`` returns only the
+    results table + pagination (swapped in client-side on filter / page
+    changes); ``?format=json`` a compact row-array representation.
+    """
+    fmt = request.GET.get('format', '')
+    if fmt == 'json':
+        return JsonResponse({
+            'page': page_obj.number,
+            'num_pages': paginator.num_pages,
+            'count': paginator.count,
+            'fields': RECORD_JSON_FIELDS,
+            'records': [_record_row(r) for r in page_obj.object_list],
+        })
+
+    params = request.GET.copy()
+    params.pop('page', None)
+    params.pop('format', None)
     context = {
         'records': page_obj.object_list,
         'page_obj': page_obj,
         'paginator': paginator,
-        'pagination_items': pagination_items,
+        'pagination_items': _pagination_items(paginator.num_pages, page_obj.number),
+        'base_query': params.urlencode(),
+        'locations': Location.objects.cached() if locations is None else locations,
         'request': request,
     }
-    return render(request, 'DisplayRecord.html', context)
+    template = 'partials/records_results.html' if fmt == 'fragment' else 'DisplayRecord.html'
+    return render(request, template, context)
+
+
+@login_required
+def show_all_records(request):
+    qs = _filter_records(request.GET)
+    databases = sharding.split(qs)
+
+    # The probe's count doubles as the paginator's count.
+    probe = _combine_probes(sharding.fan_out(_probe, databases))
+    etag = _etag(request, request.get_full_path(), catalog_version(), *probe.values())
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+
+    # Pagination
+    paginator = Paginator(qs if len(databases) == 1 else sharding.MergedRecords(databases), RECORDS_PER_PAGE)
+    paginator.count = probe['total']
+    page_number = request.GET.get('page', 1)
+    page_obj = paginator.get_page(page_number)
+    return _with_validators(request, _records_list_response(request, paginator, page_obj), etag)
+
 
 # ------------------------
 # Record detail + admin actions
 # ------------------------
 @login_required
 def record_detail(request, pk):
-    record = get_object_or_404(Record, pk=pk)
+    records = Record.objects.using(sharding.alias_for_record(pk))
+    record = get_object_or_404(records.select_related('vendor', 'item', 'location'), pk=pk)
     if not user_can_view_location(request.user, record.location):
         return HttpResponseForbidden("You don't have permission to view this record.")
-    return render(request, "record_detail.html", {"record": record})
+    etag = _etag(request, 'record', record.pk, record.updated_at.isoformat(), catalog_version())
+    not_modified = _not_modified(request, etag, record.updated_at)
+    if not_modified:
+        return not_modified
+    return _with_validators(request, render(request, "record_detail.html", {"record": record}), etag, record.updated_at)
 
 
 @admin_required
 def mark_completed(request, pk):
-    record = get_object_or_404(Record, pk=pk)
+    records = Record.objects.using(sharding.alias_for_record(pk))
+    record = get_object_or_404(records, pk=pk)
     if request.method == "POST":
-        record.status = "Completed"
-        record.save()
+        # Completion also posts the inventory receipt (see inventory.py).
+        completed = inventory.complete_records(records.filter(pk=record.pk), actor=request.user)
+        live.publish_records(live.COMPLETED, completed)
         messages.success(request, "Record marked completed.")
         return redirect('show_all_records')
     return redirect('record_detail', pk=pk)
 
 
+@admin_required
+def complete_records(request):
+    """ Bulk completion of the records ticked on the records list. """
+    if request.method != "POST":
+        return redirect('show_all_records')
+    ids = [int(pk) for pk in request.POST.getlist('ids') if pk.isdigit()]
+    completed = inventory.complete_records(Record.objects.filter(pk__in=ids), actor=request.user) if ids else []
+    live.publish_records(live.COMPLETED, completed)
+    messages.success(request, f"{len(completed)} record(s) marked completed.")
+    next_url = request.POST.get('next', '')
+    if url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        return redirect(next_url)
+    return redirect('show_all_records')
+
+
 @admin_required
 def delete_record(request, pk):
-    record = get_object_or_404(Record, pk=pk)
+    records = Record.objects.using(sharding.alias_for_record(pk))
+    record = get_object_or_404(records, pk=pk)
     if request.method == "POST":
-        record.delete()
+        # Soft delete: an admin can restore it until purge_deleted runs.
+        deleted = deletion.soft_delete(records.filter(pk=record.pk), actor=request.user)
+        live.publish_records(live.DELETED, deleted)
         messages.success(request, "Record deleted.")
         return redirect('show_all_records')
     return render(request, "delete_record.html", {"record": record})
@@ -248,7 +417,11 @@ def export_form(request):
         'location': request.GET.get('location', ''),
         'status': request.GET.get('status', ''),
     }
-    return render(request, "export_records.html", {'initial': initial})
+    return render(request, "export_records.html", {
+        'initial': initial,
+        'locations': Location.objects.cached(),
+        'ready': exports.ready(request.user.pk),
+    })
 
 
 @login_required
@@ -257,43 +430,49 @@ def export_csv(request):
     from_date = _parse_date(data.get('from_date', '').strip())
     to_date = _parse_date(data.get('to_date', '').strip())
     location = data.get('location', '').strip()
-    status = data.get('status', '').strip()
+    status = _normalize_status(data.get('status', '').strip())
 
     if from_date and to_date and from_date > to_date:
         messages.error(request, "From date cannot be after To date.")
         return redirect('export_form')
 
-    qs = Record.objects.all().order_by('date', 'id')
-    if from_date:
-        qs = qs.filter(date__gte=from_date)
-    if to_date:
-        qs = qs.filter(date__lte=to_date)
+    location_id = None
     if location:
-        qs = qs.filter(location=location)
-    if status:
-        qs = qs.filter(status__iexact=status)
-
-    fd = from_date.isoformat() if from_date else timezone.localdate().isoformat()
-    td = to_date.isoformat() if to_date else timezone.localdate().isoformat()
-    filename = f"orders-{fd}-{td}.csv"
+        resolved = Location.objects.resolve(location)
+        # An unknown location matches nothing (no location has id 0).
+        location_id = resolved.pk if resolved else 0
+    qs = exports.queryset(from_date, to_date, location_id, status)
+    filename = exports.filename(from_date, to_date)
+
+    total = exports.count(qs)
+    if total > settings.EXPORT_INLINE_ROWS:
+        tasks.export_records.enqueue(
+            user_id=request.user.pk,
+            filename=filename,
+            from_date=from_date.isoformat() if from_date else None,
+            to_date=to_date.isoformat() if to_date else None,
+            location_id=location_id,
+            status=status,
+        )
+        messages.success(request, f"Exporting {total} orders in the background; the file will be listed below.")
+        return redirect('export_form')
 
     response = HttpResponse(content_type='text/csv')
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    writer = csv.writer(response)
-    writer.writerow(['ID', 'Date', 'Location', 'Status', 'Vendor', 'Item', 'Quantity'])
-    for r in qs:
-        writer.writerow([
-            r.pk,
-            r.date.isoformat() if r.date else '',
-            r.location,
-            r.status,
-            r.vendor.name if r.vendor else '',
-            r.item.item_name if r.item else '',
-            r.quantity,
-        ])
+    exports.write_csv(response, exports.records(qs))
     return response
 
 
+@login_required
+def export_download(request, name):
+    """ A finished background export of the current user. """
+    path = f"{request.user.pk}/{name}"
+    store = exports.storage()
+    if "/" in name or not store.exists(path):
+        raise Http404("No such export.")
+    return FileResponse(store.open(path), as_attachment=True, filename=name, content_type='text/csv')
+
+
 # ------------------------
 # Vendor management
 # ------------------------
@@ -320,6 +499,57 @@ def add_vendor(request):
     return render(request, "add_vendor.html", {"form": form})
 
 
+@login_required
+def sync_changes(request):
+    """
+    Delta feed for the tablets: ``?since=<token>`` returns the records of
+    the caller's location (admins pass ``?location=``) created or updated
+    since that token, in their current state, and the ids deleted since.
+    """
+    if request.user.is_superuser:
+        location = Location.objects.resolve(request.GET.get('location'))
+        if location is None:
+            return HttpResponseBadRequest("Pass ?location=<id>.")
+    else:
+        location = _get_manager_location(request.user)
+        if location is None:
+            return HttpResponseForbidden("You are not assigned to a location.")
+    try:
+        since = int(request.GET.get('since') or 0)
+        limit = min(max(int(request.GET.get('limit') or sync.FEED_LIMIT), 1), sync.FEED_LIMIT)
+    except ValueError:
+        return HttpResponseBadRequest("since and limit must be integers.")
+
+    feed = sync.changes_since(location.pk, since, limit)
+    response = JsonResponse({
+        'location': location.pk,
+        'token': str(feed['token']),
+        'more': feed['more'],
+        'reset': feed['reset'],
+        'fields': RECORD_JSON_FIELDS,
+        'upserts': [_record_row(r) for r in feed['upserts']],
+        'deletes': feed['deletes'],
+    })
+    patch_cache_control(response, private=True, no_store=True)
+    return response
+
+
+@login_required
+def vendor_catalog(request):
+    """ JSON catalog of vendors and their items (used by the order form). """
+    vendors = Vendor.objects.prefetch_related('items').order_by('name')
+    return JsonResponse({
+        'vendors': [
+            {
+                'id': v.pk,
+                'name': v.name,
+                'items': [{'id': i.pk, 'name': i.item_name} for i in v.items.all()],
+            }
+            for v in vendors
+        ],
+    })
+
+
 # ------------------------
 # Advance salaries (admin only)
 # ------------------------
@@ -356,6 +586,145 @@ def advance_delete(request, pk):
     return render(request, "advance_confirm_delete.html", {"advance": adv})
 
 
+# ------------------------
+# Inventory
+# ------------------------
+@login_required
+def inventory_list(request):
+    """
+    On-hand stock for one location (a manager's own, or ?location= for
+    admins) from the stored balances, plus the form that posts counts and
+    usage to the ledger.
+    """
+    locations = Location.objects.cached()
+    if request.user.is_superuser:
+        location = Location.objects.resolve(request.GET.get('location'), locations) or (locations[0] if locations else None)
+    else:
+        location = _get_manager_location(request.user)
+    if location is None:
+        return HttpResponseForbidden("You are not allowed to view inventory.")
+
+    form = InventoryForm(request.POST or None)
+    if request.method == "POST" and form.is_valid():
+        item, quantity, note = form.cleaned_data['item'], form.cleaned_data['quantity'], form.cleaned_data['note']
+        if form.cleaned_data['kind'] == InventoryEntry.COUNT:
+            inventory.post_count(location.pk, item.pk, quantity, note)
+        else:
+            inventory.post_usage(location.pk, item.pk, quantity, note)
+        messages.success(request, f"Inventory updated for {item}.")
+        return redirect(f"{request.path}?location={location.pk}")
+
+    return render(request, "inventory.html", {
+        "form": form,
+        "location": location,
+        "locations": locations,
+        "balances": inventory.balances_for(location.pk),
+        "entries": inventory.recent_entries(location.pk),
+    })
+
+
+# ------------------------
+# Daily digest
+# ------------------------
+@login_required
+def daily_digest(request):
+    """
+    A stored daily digest (digests.build): the combined one or ?location=
+    for admins, a manager's own location's otherwise. One row fetch; no
+    aggregation at request time. ``?format=json`` returns the summary.
+    """
+    locations = Location.objects.cached()
+    if request.user.is_superuser:
+        location = Location.objects.resolve(request.GET.get('location'), locations)
+    else:
+        location = _get_manager_location(request.user)
+        if location is None:
+            return HttpResponseForbidden("You are not allowed to view digests.")
+    day = _parse_date(request.GET.get('date', '').strip()) or timezone.localdate()
+    digest = digests.get(day, location)
+
+    if request.GET.get('format') == 'json':
+        if digest is None:
+            return JsonResponse({"error": "No digest for this day."}, status=404)
+        return JsonResponse({"date": day.isoformat(), "location": location.pk if location else None,
+                             "summary": digest.summary})
+
+    return render(request, "daily_digest.html", {
+        "digest": digest,
+        "day": day,
+        "previous": day - timedelta(days=1),
+        "next": day + timedelta(days=1),
+        "location": location,
+        "locations": locations,
+    })
+
+
+# ------------------------
+# Spend (admin only)
+# ------------------------
+@admin_required
+def spend_report(request):
+    """
+    Spend per location or vendor and per day, week or month over a date
+    range, aggregated in the database (pricing.spend). ``?format=csv``
+    downloads the same totals.
+    """
+    by = request.GET.get('by') if request.GET.get('by') in pricing.GROUPS else 'location'
+    period = request.GET.get('period') if request.GET.get('period') in pricing.PERIODS else 'month'
+    from_date = _parse_date(request.GET.get('from_date', '').strip())
+    to_date = _parse_date(request.GET.get('to_date', '').strip())
+    location = request.GET.get('location', '').strip()
+
+    qs = Record.objects.all()
+    if from_date:
+        qs = qs.filter(date__gte=from_date)
+    if to_date:
+        qs = qs.filter(date__lte=to_date)
+    if location:
+        qs = _filter_location(qs, location)
+    rows = pricing.spend(qs, by=by, period=period)
+
+    if request.GET.get('format') == 'csv':
+        response = HttpResponse(content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="spend-by-{by}-{period}.csv"'
+        writer = csv.writer(response)
+        writer.writerow(['Period', by.title(), 'Spend', 'Quantity', 'Lines', 'Unpriced lines'])
+        for row in rows:
+            writer.writerow([row['period'].isoformat(), row['name'], row['spend'], row['quantity'],
+                             row['lines'], row['unpriced']])
+        return response
+
+    return render(request, "spend_report.html", {
+        "rows": rows,
+        "total": sum((row['spend'] for row in rows), 0),
+        "by": by,
+        "period": period,
+        "from_date": from_date,
+        "to_date": to_date,
+        "location": location,
+        "locations": Location.objects.cached(),
+    })
+
+
+# ------------------------
+# Metrics (admin only)
+# ------------------------
+def metrics(request):
+    """
+    Prometheus text exposition of the per-view request histograms.
+    Superusers can open it in the browser; scrapers authenticate with
+    ``Authorization: Bearer <METRICS_TOKEN>`` when that setting is configured.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    auth = request.headers.get('Authorization', '')
+    if not (user_is_admin(request.user) or (token and hmac.compare_digest(auth.encode(), f'Bearer {token}'.encode()))):
+        return HttpResponseForbidden("Admins only.")
+    return HttpResponse(
+        metrics_registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
 # ------------------------
 # Logout
 # ------------------------
@@ -375,15 +744,11 @@ def _get_manager_location(user):
     if user.is_superuser:
         return None  # admin is not tied to a single location
 
-    # Example mapping by username – tweak as needed
-    mapping = {
-        "manager_dulari": "Dulari",
-        "manager_pnp": "Pours and Plates",
-        "manager_rachels": "Rachels",
-        "manager_r1": "Rachels1",
-        "manager_r2": "Rachels2",
-    }
-    return mapping.get(user.username)
+    # The manager's branch comes from their ManagerProfile.
+    profile = getattr(user, 'managerprofile', None)
+    if profile is None or profile.location_id is None:
+        return None
+    return Location.objects.resolve(profile.location_id)
 
 @login_required
 def add_record(request):
@@ -400,7 +765,9 @@ def add_record(request):
 
         if is_admin:
             # Admin may choose any location from form
-            location = request.POST.get("location")
+            location = Location.objects.resolve(request.POST.get("location"))
+            if location is None:
+                return HttpResponseBadRequest("Unknown location.")
         else:
             # Manager: ignore whatever was posted, force their own branch
             location = manager_location
@@ -409,16 +776,15 @@ def add_record(request):
         items = request.POST.getlist("item[]")
         quantities = request.POST.getlist("quantity[]")
 
-        for v, i, q in zip(vendors, items, quantities):
-            if v and i and q:
-                Record.objects.create(
-                    date=date,
-                    location=location,
-                    vendor_id=v,
-                    item_id=i,
-                    quantity=q,
-                    status="Pending",
-                )
+        lines = [
+            Record(date=date, location=location, vendor_id=v, item_id=i, quantity=q)
+            for v, i, q in zip(vendors, items, quantities)
+            if v and i and q
+        ]
+        # A line already pending for this location/date adds to its quantity.
+        created, updated = orders.add_pending(sharding.alias_for_location(location.pk), lines, actor=user)
+        live.publish_records(live.CREATED, created)
+        live.publish_records(live.UPDATED, updated)
 
         return redirect("Home")
 
@@ -429,7 +795,39 @@ def add_record(request):
     context = {
         "form": form,
         "vendors": vendors,
+        # Item lists per vendor, embedded with json_script for js/add_record.js.
+        "vendor_items": {
+            str(v.pk): [{"id": i.pk, "name": i.item_name} for i in v.items.all()]
+            for v in vendors
+        },
         "is_admin": is_admin,
         "manager_location": manager_location,
     }
     return render(request, "addRecord.html", context)
+
+
+@login_required
+def submit_order_batch(request):
+    """
+    Batch endpoint of the offline order queue (static/js/add_record.js):
+    ``{"orders": [...]}`` in, one result per order out (see
+    sync.submit_orders).
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    manager_location = _get_manager_location(request.user)
+    if not request.user.is_superuser and manager_location is None:
+        return HttpResponseForbidden("You are not allowed to add records.")
+    try:
+        batch = json.loads(request.body)["orders"]
+    except (ValueError, KeyError, TypeError):
+        return HttpResponseBadRequest('Expected a JSON body like {"orders": [...]}.')
+    if not isinstance(batch, list) or len(batch) > sync.MAX_BATCH_ORDERS:
+        return HttpResponseBadRequest(f"orders must be a list of at most {sync.MAX_BATCH_ORDERS}.")
+
+    # Admins choose each order's location; managers' are forced to their own.
+    forced = None if request.user.is_superuser else manager_location
+    results, created, updated = sync.submit_orders(batch, location=forced, actor=request.user)
+    live.publish_records(live.CREATED, created)
+    live.publish_records(live.UPDATED, updated)
+    return JsonResponse({"results": results})
@@ -0,0 +1,35 @@
+"""
+ASGI deployment profile: Gunicorn managing Uvicorn workers.
+
+    pip install gunicorn uvicorn
+    gunicorn -c gunicorn_asgi.py Rachels.asgi:application
+
+One event-loop worker keeps many slow clients (tablets on poor Wi-Fi)
+connected at once; the async read views (ASYNC_VIEWS, switched on by
+Rachels/asgi.py) keep the loop free while their queries run. Add workers
+only once the database is no longer the single-writer SQLite file.
+"""
+import os
+
+bind = os.environ.get("RACHELS_BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.environ.get("RACHELS_WORKERS", "1"))
+# Caches are per process without Redis, and cache invalidation would only
+# reach the worker that made the change (see settings.py).
+if workers > 1 and not os.environ.get("RACHELS_REDIS_URL"):
+    raise SystemExit("RACHELS_WORKERS > 1 needs a shared cache: set RACHELS_REDIS_URL.")
+
+# Slow / flaky clients: keep idle connections around for reuse, but don't
+# let a stalled request hold a worker forever.
+keepalive = 75
+timeout = 120
+graceful_timeout = 30
+
+# Recycle workers now and then to cap memory growth.
+max_requests = 5000
+max_requests_jitter = 500
+
+raw_env = ["RACHELS_ASYNC_VIEWS=1"]
+
+accesslog = "-"
+errorlog = "-"